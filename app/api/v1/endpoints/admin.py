@@ -0,0 +1,86 @@
+# backend/app/api/v1/endpoints/admin.py
+
+import secrets
+from fastapi import APIRouter, HTTPException, Header, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api.v1.endpoints.analytics import prediction_service
+from app.core.config import settings
+from app.models.schemas import (
+    AssetsStatusResponse, HistoricalPatchRequest, HistoricalPatchResponse, ProfileListResponse
+)
+from app.services.profiler import ProfileStore, StackSampler
+from typing import Optional
+
+# --- Creación del Router ---
+admin_router = APIRouter()
+
+# Perfiles de solicitudes que guarda el ProfilingMiddleware (ver app/main.py)
+stack_sampler = StackSampler(interval_seconds=settings.PROFILING_INTERVAL_MS / 1000)
+profile_store = ProfileStore(max_profiles=settings.PROFILING_MAX_PROFILES)
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """
+    Función de dependencia de FastAPI.
+    Exige que la cabecera X-Admin-Token coincida con ADMIN_TOKEN. Si no hay un
+    token configurado, los endpoints de administración quedan deshabilitados.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Los endpoints de administración están deshabilitados.")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Token de administración inválido.")
+
+# --- Endpoints de Administración ---
+
+@admin_router.get("/assets", response_model=AssetsStatusResponse, dependencies=[Depends(require_admin_token)])
+def get_assets_status():
+    """ Devuelve la versión de los activos vigentes y el estado de la última recarga. """
+    return AssetsStatusResponse(**prediction_service.get_assets_status())
+
+@admin_router.post("/assets/reload", response_model=AssetsStatusResponse, status_code=202,
+                   dependencies=[Depends(require_admin_token)])
+def reload_assets():
+    """
+    Recarga el modelo, el encoder y los datos históricos en segundo plano.
+    Las solicitudes siguen atendiéndose con los activos actuales hasta que los
+    nuevos están completos.
+    """
+    if not prediction_service.reload_assets():
+        return JSONResponse(status_code=409, content=prediction_service.get_assets_status())
+    return AssetsStatusResponse(**prediction_service.get_assets_status())
+
+@admin_router.post("/historical-data/patch", response_model=HistoricalPatchResponse,
+                   dependencies=[Depends(require_admin_token)])
+def patch_historical_data(request: HistoricalPatchRequest):
+    """
+    Aplica en memoria las filas recalculadas por la ingesta incremental
+    (`preprocess_data.py --delta`), sin recargar los activos ni reiniciar.
+    Solo se descartan de la caché las proyecciones de las afiliaciones afectadas.
+    """
+    if not prediction_service.check_assets_loaded():
+        raise HTTPException(status_code=503, detail="Los activos todavía no están cargados.")
+    rows = [(r.affiliation_name, r.year, r.publication_count, r.distinct_authors) for r in request.rows]
+    result = prediction_service.apply_historical_updates(rows, request.historical_data_sha256)
+    if result is None:
+        return JSONResponse(status_code=409, content=prediction_service.get_assets_status())
+    return HistoricalPatchResponse(**result)
+
+
+@admin_router.get("/profiles", response_model=ProfileListResponse, dependencies=[Depends(require_admin_token)])
+def list_profiles():
+    """ Lista los últimos perfiles de solicitudes (muestreadas, pedidas por cabecera o lentas). """
+    return ProfileListResponse(enabled=settings.PROFILING_ENABLED, profiles=profile_store.list())
+
+@admin_router.get("/profiles/{profile_id}", response_class=PlainTextResponse,
+                  dependencies=[Depends(require_admin_token)])
+def download_profile(profile_id: int):
+    """
+    Descarga un perfil en formato de pilas colapsadas (`raíz;...;hoja conteo`),
+    que se abre con speedscope o flamegraph.pl.
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"El perfil {profile_id} no existe o ya salió del buffer.")
+    return PlainTextResponse(
+        profile.folded(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
@@ -1,15 +1,46 @@
 # backend/app/api/v1/endpoints/analytics.py
 
-from fastapi import APIRouter, HTTPException, Query, Depends, Body
-from fastapi.responses import JSONResponse
+import os
+from fastapi import APIRouter, HTTPException, Query, Depends, Body, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.admission import AdmissionController, DeadlineExceeded, Overloaded, within_deadline
 from app.models.schemas import *
+from app.services.prediction_batcher import PredictionBatcher
+from app.services.metrics import process_memory, stage_timer
 from app.services.prediction_service import PredictionService
-from typing import List, Optional
+from app.services.response_cache import RenderedResponse, ResponseCache
+from app.services.single_flight import SingleFlight, freeze
+from typing import List, Literal, Optional
 
 # --- Creación del Router y Servicio ---
 api_router = APIRouter()
-# Instancia única del servicio para toda la aplicación
-prediction_service = PredictionService()
+# Instancia única del servicio para toda la aplicación.
+# Los activos se cargan en segundo plano al iniciar la aplicación (ver app.main).
+prediction_service = PredictionService(load_assets=False)
+# Agrupador de predicciones concurrentes (opcional, ver PREDICTION_BATCHING_ENABLED)
+prediction_batcher = PredictionBatcher(
+    window_ms=settings.PREDICTION_BATCH_WINDOW_MS,
+    max_rows=settings.PREDICTION_BATCH_MAX_ROWS
+) if settings.PREDICTION_BATCHING_ENABLED else None
+# Respuestas pre-serializadas (y comprimidas) por versión de activos
+response_cache = ResponseCache()
+# Límites de concurrencia por ruta costosa y plazo por solicitud
+admission = AdmissionController(
+    {
+        "projection": (settings.ADMISSION_PROJECTION_MAX_CONCURRENT, settings.ADMISSION_PROJECTION_MAX_QUEUE),
+        "compare": (settings.ADMISSION_HEAVY_MAX_CONCURRENT, settings.ADMISSION_HEAVY_MAX_QUEUE),
+        "scenarios": (settings.ADMISSION_HEAVY_MAX_CONCURRENT, settings.ADMISSION_HEAVY_MAX_QUEUE),
+        "ranking": (settings.ADMISSION_HEAVY_MAX_CONCURRENT, settings.ADMISSION_HEAVY_MAX_QUEUE),
+    },
+    queue_timeout_seconds=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    deadline_seconds=settings.REQUEST_DEADLINE_SECONDS,
+    enabled=settings.ADMISSION_CONTROL_ENABLED
+)
+# Cálculos idénticos en curso se ejecutan una sola vez (ver REQUEST_COALESCING_ENABLED)
+single_flight = SingleFlight(enabled=settings.REQUEST_COALESCING_ENABLED)
 
 def get_prediction_service():
     """
@@ -18,53 +49,248 @@ def get_prediction_service():
     Si no, levanta un error 503 (Servicio No Disponible).
     """
     if not prediction_service.check_assets_loaded():
+        if prediction_service.reload_status["state"] == "loading":
+            raise HTTPException(status_code=503, detail="Los activos se están cargando. Intenta nuevamente en unos segundos.",
+                                headers={"Retry-After": "5"})
         raise HTTPException(status_code=503, detail="El modelo o los datos no están disponibles. Revisa los logs del servidor.")
     return prediction_service
 
+async def run_plan(plan, fallback, *args, deadline: Optional[float] = None):
+    """
+    Ejecuta un cálculo del servicio: a través del agrupador de micro-lotes si
+    está habilitado, o la versión síncrona en el threadpool si no lo está.
+    Con `deadline` el plan se interrumpe (DeadlineExceeded) al vencer el plazo.
+    """
+    if prediction_batcher is not None:
+        return await prediction_batcher.run(within_deadline(plan(*args), deadline))
+    if deadline is not None:
+        return await run_in_threadpool(prediction_service._drive, within_deadline(plan(*args), deadline))
+    return await run_in_threadpool(fallback, *args)
+
+async def run_admitted(route: str, plan, fallback, *args):
+    """
+    Ejecuta un cálculo bajo el control de admisión de `route` y el plazo por
+    solicitud: 429 si la cola de la ruta está llena y 503 si la espera o el
+    cálculo superan el plazo, ambos con Retry-After.
+    """
+    deadline = admission.deadline()
+    retry_after = {"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)}
+    try:
+        async with admission.admit(route, deadline):
+            return await run_plan(plan, fallback, *args, deadline=deadline)
+    except Overloaded as e:
+        if e.reason == "queue_full":
+            raise HTTPException(status_code=429, detail="Demasiadas solicitudes en curso. Intenta nuevamente.",
+                                headers=retry_after)
+        raise HTTPException(status_code=503, detail="El servicio está saturado. Intenta nuevamente.",
+                            headers=retry_after)
+    except DeadlineExceeded:
+        admission.record_deadline_exceeded(route)
+        raise HTTPException(status_code=503, detail="La solicitud superó el tiempo máximo de cálculo.",
+                            headers=retry_after)
+
+async def run_coalesced(route: str, plan, fallback, *args):
+    """
+    Como run_admitted, pero las solicitudes concurrentes con el mismo cálculo
+    (plan, argumentos y versión de activos) comparten una sola ejecución.
+    """
+    key = (plan.__name__, prediction_service.assets_version, freeze(args))
+    return await single_flight.run(route, key, lambda: run_admitted(route, plan, fallback, *args))
+
+def render_json(model: BaseModel) -> bytes:
+    """Serializa un modelo de respuesta exactamente como lo haría FastAPI."""
+    return JSONResponse(content=model.model_dump(mode="json")).body
+
+def matching_etag(if_none_match: Optional[str], etags: List[str]) -> Optional[str]:
+    """Primer ETag de `etags` que aparece en If-None-Match, o None."""
+    if not if_none_match:
+        return None
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    candidates = [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+    if "*" in candidates:
+        return etags[0]
+    return next((etag for etag in etags if etag in candidates), None)
+
+def serve_rendered(request: Request, rendered: RenderedResponse) -> Response:
+    """
+    Responde con el cuerpo pre-serializado: 304 si el cliente ya tiene esta
+    versión (If-None-Match con el ETag de alguna de sus variantes) o la
+    variante comprimida que acepte.
+    """
+    coding, body = rendered.select(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": rendered.etags[coding],
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE_SECONDS}, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+    # El 304 lleva el ETag que coincidió, para que la caché del cliente
+    # actualice la variante que tiene guardada.
+    etags = [rendered.etags[coding]] + [etag for other, etag in rendered.etags.items() if other != coding]
+    matched = matching_etag(request.headers.get("if-none-match"), etags)
+    if matched is not None:
+        response_cache.record_not_modified()
+        headers["ETag"] = matched
+        return Response(status_code=304, headers=headers)
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type=rendered.media_type, headers=headers)
+
 # --- Endpoints de Analítica ---
 
 @api_router.get("/affiliations", response_model=AffiliationListResponse)
-def get_affiliations(service: PredictionService = Depends(get_prediction_service)):
-    """ Devuelve una lista de todos los nombres de afiliaciones disponibles. """
-    affiliations = service.get_all_affiliations()
-    return AffiliationListResponse(affiliations=affiliations)
+def get_affiliations(
+    request: Request,
+    q: Optional[str] = Query(None, max_length=200, description="Texto a buscar en el nombre (sin distinguir mayúsculas ni tildes)."),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Máximo de resultados a devolver."),
+    offset: int = Query(0, ge=0, description="Resultados a omitir (paginación)."),
+    service: PredictionService = Depends(get_prediction_service)
+):
+    """
+    Devuelve los nombres de afiliaciones disponibles. Con `q` devuelve solo
+    los que coinciden, ordenados por relevancia; `limit` y `offset` paginan.
+    La lista completa se sirve pre-serializada, con ETag.
+    """
+    # Una consulta de solo espacios equivale a no buscar
+    if q is not None:
+        q = q.strip() or None
+    if q is None and limit is None and offset == 0:
+        bundle = service.bundle
+        rendered = response_cache.get_or_render("affiliations", bundle.version, lambda: render_json(
+            AffiliationListResponse(affiliations=bundle.search_index.names, total=len(bundle.search_index))
+        ))
+        return serve_rendered(request, rendered)
+    affiliations, total = service.search_affiliations(q, limit, offset)
+    return AffiliationListResponse(affiliations=affiliations, total=total)
 
 @api_router.get("/projection/{affiliation_name}", response_model=ProjectionResponse, responses={404: {"model": ErrorResponse}})
-def get_projection(
+async def get_projection(
     affiliation_name: str, 
     projection_years: int = Query(5, ge=1, le=20, description="Número de años a proyectar."),
     hypothetical_authors: Optional[int] = Query(None, description="Número hipotético de autores para análisis 'What If'."),
     service: PredictionService = Depends(get_prediction_service)
 ):
     """ Devuelve datos históricos y una proyección futura para una afiliación. """
-    result = service.get_projection(affiliation_name, projection_years, hypothetical_authors)
+    results = await run_coalesced(
+        "projection", service.plan_projections, service.get_projections,
+        [affiliation_name], projection_years, hypothetical_authors
+    )
+    result = results[0]
     if "error" in result:
         return JSONResponse(status_code=404, content=result)
-    return ProjectionResponse(**result)
+    with stage_timer("projection", "serialize"):
+        body = render_json(ProjectionResponse(**result))
+    return Response(content=body, media_type="application/json")
 
 @api_router.post("/projection/compare", response_model=ComparisonResponse, responses={404: {"model": ErrorResponse}})
-def get_comparison(
+async def get_comparison(
     affiliation_names: List[str] = Body(..., embed=True, description="Lista de nombres de afiliaciones a comparar."),
     projection_years: int = Query(5, ge=1, le=20, description="Número de años a proyectar."),
     service: PredictionService = Depends(get_prediction_service)
 ):
     """ Compara las proyecciones de varias afiliaciones. """
-    results = []
-    for name in affiliation_names:
-        result = service.get_projection(name, projection_years)
-        if "error" in result:
-            continue 
-        results.append(result)
-    return ComparisonResponse(results=results)
+    # Todas las afiliaciones se proyectan juntas, un año a la vez.
+    projections = await run_admitted(
+        "compare", service.plan_projections, service.get_projections, affiliation_names, projection_years
+    )
+    results = [result for result in projections if "error" not in result]
+    with stage_timer("projection", "serialize"):
+        body = render_json(ComparisonResponse(results=results))
+    return Response(content=body, media_type="application/json")
+
+@api_router.post("/projection/scenarios", response_model=ScenarioGridResponse,
+                 responses={404: {"model": ErrorResponse}, 422: {"model": ErrorResponse}})
+async def get_scenarios(
+    scenarios: ScenarioGridRequest,
+    projection_years: int = Query(5, ge=1, le=20, description="Número de años a proyectar."),
+    service: PredictionService = Depends(get_prediction_service)
+):
+    """
+    Análisis de sensibilidad "What If": proyecta cada afiliación con cada
+    número hipotético de autores en una sola solicitud. Todo el grupo se
+    evalúa junto, con una llamada al modelo por año proyectado.
+    """
+    author_counts = scenarios.scenario_author_counts()
+    cells = len(scenarios.affiliation_names) * len(author_counts)
+    if cells > settings.SCENARIO_GRID_MAX_CELLS:
+        return JSONResponse(status_code=422, content={
+            "error": f"La grilla tiene {cells} combinaciones; el máximo es {settings.SCENARIO_GRID_MAX_CELLS}."
+        })
+    grid = await run_admitted(
+        "scenarios", service.plan_scenarios, service.get_scenarios,
+        scenarios.affiliation_names, list(author_counts), projection_years
+    )
+    if not grid["results"]:
+        return JSONResponse(status_code=404, content={"error": grid["errors"][0]})
+    with stage_timer("scenarios", "serialize"):
+        body = render_json(ScenarioGridResponse(**grid))
+    return Response(content=body, media_type="application/json")
 
 @api_router.get("/ranking", response_model=RankingResponse)
-def get_ranking(service: PredictionService = Depends(get_prediction_service)):
-    """ Devuelve un ranking de afiliaciones por crecimiento predicho para el próximo año. """
-    ranking = service.get_ranking()
-    return RankingResponse(ranking=ranking)
+async def get_ranking(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Máximo de afiliaciones a devolver."),
+    offset: int = Query(0, ge=0, description="Afiliaciones a omitir (paginación)."),
+    sort_by: Literal['growth', 'growth_percentage'] = Query('growth', description="Criterio de orden."),
+    order: Literal['desc', 'asc'] = Query('desc', description="Dirección del orden."),
+    min_current_publications: Optional[int] = Query(None, ge=0, description="Mínimo de publicaciones del último año real."),
+    min_predicted_publications: Optional[int] = Query(None, ge=0, description="Mínimo de publicaciones predichas."),
+    service: PredictionService = Depends(get_prediction_service)
+):
+    """
+    Devuelve un ranking de afiliaciones por crecimiento predicho para el próximo año.
+    Sin parámetros se devuelve completo, calculado una vez por versión de activos
+    y servido pre-serializado, con ETag. Con `limit`, `offset`, orden o filtros
+    solo se selecciona y serializa la página pedida.
+    """
+    if (limit is not None or offset or sort_by != 'growth' or order != 'desc'
+            or min_current_publications is not None or min_predicted_publications is not None):
+        page = await run_coalesced(
+            "ranking", service.plan_ranking_page, service.get_ranking_page,
+            sort_by, order == 'desc', min_current_publications, min_predicted_publications, offset, limit
+        )
+        with stage_timer("ranking", "serialize"):
+            body = render_json(RankingResponse(**page))
+        return Response(content=body, media_type="application/json")
+
+    version = service.assets_version
+    rendered = response_cache.get("ranking", version)
+    if rendered is None:
+        # Mientras no está en caché, el cálculo y la serialización se hacen una
+        # sola vez para todas las solicitudes que llegan a la vez.
+        rendered = await single_flight.run("ranking", ("render", version), lambda: render_ranking(service, version))
+    return serve_rendered(request, rendered)
+
+async def render_ranking(service: PredictionService, version: str) -> RenderedResponse:
+    """ Calcula el ranking completo y lo guarda pre-serializado para `version`. """
+    ranking = await run_admitted("ranking", service.plan_ranking, service.get_ranking)
+    with stage_timer("ranking", "serialize"):
+        body = render_json(RankingResponse(ranking=ranking, total=len(ranking)))
+    # La compresión de las variantes se hace fuera del event loop
+    return await run_in_threadpool(response_cache.put, "ranking", version, body)
 
 @api_router.get("/model-details", response_model=ModelDetailsResponse)
-def get_model_details(service: PredictionService = Depends(get_prediction_service)):
-    """ Devuelve metadatos sobre el modelo de Machine Learning y los datos utilizados. """
-    details = service.get_model_details()
-    return ModelDetailsResponse(**details)
+def get_model_details(request: Request, service: PredictionService = Depends(get_prediction_service)):
+    """
+    Devuelve metadatos sobre el modelo de Machine Learning y los datos utilizados.
+    Las métricas salen del backtest de la versión vigente, que se calcula en
+    segundo plano; hasta que termina la respuesta no se guarda en caché.
+    """
+    if service.get_backtest() is None:
+        return ModelDetailsResponse(**service.get_model_details())
+    rendered = response_cache.get_or_render("model-details", service.assets_version, lambda: render_json(
+        ModelDetailsResponse(**service.get_model_details())
+    ))
+    return serve_rendered(request, rendered)
+
+@api_router.get("/stats", response_model=ServiceStatsResponse)
+def get_stats(service: PredictionService = Depends(get_prediction_service)):
+    """ Devuelve los contadores de las cachés, del agrupador de micro-lotes, de la agrupación de cálculos y la memoria del worker. """
+    return ServiceStatsResponse(
+        projection_cache=service.get_cache_stats(),
+        batcher=prediction_batcher.stats() if prediction_batcher is not None else None,
+        responses=response_cache.stats(),
+        admission=admission.stats(),
+        coalescing=single_flight.stats(),
+        process={"pid": os.getpid(), "memory": process_memory()}
+    )
@@ -2,7 +2,7 @@
 
 from pydantic import AnyHttpUrl
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     """
@@ -17,6 +17,84 @@ class Settings(BaseSettings):
         "https://centinela.epn.edu.ec"
     ]
 
+    # Token requerido en la cabecera X-Admin-Token para los endpoints de
+    # administración. Si no se define, esos endpoints quedan deshabilitados.
+    ADMIN_TOKEN: Optional[str] = None
+
+    # Carga inicial de activos en segundo plano: reintentos con backoff exponencial
+    # (0 intentos = reintentar sin límite)
+    ASSET_LOAD_MAX_ATTEMPTS: int = 0
+    ASSET_LOAD_RETRY_BASE_SECONDS: float = 1.0
+    ASSET_LOAD_RETRY_MAX_SECONDS: float = 60.0
+
+    # Intervalo (segundos) para revisar si cambiaron los artefactos y recargarlos; 0 = deshabilitado
+    ASSET_WATCH_INTERVAL_SECONDS: float = 0.0
+
+    # Usar el snapshot binario de los activos (publication_data.snapshot) si está al día
+    USE_DATA_SNAPSHOT: bool = True
+    # Compilar el snapshot al cargar si falta o quedó obsoleto (p. ej. tras una
+    # recarga en caliente), para que los workers del host compartan sus páginas
+    # en memoria en lugar de leer cada uno el CSV. Requiere escribir junto a los activos.
+    BUILD_DATA_SNAPSHOT: bool = False
+
+    # Motor de inferencia: "lightgbm" (model.predict) o "numpy" (árboles compilados en NumPy)
+    PREDICTION_BACKEND: str = "lightgbm"
+
+    # Micro-lotes: agrupa las predicciones de solicitudes concurrentes
+    PREDICTION_BATCHING_ENABLED: bool = False
+    PREDICTION_BATCH_WINDOW_MS: float = 2.0
+    PREDICTION_BATCH_MAX_ROWS: int = 4096
+
+    # Caché de proyecciones (0 entradas la desactiva; 0 segundos = sin TTL)
+    PROJECTION_CACHE_MAXSIZE: int = 4096
+    PROJECTION_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Control de admisión por ruta: cálculos simultáneos y tamaño de la cola de
+    # /ranking, /projection/compare y /projection/scenarios (costosas) y de
+    # /projection/{affiliation_name}. Con la cola llena se responde 429; si la
+    # espera supera ADMISSION_QUEUE_TIMEOUT_SECONDS o el plazo, 503. Ambos con Retry-After.
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_HEAVY_MAX_CONCURRENT: int = 4
+    ADMISSION_HEAVY_MAX_QUEUE: int = 32
+    ADMISSION_PROJECTION_MAX_CONCURRENT: int = 32
+    ADMISSION_PROJECTION_MAX_QUEUE: int = 256
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    # Plazo por solicitud (segundos, incluida la espera en cola); al vencer, el
+    # cálculo se interrumpe antes de la siguiente llamada al modelo. 0 = sin plazo.
+    REQUEST_DEADLINE_SECONDS: float = 10.0
+    # Agrupación de solicitudes idénticas en curso (/ranking y
+    # /projection/{affiliation_name}): se calcula una vez y todas reciben el resultado.
+    REQUEST_COALESCING_ENABLED: bool = True
+
+    # Backtest walk-forward para las métricas de /model-details: años de corte
+    # (los más recientes) y años proyectados desde cada uno. Se calcula en
+    # segundo plano una vez por versión de activos.
+    BACKTEST_ENABLED: bool = True
+    BACKTEST_CUTOFFS: int = 5
+    BACKTEST_HORIZON: int = 5
+
+    # Máximo de celdas (afiliaciones x escenarios) por solicitud a /projection/scenarios
+    SCENARIO_GRID_MAX_CELLS: int = 20000
+
+    # max-age de Cache-Control para las respuestas pre-serializadas (/ranking,
+    # /affiliations, /model-details); con 0 el cliente revalida siempre con If-None-Match
+    HTTP_CACHE_MAX_AGE_SECONDS: int = 0
+
+    # Endpoint /metrics (formato Prometheus) y medición de las solicitudes
+    METRICS_ENABLED: bool = True
+
+    # Perfilado por solicitud con un muestreador de pilas: fracción de solicitudes
+    # perfiladas al azar, umbral (segundos) a partir del cual se guarda el perfil
+    # de cualquier solicitud (0 = deshabilitado; mantiene el muestreador siempre
+    # activo) y número de perfiles que se conservan. Con ADMIN_TOKEN definido,
+    # la cabecera X-Debug-Profile con ese token fuerza el perfilado.
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_SLOW_REQUEST_SECONDS: float = 0.0
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_MAX_PROFILES: int = 50
+
     class Config:
         case_sensitive = True
         env_file = ".env"
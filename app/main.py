@@ -1,13 +1,37 @@
 # backend/app/main.py
 
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1.endpoints import analytics 
+from fastapi.responses import JSONResponse, Response
+from app.api.v1.endpoints import analytics, admin
 from app.core.config import settings
+from app.models.schemas import HealthResponse, ReadinessResponse
+from app.services.metrics import MetricsMiddleware, gauges, process_memory, registry
+from app.services.profiler import ProfilingMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    service = analytics.prediction_service
+    # Los activos se cargan en segundo plano: la app arranca de inmediato y
+    # /readyz indica cuándo puede recibir tráfico.
+    service.start_loading(
+        max_attempts=settings.ASSET_LOAD_MAX_ATTEMPTS,
+        retry_base_seconds=settings.ASSET_LOAD_RETRY_BASE_SECONDS,
+        retry_max_seconds=settings.ASSET_LOAD_RETRY_MAX_SECONDS
+    )
+    # Vigilancia opcional de los artefactos para recargarlos en caliente
+    if settings.ASSET_WATCH_INTERVAL_SECONDS > 0:
+        service.start_asset_watcher(settings.ASSET_WATCH_INTERVAL_SECONDS)
+    yield
+    service.stop_background_tasks()
+    admin.stack_sampler.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -18,9 +42,93 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Perfilado opcional: una fracción de las solicitudes, las que traen X-Debug-Profile
+# con el token de administración y las que superan el umbral de lentitud.
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        sampler=admin.stack_sampler,
+        store=admin.profile_store,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        slow_request_seconds=settings.PROFILING_SLOW_REQUEST_SECONDS,
+        debug_token=settings.ADMIN_TOKEN
+    )
+
 # Aquí incluimos el router que importamos correctamente
 app.include_router(analytics.api_router, prefix=settings.API_V1_STR)
+app.include_router(admin.admin_router, prefix=f"{settings.API_V1_STR}/admin")
 
 @app.get("/")
 def read_root():
     return {"message": "Bienvenido al API del Centinela Predictivo de Publicaciones Científicas"}
+
+@app.get("/healthz", response_model=HealthResponse)
+def healthz():
+    """ Liveness: responde mientras el proceso esté vivo, aunque los activos no estén cargados. """
+    return HealthResponse(status="ok")
+
+@app.get("/readyz", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+def readyz():
+    """
+    Readiness: 200 cuando los activos están cargados y el servicio puede
+    recibir tráfico; 503 mientras se cargan o si la carga falló.
+    Incluye la duración de la carga y la versión de los artefactos.
+    """
+    service = analytics.prediction_service
+    ready = service.check_assets_loaded()
+    body = ReadinessResponse(ready=ready, **service.get_assets_status())
+    if not ready:
+        return JSONResponse(status_code=503, content=body.model_dump())
+    return body
+
+def collect_service_metrics():
+    """ Valores del servicio que se leen al exponer las métricas: activos, cachés, memoria y micro-lotes. """
+    service = analytics.prediction_service
+    status = service.get_assets_status()
+    families = [
+        gauges("Activos cargados (1) con su versión y origen.", "assets_info",
+               {"loaded": 1.0 if status["version"] else None},
+               labels={"version": status["version"] or "", "source": status["source"] or ""}),
+        gauges("Duración de la última carga de activos, en segundos.", "assets_load_duration_seconds",
+               {"": status["load_duration_seconds"]}),
+        gauges("Momento de la última carga de activos (epoch, segundos).", "assets_loaded_timestamp_seconds",
+               {"": status["loaded_at"]}),
+        gauges("Recargas en caliente completadas.", "assets_reloads", {"": status["reloads"]}),
+        gauges("Contadores de la caché de proyecciones.", "projection_cache", service.get_cache_stats(),
+               label="stat"),
+        gauges("Contadores de la caché de respuestas pre-serializadas.", "response_cache",
+               analytics.response_cache.stats(), label="stat"),
+    ]
+    families.append(gauges("Memoria del worker en bytes (rss, pss y páginas compartidas/privadas).",
+                           "process_memory_bytes", process_memory(), label="kind",
+                           labels={"pid": str(os.getpid())}))
+    families.append(("gauge", "Control de admisión por ruta (en curso, en cola, admitidas, rechazadas...).", [
+        ("admission", {"route": route, "stat": stat}, float(value))
+        for route, stats in analytics.admission.stats().items() for stat, value in stats.items()
+    ]))
+    families.append(("gauge", "Agrupación de cálculos idénticos por ruta (ejecutados, agrupados, en curso).", [
+        ("request_coalescing", {"route": route, "stat": stat}, float(value))
+        for route, stats in analytics.single_flight.stats().items() for stat, value in stats.items()
+    ]))
+    batcher = analytics.prediction_batcher
+    if batcher is not None:
+        stats = batcher.stats()
+        families.append(gauges("Estado del agrupador de micro-lotes.", "prediction_batcher",
+                               {key: stats[key] for key in ("queue_depth", "pending_rows", "requests", "batches", "rows")},
+                               label="stat"))
+    return families
+
+registry.add_collector(collect_service_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Métricas en formato Prometheus: solicitudes y latencia por ruta, duración
+    de cada etapa del cálculo, tamaño de las llamadas al modelo, cachés y activos.
+    """
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return Response(content=registry.expose(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,7 +1,7 @@
 # backend/app/models/schemas.py
 
-from pydantic import BaseModel, Field
-from typing import List, Literal, Optional, Dict
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, List, Literal, Optional, Dict, Sequence
 
 # --- Modelos de Datos Base ---
 
@@ -22,8 +22,9 @@ class ErrorResponse(BaseModel):
 # --- Endpoints Principales ---
 
 class AffiliationListResponse(BaseModel):
-    """ Respuesta para la lista de todas las afiliaciones disponibles. """
+    """ Respuesta para la lista (o una página de la búsqueda) de afiliaciones disponibles. """
     affiliations: List[str]
+    total: Optional[int] = Field(None, description="Total de afiliaciones que coinciden con la búsqueda")
 
 class ProjectionResponse(BaseModel):
     """ Respuesta para la proyección de una única afiliación. """
@@ -41,6 +42,59 @@ class ComparisonResponse(BaseModel):
     """ Respuesta para la comparación de proyecciones entre varias afiliaciones. """
     results: List[ComparisonData]
 
+# --- Endpoint de Escenarios "What If" ---
+
+class AuthorRange(BaseModel):
+    """ Rango de números hipotéticos de autores: de `start` a `stop` (incluido) cada `step`. """
+    start: int = Field(..., ge=0)
+    stop: int = Field(..., ge=0)
+    step: int = Field(1, ge=1)
+
+    @model_validator(mode="after")
+    def check_bounds(self):
+        if self.stop < self.start:
+            raise ValueError("'stop' debe ser mayor o igual que 'start'.")
+        return self
+
+    def values(self) -> range:
+        return range(self.start, self.stop + 1, self.step)
+
+class ScenarioGridRequest(BaseModel):
+    """ Afiliaciones y números hipotéticos de autores (lista o rango) a combinar. """
+    affiliation_names: List[str] = Field(..., min_length=1)
+    author_counts: Optional[List[int]] = Field(None, min_length=1, description="Números hipotéticos de autores.")
+    author_range: Optional[AuthorRange] = Field(None, description="Alternativa a author_counts.")
+
+    @model_validator(mode="after")
+    def check_scenarios(self):
+        if (self.author_counts is None) == (self.author_range is None):
+            raise ValueError("Indica 'author_counts' o 'author_range' (solo uno de los dos).")
+        if self.author_counts is not None and any(count < 0 for count in self.author_counts):
+            raise ValueError("Los números de autores no pueden ser negativos.")
+        return self
+
+    def scenario_author_counts(self) -> Sequence[int]:
+        """ Números de autores a evaluar; el rango no se materializa (len() es inmediato). """
+        return self.author_counts if self.author_counts is not None else self.author_range.values()
+
+class ScenarioGrid(BaseModel):
+    """
+    Matriz de sensibilidad de una afiliación: `publications[i][j]` son las
+    publicaciones predichas con `author_counts[i]` autores para `years[j]`.
+    """
+    affiliation_name: str
+    last_actual_year: int
+    last_actual_publications: int
+    last_actual_authors: int
+    years: List[int]
+    publications: List[List[int]]
+
+class ScenarioGridResponse(BaseModel):
+    """ Respuesta del análisis de sensibilidad; `errors` lista las afiliaciones omitidas. """
+    author_counts: List[int]
+    results: List[ScenarioGrid]
+    errors: List[str] = []
+
 # --- Endpoint de Ranking ---
 
 class RankingItem(BaseModel):
@@ -53,8 +107,9 @@ class RankingItem(BaseModel):
     growth_percentage: float
 
 class RankingResponse(BaseModel):
-    """ Respuesta para el ranking de afiliaciones por proyección de crecimiento. """
+    """ Respuesta para el ranking (o una página del ranking) de afiliaciones por proyección de crecimiento. """
     ranking: List[RankingItem]
+    total: Optional[int] = Field(None, description="Total de afiliaciones que cumplen los filtros")
 
 # --- Endpoint de Detalles del Modelo (ACTUALIZADO) ---
 
@@ -63,14 +118,118 @@ class ModelPerformance(BaseModel):
     mae: float = Field(..., description="Mean Absolute Error (Error Absoluto Medio)")
     rmse: float = Field(..., description="Root Mean Squared Error (Raíz del Error Cuadrático Medio)")
 
+class BacktestHorizon(BaseModel):
+    """ Error de las proyecciones a `horizon` años en el backtest. """
+    horizon: int
+    samples: int
+    mae: Optional[float] = None
+    rmse: Optional[float] = None
+
+class BacktestSummary(BaseModel):
+    """ Backtest walk-forward de los activos vigentes: años de corte y error por horizonte. """
+    cutoffs: List[int]
+    projections: int
+    horizons: List[BacktestHorizon]
+    computed_at: float
+    duration_seconds: float
+
 class ModelDetailsResponse(BaseModel):
     """ 
     Respuesta que proporciona detalles y metadatos sobre el modelo de ML, 
     basado en los resultados del notebook de entrenamiento.
     """
     model_type: str
-    training_data_range: str
+    training_data_range: str = Field(..., description="Datos con los que se entrenó el modelo (según el notebook)")
+    historical_data_range: Optional[str] = Field(
+        None, description="Años cubiertos por los datos históricos cargados, desde los que se proyecta"
+    )
     target_variable: str
     total_affiliations: int
     performance_metrics: ModelPerformance
+    performance_source: Literal['backtest', 'notebook'] = Field(
+        'notebook', description="Origen de performance_metrics: el backtest (con muestras a un año) o el notebook"
+    )
+    backtest: Optional[BacktestSummary] = None
     feature_importances: Dict[str, float]
+
+
+# --- Endpoint de Estadísticas del Servicio ---
+
+class ServiceStatsResponse(BaseModel):
+    """ Contadores internos del servicio: cachés, micro-lotes, control de admisión, agrupación de cálculos y memoria. """
+    projection_cache: Dict[str, int]
+    batcher: Optional[Dict[str, Any]] = None
+    responses: Optional[Dict[str, int]] = None
+    admission: Optional[Dict[str, Dict[str, int]]] = None
+    coalescing: Optional[Dict[str, Dict[str, int]]] = Field(
+        None, description="Por ruta: cálculos ejecutados y solicitudes que esperaron uno idéntico en curso"
+    )
+    process: Optional[Dict[str, Any]] = Field(None, description="PID y memoria (bytes) del worker que respondió")
+
+
+# --- Endpoints de Administración ---
+
+class AssetsStatusResponse(BaseModel):
+    """ Versión de los activos vigentes y estado de la recarga en caliente. """
+    version: Optional[str] = None
+    loaded_at: Optional[float] = None
+    load_duration_seconds: Optional[float] = None
+    source: Optional[Literal['csv', 'snapshot', 'incremental']] = None
+    artifacts: Optional[Dict[str, str]] = None
+    state: Literal['idle', 'loading', 'failed']
+    last_error: Optional[str] = None
+    last_reload_at: Optional[float] = None
+    reloads: int
+    attempts: int
+
+class HistoricalRow(BaseModel):
+    """ Fila agregada de publication_data.csv recalculada por la ingesta incremental. """
+    affiliation_name: str
+    year: int
+    publication_count: int = Field(..., ge=0)
+    distinct_authors: int = Field(..., ge=0)
+
+class HistoricalPatchRequest(BaseModel):
+    """ Filas a aplicar en memoria y SHA-256 del publication_data.csv que ya las incluye. """
+    rows: List[HistoricalRow]
+    historical_data_sha256: Optional[str] = None
+
+class HistoricalPatchResponse(BaseModel):
+    """ Resultado de aplicar una ingesta incremental sobre los activos vigentes. """
+    version: str
+    rows: int
+    affected_affiliations: int
+    invalidated_cache_entries: int
+
+class ProfileHotSpot(BaseModel):
+    """ Función de la aplicación y muestras en las que era el marco de app/ más cercano a la hoja. """
+    frame: str
+    samples: int
+
+class ProfileSummary(BaseModel):
+    """ Metadatos de un perfil de solicitud guardado en el buffer circular. """
+    id: int
+    method: str
+    path: str
+    status: int
+    duration_seconds: float
+    reason: Literal['sampled', 'header', 'slow']
+    samples: int
+    interval_ms: float
+    captured_at: float
+    hot_spots: List[ProfileHotSpot]
+
+class ProfileListResponse(BaseModel):
+    """ Perfiles disponibles, del más reciente al más antiguo. """
+    enabled: bool
+    profiles: List[ProfileSummary]
+
+# --- Endpoints de Salud ---
+
+class HealthResponse(BaseModel):
+    """ Respuesta de liveness: el proceso está vivo y atiende solicitudes. """
+    status: str
+
+class ReadinessResponse(AssetsStatusResponse):
+    """ Respuesta de readiness: indica si los activos están cargados y su versión. """
+    ready: bool
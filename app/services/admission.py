@@ -0,0 +1,167 @@
+# backend/app/services/admission.py
+
+"""
+Control de admisión de las rutas costosas.
+
+Cada ruta tiene un límite de cálculos simultáneos y una cola acotada: si la
+cola está llena la solicitud se rechaza de inmediato, y si espera más que el
+tiempo máximo de cola (o que su plazo) se descarta. Así un pico de /ranking o
+de comparaciones largas no ocupa todo el threadpool y las proyecciones
+individuales siguen respondiendo.
+
+El plazo por solicitud se aplica además entre los pasos de un plan de
+cálculo (within_deadline): un plan que se queda sin tiempo se interrumpe
+antes de la siguiente llamada al modelo.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Generator, Optional
+
+
+class Overloaded(Exception):
+    """La solicitud no fue admitida: cola llena ('queue_full') o espera agotada ('timeout')."""
+    def __init__(self, route: str, reason: str):
+        super().__init__(f"{route}: {reason}")
+        self.route = route
+        self.reason = reason
+
+
+class DeadlineExceeded(Exception):
+    """El plan de cálculo no terminó dentro del plazo de la solicitud."""
+
+
+def within_deadline(plan: Generator, deadline: Optional[float]) -> Generator:
+    """
+    Envuelve un plan de cálculo (ver PredictionService.plan_projections) y lo
+    interrumpe con DeadlineExceeded si se pasa el plazo (time.monotonic())
+    antes de entregar el siguiente paso.
+    """
+    if deadline is None:
+        return (yield from plan)
+    try:
+        step = next(plan)
+        while True:
+            if time.monotonic() > deadline:
+                plan.close()
+                raise DeadlineExceeded()
+            step = plan.send((yield step))
+    except StopIteration as stop:
+        return stop.value
+
+
+class ConcurrencyLimiter:
+    """
+    Límite de cálculos simultáneos de una ruta, con una cola FIFO acotada.
+    Pensado para usarse desde el event loop (no es seguro entre hilos).
+    """
+    def __init__(self, route: str, max_concurrent: int, max_queue: int, queue_timeout_seconds: float):
+        self.route = route
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.deadline_exceeded = 0
+
+    @asynccontextmanager
+    async def admit(self, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Ocupa un lugar durante el bloque. Lanza Overloaded si la cola está
+        llena o si la espera supera el tiempo de cola o el plazo de la solicitud.
+        """
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+        else:
+            await self._wait(deadline)
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _wait(self, deadline: Optional[float]) -> None:
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.route, "queue_full")
+        timeout = self.queue_timeout_seconds if self.queue_timeout_seconds > 0 else None
+        if deadline is not None:
+            remaining = max(0.0, deadline - time.monotonic())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # El lugar se entregó justo al vencer la espera: se devuelve
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timed_out += 1
+            raise Overloaded(self.route, "timeout")
+
+    def _release(self) -> None:
+        # El lugar pasa directamente al siguiente en la cola (active no cambia)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "deadline_exceeded": self.deadline_exceeded,
+        }
+
+
+class AdmissionController:
+    """Limitadores por ruta y plazo por solicitud."""
+    def __init__(self, limits: Dict[str, Any], queue_timeout_seconds: float = 2.0,
+                 deadline_seconds: float = 0.0, enabled: bool = True):
+        """`limits` asocia cada ruta con (máximo simultáneo, máximo en cola)."""
+        self.enabled = enabled
+        self.deadline_seconds = deadline_seconds
+        self.limiters: Dict[str, ConcurrencyLimiter] = {
+            route: ConcurrencyLimiter(route, max_concurrent, max_queue, queue_timeout_seconds)
+            for route, (max_concurrent, max_queue) in limits.items()
+        }
+
+    def deadline(self) -> Optional[float]:
+        """Plazo (time.monotonic()) de una solicitud que empieza ahora, o None sin plazo."""
+        return time.monotonic() + self.deadline_seconds if self.deadline_seconds > 0 else None
+
+    @asynccontextmanager
+    async def admit(self, route: str, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        limiter = self.limiters.get(route)
+        if not self.enabled or limiter is None:
+            yield
+            return
+        async with limiter.admit(deadline):
+            yield
+
+    def record_deadline_exceeded(self, route: str) -> None:
+        limiter = self.limiters.get(route)
+        if limiter is not None:
+            limiter.deadline_exceeded += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {route: limiter.stats() for route, limiter in self.limiters.items()}
@@ -0,0 +1,205 @@
+# backend/app/services/affiliation_index.py
+
+import numpy as np
+import pandas as pd
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from app.services.data_snapshot import narrowest_int_dtype
+
+
+def compact(values: np.ndarray) -> np.ndarray:
+    """Columna por fila con el tipo entero más angosto que la contiene (como en el snapshot)."""
+    return values.astype(narrowest_int_dtype(values), copy=False)
+
+
+class AffiliationEntry(NamedTuple):
+    """
+    Posición de una afiliación dentro del índice: el rango contiguo
+    [start, stop) de sus filas ordenadas por año, su código en el encoder
+    y los valores de su último año real.
+    """
+    start: int
+    stop: int
+    encoded: Optional[int]
+    last_year: int
+    last_publications: int
+    last_authors: int
+
+
+class AffiliationIndex:
+    """
+    Índice de los datos históricos por afiliación.
+
+    Las filas están ordenadas por (afiliación, año) y cada afiliación ocupa un
+    rango contiguo de arreglos NumPy, descrito por una tabla de offsets, de
+    modo que obtener su historia es una búsqueda O(1) en un diccionario en
+    lugar de un filtro sobre toda la tabla.
+    """
+    def __init__(self, affiliation_names: Sequence[str], offsets: np.ndarray, years: np.ndarray,
+                 publications: np.ndarray, authors: np.ndarray, encoder_classes: Sequence[str]):
+        """
+        `affiliation_names[i]` ocupa las filas `offsets[i]:offsets[i + 1]` de los
+        arreglos por fila (`years`, `publications`, `authors`), ya ordenadas por año.
+        """
+        self.affiliation_names: List[str] = list(affiliation_names)
+        self.offsets = offsets
+        self.years = years
+        self.publications = publications
+        self.authors = authors
+
+        self.encoded_by_name: Dict[str, int] = {name: i for i, name in enumerate(encoder_classes)}
+
+        starts = offsets[:-1].tolist()
+        stops = offsets[1:].tolist()
+        lasts = np.asarray(offsets[1:], dtype=np.int64) - 1
+        last_years = years[lasts].tolist()
+        last_publications = publications[lasts].tolist()
+        last_authors = authors[lasts].tolist()
+
+        self._entries: Dict[str, AffiliationEntry] = {}
+        for i, name in enumerate(self.affiliation_names):
+            self._entries[name] = AffiliationEntry(
+                start=starts[i],
+                stop=stops[i],
+                encoded=self.encoded_by_name.get(name),
+                last_year=last_years[i],
+                last_publications=last_publications[i],
+                last_authors=last_authors[i],
+            )
+
+        # Último año real de cada afiliación con historia, en el orden del
+        # encoder, listo para evaluar a todas las afiliaciones en un solo lote.
+        latest = [(name, self._entries[name]) for name in encoder_classes if name in self._entries]
+        self.latest_names: List[str] = [name for name, _ in latest]
+        self.latest_encoded = np.array([e.encoded for _, e in latest], dtype=np.int64)
+        self.latest_years = np.array([e.last_year for _, e in latest], dtype=np.int64)
+        self.latest_publications = np.array([e.last_publications for _, e in latest], dtype=np.int64)
+        self.latest_authors = np.array([e.last_authors for _, e in latest], dtype=np.int64)
+
+    @classmethod
+    def from_dataframe(cls, historical_df: pd.DataFrame, encoder_classes: Sequence[str]) -> "AffiliationIndex":
+        """Construye el índice a partir del DataFrame histórico (publication_data.csv)."""
+        df = historical_df.sort_values(['affiliation_name', 'year'], kind='stable').reset_index(drop=True)
+
+        names = df['affiliation_name'].to_numpy(dtype=object)
+        n_rows = len(names)
+        if n_rows:
+            boundaries = np.flatnonzero(names[1:] != names[:-1]) + 1
+            starts = np.concatenate(([0], boundaries))
+        else:
+            starts = np.empty(0, dtype=np.int64)
+        offsets = np.append(starts, n_rows).astype(np.int64)
+
+        return cls(
+            names[starts].tolist(),
+            offsets,
+            compact(df['year'].to_numpy(dtype=np.int64)),
+            compact(df['publication_count'].to_numpy(dtype=np.int64)),
+            compact(df['distinct_authors'].to_numpy(dtype=np.int64)),
+            encoder_classes,
+        )
+
+    def with_updates(self, rows: Sequence[Tuple[str, int, int, int]],
+                     encoder_classes: Sequence[str]) -> "AffiliationIndex":
+        """
+        Devuelve un índice nuevo con filas (afiliación, año, publicaciones,
+        autores) agregadas o reemplazadas. Solo se fusionan las filas de las
+        afiliaciones afectadas; las demás se copian en bloque, un slice por
+        cada tramo entre dos afiliaciones afectadas. La tabla de entradas del
+        índice nuevo se arma completa, como en el constructor (O(N)).
+        """
+        updates: Dict[str, Dict[int, Tuple[int, int]]] = {}
+        for name, year, publications, authors in rows:
+            updates.setdefault(name, {})[int(year)] = (int(publications), int(authors))
+
+        year_parts, publication_parts, author_parts = [], [], []
+        counts = np.diff(self.offsets)
+        replaced: Dict[int, int] = {}
+        inserted: List[Tuple[int, str, int]] = []
+        cursor = 0
+        for name in sorted(updates):
+            entry = self._entries.get(name)
+            position = bisect_left(self.affiliation_names, name)
+            start = entry.start if entry is not None else int(self.offsets[position])
+            # Tramo sin cambios entre la afiliación afectada anterior y esta
+            year_parts.append(self.years[cursor:start])
+            publication_parts.append(self.publications[cursor:start])
+            author_parts.append(self.authors[cursor:start])
+
+            merged: Dict[int, Tuple[int, int]] = {}
+            if entry is not None:
+                merged = {
+                    year: (publications, authors) for year, publications, authors in zip(
+                        self.years[entry.start:entry.stop].tolist(),
+                        self.publications[entry.start:entry.stop].tolist(),
+                        self.authors[entry.start:entry.stop].tolist(),
+                    )
+                }
+            merged.update(updates[name])
+            years = sorted(merged)
+            year_parts.append(np.array(years, dtype=np.int64))
+            publication_parts.append(np.array([merged[y][0] for y in years], dtype=np.int64))
+            author_parts.append(np.array([merged[y][1] for y in years], dtype=np.int64))
+
+            if entry is not None:
+                replaced[position] = len(years)
+                cursor = entry.stop
+            else:
+                inserted.append((position, name, len(years)))
+                cursor = start
+        year_parts.append(self.years[cursor:])
+        publication_parts.append(self.publications[cursor:])
+        author_parts.append(self.authors[cursor:])
+
+        counts = counts.copy()
+        for position, count in replaced.items():
+            counts[position] = count
+        names = list(self.affiliation_names)
+        if inserted:
+            # np.insert usa las posiciones del arreglo original, como bisect_left
+            counts = np.insert(counts, [position for position, _, _ in inserted],
+                               [count for _, _, count in inserted])
+            for position, name, _ in reversed(inserted):
+                names.insert(position, name)
+        offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        def concat(parts: List[np.ndarray]) -> np.ndarray:
+            return compact(np.concatenate(parts).astype(np.int64, copy=False))
+
+        return AffiliationIndex(
+            names, offsets, concat(year_parts), concat(publication_parts), concat(author_parts), encoder_classes
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, affiliation_name: str) -> bool:
+        return affiliation_name in self._entries
+
+    def is_known(self, affiliation_name: str) -> bool:
+        """Indica si la afiliación existe en el encoder del modelo."""
+        return affiliation_name in self.encoded_by_name
+
+    def get(self, affiliation_name: str) -> Optional[AffiliationEntry]:
+        """Devuelve la entrada de la afiliación o None si no tiene historia."""
+        return self._entries.get(affiliation_name)
+
+    def history(self, entry: AffiliationEntry) -> List[Dict]:
+        """Devuelve los puntos históricos (tipo 'actual') de una afiliación."""
+        years = self.years[entry.start:entry.stop].tolist()
+        pubs = self.publications[entry.start:entry.stop].tolist()
+        return [
+            {"year": year, "publications": publications, "type": 'actual'}
+            for year, publications in zip(years, pubs)
+        ]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Reconstruye la tabla histórica (ordenada por afiliación y año)."""
+        counts = np.diff(self.offsets)
+        return pd.DataFrame({
+            'affiliation_name': np.repeat(np.array(self.affiliation_names, dtype=object), counts),
+            'year': np.asarray(self.years, dtype=np.int64),
+            'publication_count': np.asarray(self.publications, dtype=np.int64),
+            'distinct_authors': np.asarray(self.authors, dtype=np.int64),
+        })
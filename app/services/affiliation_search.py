@@ -0,0 +1,111 @@
+# backend/app/services/affiliation_search.py
+
+import bisect
+import re
+import unicodedata
+from collections import Counter
+from itertools import chain
+from typing import Dict, List, Sequence, Set, Tuple
+
+# Similitud mínima (trigramas compartidos / trigramas de la consulta) para una coincidencia aproximada
+FUZZY_MIN_SIMILARITY = 0.5
+NGRAM_SIZE = 3
+
+# Niveles de relevancia, de mejor a peor
+_EXACT, _PREFIX, _WORD_PREFIX, _SUBSTRING, _FUZZY = range(5)
+_TOKEN_SPLIT = re.compile(r"[^\w]+")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin tildes ni diacríticos y con los espacios colapsados."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def ngrams(text: str) -> Set[str]:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class AffiliationSearchIndex:
+    """
+    Índice de búsqueda sobre los nombres de afiliación, construido una vez por
+    versión de activos:
+
+    - un diccionario para la búsqueda exacta (nombre original o normalizado),
+    - una lista ordenada de nombres normalizados para búsquedas por prefijo,
+    - una lista ordenada de palabras para el prefijo de cualquier palabra,
+    - un índice invertido de trigramas para subcadenas y coincidencias
+      aproximadas (errores de tipeo), sin distinguir mayúsculas ni tildes.
+
+    Los resultados se ordenan por relevancia: coincidencia exacta, prefijo del
+    nombre, prefijo de una palabra, subcadena y, por último, aproximadas.
+    """
+    def __init__(self, names: Sequence[str]):
+        self.names: List[str] = [str(name) for name in names]
+        self._normalized: List[str] = [normalize(name) for name in self.names]
+
+        self.position_by_name: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self._positions_by_normalized: Dict[str, List[int]] = {}
+        for i, norm in enumerate(self._normalized):
+            self._positions_by_normalized.setdefault(norm, []).append(i)
+
+        self._prefix_keys: List[Tuple[str, int]] = sorted((norm, i) for i, norm in enumerate(self._normalized))
+        self._token_keys: List[Tuple[str, int]] = sorted({
+            (token, i) for i, norm in enumerate(self._normalized) for token in _TOKEN_SPLIT.split(norm) if token
+        })
+
+        postings: Dict[str, Set[int]] = {}
+        for i, norm in enumerate(self._normalized):
+            for gram in ngrams(norm):
+                postings.setdefault(gram, set()).add(i)
+        self._postings: Dict[str, Set[int]] = postings
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.position_by_name
+
+    @staticmethod
+    def _prefix_range(keys: List[Tuple[str, int]], prefix: str) -> List[int]:
+        start = bisect.bisect_left(keys, (prefix, -1))
+        stop = bisect.bisect_left(keys, (prefix + "\U0010ffff", -1))
+        return [position for _, position in keys[start:stop]]
+
+    def search(self, query: str) -> List[str]:
+        """Devuelve todos los nombres que coinciden con la consulta, ordenados por relevancia."""
+        q = normalize(query)
+        if not q:
+            return list(self.names)
+
+        # Mejor nivel de cada posición; los niveles se evalúan de mejor a peor.
+        tier_of: Dict[int, int] = {}
+        for tier, positions in (
+            (_EXACT, self._positions_by_normalized.get(q, [])),
+            (_PREFIX, self._prefix_range(self._prefix_keys, q)),
+            (_WORD_PREFIX, self._prefix_range(self._token_keys, q)),
+        ):
+            for position in positions:
+                tier_of.setdefault(position, tier)
+
+        # Consultas de uno o dos caracteres: solo prefijos, para no devolver casi todo.
+        fuzzy: Dict[int, float] = {}
+        query_grams = ngrams(q)
+        if query_grams:
+            counts = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in query_grams))
+            total = len(query_grams)
+            for position, shared in counts.items():
+                if position in tier_of:
+                    continue
+                if shared == total and q in self._normalized[position]:
+                    tier_of[position] = _SUBSTRING
+                elif shared >= total * FUZZY_MIN_SIMILARITY:
+                    fuzzy[position] = shared / total
+
+        buckets: List[List[int]] = [[] for _ in range(_FUZZY)]
+        for position, tier in tier_of.items():
+            buckets[tier].append(position)
+        order = [position for bucket in buckets for position in sorted(bucket)]
+        order.extend(sorted(fuzzy, key=lambda position: (-fuzzy[position], position)))
+        return [self.names[position] for position in order]
@@ -0,0 +1,224 @@
+# backend/app/services/asset_bundle.py
+
+import hashlib
+import threading
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app.services.affiliation_index import AffiliationIndex
+from app.services.affiliation_search import AffiliationSearchIndex
+from app.services.data_snapshot import build_snapshot_once, file_sha256, load_snapshot
+from app.services.metrics import model_predict_batch_rows, model_predict_duration_seconds
+from app.services.tree_engine import TreeEnsemble
+
+FEATURE_COLUMNS = ['year', 'affiliation_encoded', 'publication_count', 'distinct_authors']
+
+
+def fingerprint_sources(source_hashes: Dict[str, str]) -> str:
+    """Versión de los activos: huella abreviada de los SHA-256 de sus archivos fuente."""
+    digest = hashlib.sha256()
+    for role in sorted(source_hashes):
+        digest.update(f"{role}:{source_hashes[role]};".encode())
+    return digest.hexdigest()[:16]
+
+
+def compile_tree_engine(model, index: AffiliationIndex) -> Optional[TreeEnsemble]:
+    """
+    Compila el motor NumPy y verifica que reproduzca model.predict sobre el
+    último año de cada afiliación. Ante cualquier diferencia devuelve None y
+    se sigue usando LightGBM.
+    """
+    try:
+        engine = TreeEnsemble.from_model(model)
+        sample = np.column_stack((
+            index.latest_years + 1, index.latest_encoded, index.latest_publications, index.latest_authors
+        ))
+        expected = model.predict(pd.DataFrame(sample, columns=FEATURE_COLUMNS))
+        if not np.allclose(engine.predict(sample), expected, rtol=0, atol=1e-9):
+            raise ValueError("las predicciones no coinciden con model.predict")
+    except Exception as e:
+        print(f"WARNING: No se pudo usar el motor NumPy, se usará LightGBM: {e}")
+        return None
+    return engine
+
+
+class AssetBundle:
+    """
+    Conjunto inmutable de activos de una versión: modelo, encoder, datos
+    históricos y todo lo que se deriva de ellos (índice por afiliación, motor
+    de inferencia NumPy).
+
+    Un bundle se construye completo antes de publicarse, de modo que el
+    servicio puede reemplazarlo con una sola asignación: las solicitudes en
+    curso terminan con el bundle que tomaron al empezar y ninguna ve un estado
+    a medio cargar.
+
+    Los activos pueden venir del CSV y los .pkl o de un snapshot binario
+    (ver data_snapshot). En el segundo caso el modelo y el encoder solo se
+    deserializan si algo los necesita: con el motor NumPy y el snapshot al
+    día no hace falta importar LightGBM para atender solicitudes.
+    """
+    def __init__(self, version: str, affiliation_index: AffiliationIndex, encoder_classes: np.ndarray,
+                 model_path: Path, encoder_path: Path, model=None, encoder=None,
+                 historical_df: Optional[pd.DataFrame] = None, tree_engine: Optional[TreeEnsemble] = None,
+                 model_metadata: Optional[Dict] = None, source: str = "csv",
+                 source_hashes: Optional[Dict[str, str]] = None, load_started_at: Optional[float] = None,
+                 search_index: Optional[AffiliationSearchIndex] = None):
+        started = load_started_at if load_started_at is not None else time.perf_counter()
+        self.version = version
+        self.affiliation_index = affiliation_index
+        self.encoder_classes = encoder_classes
+        # Índice de búsqueda de nombres (solo depende de las clases del encoder)
+        self.search_index = search_index if search_index is not None else AffiliationSearchIndex(encoder_classes)
+        self.tree_engine = tree_engine
+        self.source = source
+        # SHA-256 de cada archivo fuente (modelo, encoder, datos históricos)
+        self.source_hashes: Dict[str, str] = dict(source_hashes or {})
+        self._model_path = model_path
+        self._encoder_path = encoder_path
+        self._model = model
+        self._encoder = encoder
+        self._historical_df = historical_df
+        self._model_metadata = model_metadata
+        self._lazy_lock = threading.Lock()
+        self.loaded_at = time.time()
+        self.load_duration_seconds = time.perf_counter() - started
+
+    @classmethod
+    def load(cls, model_path: Path, encoder_path: Path, historical_data_path: Path,
+             backend: str = "lightgbm", snapshot_path: Optional[Path] = None,
+             build_snapshot: bool = False) -> "AssetBundle":
+        """
+        Carga los activos: desde el snapshot si existe y corresponde exactamente
+        a los archivos actuales, o desde los archivos .pkl y .csv si no. Con
+        `build_snapshot` un snapshot ausente u obsoleto se compila antes (una
+        sola vez por host), para que todos los workers compartan sus páginas.
+        """
+        started = time.perf_counter()
+        source_hashes = {
+            "model": file_sha256(model_path),
+            "encoder": file_sha256(encoder_path),
+            "historical_data": file_sha256(historical_data_path),
+        }
+        version = fingerprint_sources(source_hashes)
+
+        snapshot = load_snapshot(snapshot_path, source_hashes) if snapshot_path is not None else None
+        if snapshot is None and snapshot_path is not None and build_snapshot:
+            snapshot = build_snapshot_once(snapshot_path, model_path, encoder_path, historical_data_path,
+                                           source_hashes)
+        if snapshot is not None:
+            index = AffiliationIndex(
+                snapshot.affiliation_names, snapshot.offsets, snapshot.year,
+                snapshot.publication_count, snapshot.distinct_authors, snapshot.encoder_classes
+            )
+            tree_engine = None
+            tree_arrays = snapshot.tree_arrays()
+            if backend == "numpy" and tree_arrays is not None:
+                tree_engine = TreeEnsemble.from_arrays(tree_arrays, snapshot.model_metadata["tree_engine"])
+            # Sin motor NumPy las predicciones necesitan el modelo desde el inicio.
+            model = joblib.load(model_path) if tree_engine is None else None
+            if backend == "numpy" and tree_engine is None:
+                tree_engine = compile_tree_engine(model, index)
+            return cls(
+                version, index, snapshot.encoder_classes, model_path, encoder_path,
+                model=model, tree_engine=tree_engine, model_metadata=snapshot.model_metadata,
+                source="snapshot", source_hashes=source_hashes, load_started_at=started
+            )
+
+        model = joblib.load(model_path)
+        encoder = joblib.load(encoder_path)
+        # Del CSV solo se conserva el índice (arreglos con tipos angostos); la
+        # tabla se reconstruye desde él si alguien la pide.
+        index = AffiliationIndex.from_dataframe(pd.read_csv(historical_data_path), encoder.classes_)
+        tree_engine = compile_tree_engine(model, index) if backend == "numpy" else None
+        return cls(
+            version, index, encoder.classes_, model_path, encoder_path,
+            model=model, encoder=encoder, tree_engine=tree_engine,
+            source="csv", source_hashes=source_hashes, load_started_at=started
+        )
+
+    def with_historical_updates(self, rows: List[Tuple[str, int, int, int]],
+                                historical_data_sha256: Optional[str] = None) -> "AssetBundle":
+        """
+        Bundle nuevo con filas (afiliación, año, publicaciones, autores) de la
+        ingesta incremental aplicadas sobre los datos históricos. El modelo, el
+        encoder, el motor NumPy y el índice de búsqueda se comparten con este
+        bundle; solo se reconstruye el índice por afiliación.
+
+        `historical_data_sha256` es el SHA-256 del publication_data.csv que ya
+        incluye esas filas; si no se indica, la huella se deriva de la anterior
+        y de las filas aplicadas.
+        """
+        started = time.perf_counter()
+        index = self.affiliation_index.with_updates(rows, self.encoder_classes)
+        if historical_data_sha256 is None:
+            digest = hashlib.sha256(self.source_hashes.get("historical_data", "").encode())
+            for row in rows:
+                digest.update(repr(tuple(row)).encode())
+            historical_data_sha256 = digest.hexdigest()
+        source_hashes = dict(self.source_hashes, historical_data=historical_data_sha256)
+        return AssetBundle(
+            fingerprint_sources(source_hashes), index, self.encoder_classes, self._model_path, self._encoder_path,
+            model=self._model, encoder=self._encoder, tree_engine=self.tree_engine,
+            model_metadata=self._model_metadata, source="incremental", source_hashes=source_hashes,
+            load_started_at=started, search_index=self.search_index
+        )
+
+    @property
+    def model(self):
+        """El LGBMRegressor; se deserializa en el primer acceso si vino de un snapshot."""
+        if self._model is None:
+            with self._lazy_lock:
+                if self._model is None:
+                    self._model = joblib.load(self._model_path)
+        return self._model
+
+    @property
+    def encoder(self):
+        """El LabelEncoder; se deserializa en el primer acceso si vino de un snapshot."""
+        if self._encoder is None:
+            with self._lazy_lock:
+                if self._encoder is None:
+                    self._encoder = joblib.load(self._encoder_path)
+        return self._encoder
+
+    @property
+    def historical_df(self) -> pd.DataFrame:
+        """Tabla histórica (fuera del camino de las solicitudes); se reconstruye desde el índice."""
+        if self._historical_df is None:
+            with self._lazy_lock:
+                if self._historical_df is None:
+                    self._historical_df = self.affiliation_index.to_dataframe()
+        return self._historical_df
+
+    @property
+    def feature_names(self) -> List[str]:
+        if self._model_metadata is not None:
+            return list(self._model_metadata["feature_names"])
+        return list(self.model.feature_name_)
+
+    @property
+    def feature_importances(self) -> List[int]:
+        if self._model_metadata is not None:
+            return list(self._model_metadata["feature_importances"])
+        return [int(v) for v in self.model.feature_importances_]
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """
+        Ejecuta el modelo sobre una matriz de características (una fila por
+        afiliación, columnas en el orden de FEATURE_COLUMNS) con una sola
+        llamada a predict y redondea al entero más cercano.
+        """
+        backend = "numpy" if self.tree_engine is not None else "lightgbm"
+        started = time.perf_counter()
+        if self.tree_engine is not None:
+            predictions = self.tree_engine.predict(features)
+        else:
+            input_data = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+            predictions = self.model.predict(input_data)
+        model_predict_duration_seconds.observe(time.perf_counter() - started, backend)
+        model_predict_batch_rows.observe(len(features), backend)
+        return np.rint(predictions).astype(np.int64)
@@ -0,0 +1,232 @@
+# backend/app/services/batch_projection.py
+
+"""
+Proyección por lotes de todas las afiliaciones, fuera del servidor.
+
+Reparte las afiliaciones en fragmentos entre un pool de procesos; cada
+proceso carga los activos una sola vez (con la misma configuración que el
+servicio) y proyecta sus fragmentos con PredictionService.get_projections.
+Los resultados se escriben en orden a medida que llegan, con un número
+acotado de fragmentos en vuelo, de modo que la memoria no crece con el
+número de afiliaciones.
+
+Salida en formato largo, una fila por afiliación y año proyectado:
+affiliation_name, year, horizon (1..N), predicted_publications.
+
+Uso:
+    python -m app.services.batch_projection --output projections.parquet --years 20 --workers 4
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Opcional: sin pyarrow solo se puede escribir CSV
+    pyarrow = None
+
+OUTPUT_COLUMNS = ["affiliation_name", "year", "horizon", "predicted_publications"]
+
+# Servicio del proceso actual (uno por worker del pool)
+_worker_service = None
+
+
+def init_worker(model_path: Path, encoder_path: Path, data_path: Path, snapshot_path: Optional[Path]) -> None:
+    """Inicializador de cada proceso: carga los activos una vez, sin caché de proyecciones."""
+    global _worker_service
+    from app.core.config import settings
+    from app.services.asset_bundle import AssetBundle
+    from app.services.prediction_service import PredictionService
+    from app.services.projection_cache import ProjectionCache
+
+    service = PredictionService(load_assets=False)
+    # Cada afiliación se proyecta una sola vez: la caché solo ocuparía memoria
+    service.projection_cache = ProjectionCache(maxsize=0)
+    service._swap_bundle(AssetBundle.load(
+        Path(model_path), Path(encoder_path), Path(data_path),
+        backend=settings.PREDICTION_BACKEND,
+        snapshot_path=Path(snapshot_path) if snapshot_path is not None else None
+    ))
+    _worker_service = service
+
+
+def project_shard(affiliation_names: Sequence[str], projection_years: int) -> Dict[str, np.ndarray]:
+    """Proyecta un fragmento de afiliaciones y devuelve sus filas como columnas."""
+    results = _worker_service.get_projections(list(affiliation_names), projection_years)
+    names: List[str] = []
+    years: List[int] = []
+    publications: List[int] = []
+    skipped = 0
+    for result in results:
+        if "error" in result:
+            skipped += 1
+            continue
+        predicted = result["data"][-projection_years:]
+        names.extend([result["affiliation_name"]] * len(predicted))
+        years.extend(point["year"] for point in predicted)
+        publications.extend(point["publications"] for point in predicted)
+    return {
+        "affiliation_name": np.array(names, dtype=object),
+        "year": np.array(years, dtype=np.int32),
+        "horizon": np.tile(np.arange(1, projection_years + 1, dtype=np.int16), len(names) // projection_years),
+        "predicted_publications": np.array(publications, dtype=np.int64),
+        "skipped": skipped,
+    }
+
+
+class ShardWriter:
+    """Escribe los fragmentos en un único archivo Parquet o CSV, a medida que llegan."""
+    def __init__(self, path: Path, output_format: str):
+        if output_format == "parquet" and pyarrow is None:
+            raise RuntimeError("Para escribir Parquet se necesita el paquete 'pyarrow' (ver requirements-optional.txt) o usa --format csv.")
+        self.path = Path(path)
+        self.output_format = output_format
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._writer = None
+        self._wrote_header = False
+        self.rows = 0
+
+    def write(self, shard: Dict[str, np.ndarray]) -> None:
+        frame = pd.DataFrame({column: shard[column] for column in OUTPUT_COLUMNS})
+        if self.output_format == "parquet":
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pyarrow.parquet.ParquetWriter(self.tmp_path, table.schema)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.tmp_path, mode="a" if self._wrote_header else "w",
+                         header=not self._wrote_header, index=False)
+            self._wrote_header = True
+        self.rows += len(frame)
+
+    def close(self) -> None:
+        """Cierra el archivo y lo publica con un reemplazo atómico."""
+        if self.output_format == "parquet":
+            if self._writer is None:
+                self.write({column: np.array([], dtype=object if column == "affiliation_name" else np.int64)
+                            for column in OUTPUT_COLUMNS})
+            self._writer.close()
+        elif not self._wrote_header:
+            self.write({column: np.array([]) for column in OUTPUT_COLUMNS})
+        os.replace(self.tmp_path, self.path)
+
+
+def load_affiliation_names(encoder_path: Path) -> List[str]:
+    import joblib
+    return joblib.load(encoder_path).classes_.tolist()
+
+
+def run_batch_projection(output: Path, projection_years: int, workers: int, shard_size: int,
+                         model_path: Path, encoder_path: Path, data_path: Path,
+                         snapshot_path: Optional[Path] = None, output_format: Optional[str] = None,
+                         affiliation_names: Optional[List[str]] = None) -> Dict[str, float]:
+    """
+    Proyecta todas las afiliaciones del encoder (o las indicadas) a
+    `projection_years` años y escribe el resultado en `output`.
+    Devuelve un resumen con las filas escritas, el tiempo y las filas por segundo.
+    """
+    output_format = output_format or ("parquet" if Path(output).suffix == ".parquet" else "csv")
+    names = affiliation_names if affiliation_names is not None else load_affiliation_names(encoder_path)
+    shards = [names[i:i + shard_size] for i in range(0, len(names), shard_size)]
+    writer = ShardWriter(output, output_format)
+    init_args = (model_path, encoder_path, data_path, snapshot_path)
+    started = time.perf_counter()
+    skipped = 0
+
+    def consume(shard: Dict[str, np.ndarray], done: int) -> None:
+        nonlocal skipped
+        writer.write(shard)
+        skipped += shard["skipped"]
+        elapsed = time.perf_counter() - started
+        print(f"  fragmento {done}/{len(shards)}: {writer.rows:,} filas ({writer.rows / elapsed:,.0f} filas/s)")
+
+    try:
+        if workers <= 1:
+            init_worker(*init_args)
+            for done, shard_names in enumerate(shards, start=1):
+                consume(project_shard(shard_names, projection_years), done)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=init_args) as pool:
+                # Como mucho dos fragmentos en vuelo por proceso; se escriben en orden
+                in_flight = deque()
+                pending = iter(shards)
+                done = 0
+                for shard_names in pending:
+                    in_flight.append(pool.submit(project_shard, shard_names, projection_years))
+                    if len(in_flight) >= workers * 2:
+                        break
+                while in_flight:
+                    shard = in_flight.popleft().result()
+                    next_names = next(pending, None)
+                    if next_names is not None:
+                        in_flight.append(pool.submit(project_shard, next_names, projection_years))
+                    done += 1
+                    consume(shard, done)
+        writer.close()
+    finally:
+        if writer.tmp_path.exists():
+            writer.tmp_path.unlink()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "affiliations": len(names) - skipped,
+        "skipped": skipped,
+        "rows": writer.rows,
+        "seconds": elapsed,
+        "rows_per_second": writer.rows / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    base_dir = Path(__file__).resolve().parent.parent.parent
+    parser = argparse.ArgumentParser(description="Proyecta todas las afiliaciones y guarda el resultado en Parquet o CSV.")
+    parser.add_argument("--output", type=Path, required=True, help="Archivo de salida (.parquet o .csv).")
+    parser.add_argument("--format", choices=["parquet", "csv"], default=None,
+                        help="Formato de salida (por defecto, según la extensión).")
+    parser.add_argument("--years", type=int, default=20, help="Años a proyectar.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos del pool.")
+    parser.add_argument("--shard-size", type=int, default=500, help="Afiliaciones por fragmento.")
+    parser.add_argument("--model", type=Path, default=base_dir / "publication_model.pkl")
+    parser.add_argument("--encoder", type=Path, default=base_dir / "affiliation_encoder.pkl")
+    parser.add_argument("--data", type=Path, default=base_dir / "publication_data.csv")
+    parser.add_argument("--snapshot", type=Path, default=base_dir / "publication_data.snapshot",
+                        help="Snapshot binario de los activos (se usa si está al día).")
+    parser.add_argument("--no-snapshot", action="store_true", help="Carga siempre los datos desde el CSV.")
+    args = parser.parse_args(argv)
+    if args.years < 1 or args.shard_size < 1:
+        parser.error("--years y --shard-size deben ser mayores que 0.")
+
+    print(f"Proyectando a {args.years} años con {max(1, args.workers)} proceso(s)...")
+    try:
+        summary = run_batch_projection(
+            args.output, args.years, max(1, args.workers), args.shard_size,
+            args.model, args.encoder, args.data, None if args.no_snapshot else args.snapshot, args.format
+        )
+    except FileNotFoundError as e:
+        print(f"ERROR: No se encontró el archivo '{e.filename}'.")
+        return 1
+    except BrokenProcessPool:
+        print("ERROR: Un proceso del pool terminó de forma inesperada (revisa que los activos se puedan cargar).")
+        return 1
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        return 1
+    print(f"Proyecciones guardadas en '{args.output}': {summary['affiliations']:,} afiliaciones, "
+          f"{summary['rows']:,} filas en {summary['seconds']:.2f} s ({summary['rows_per_second']:,.0f} filas/s).")
+    if summary["skipped"]:
+        print(f"WARNING: {summary['skipped']} afiliaciones sin datos históricos se omitieron.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
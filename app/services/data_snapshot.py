@@ -0,0 +1,255 @@
+# backend/app/services/data_snapshot.py
+
+"""
+Snapshot binario de los activos para un arranque rápido.
+
+`python -m app.services.data_snapshot` compila publication_data.csv, el encoder
+y el modelo en un directorio de arreglos .npy columnares:
+
+- códigos enteros de afiliación por fila y una tabla de strings aparte,
+- columnas numéricas con el tipo entero más angosto posible (int16/int32),
+- la tabla de offsets por afiliación, ya ordenada por (afiliación, año),
+- las clases del encoder, los metadatos del modelo y, si es posible, el
+  ensamble de árboles compilado para el motor NumPy.
+
+Al arrancar, PredictionService abre esos arreglos con memory-map. El
+manifiesto guarda el SHA-256 de cada archivo fuente: si alguno cambió el
+snapshot se considera obsoleto y se vuelve a leer el CSV.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 del contenido de un archivo."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def narrowest_int_dtype(values: np.ndarray) -> np.dtype:
+    """Tipo entero más angosto (int16, int32 o int64) que contiene todos los valores."""
+    if len(values) == 0:
+        return np.dtype(np.int16)
+    low, high = int(values.min()), int(values.max())
+    for dtype in (np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def encode_strings(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Codifica una tabla de strings como un blob UTF-8 y sus offsets."""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def decode_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(bounds) - 1)]
+
+
+class HistoricalSnapshot:
+    """Snapshot abierto: arreglos en memory-map y metadatos del manifiesto."""
+    def __init__(self, snapshot_dir: Path, manifest: Dict):
+        self.path = snapshot_dir
+        self.manifest = manifest
+        arrays = {
+            name: np.load(snapshot_dir / f"{name}.npy", mmap_mode='r')
+            for name in manifest["arrays"]
+        }
+        self.arrays = arrays
+        self.affiliation_names = decode_strings(arrays["affiliation_names_blob"], arrays["affiliation_names_offsets"])
+        self.encoder_classes = np.array(
+            decode_strings(arrays["encoder_classes_blob"], arrays["encoder_classes_offsets"]), dtype=object
+        )
+        self.offsets = arrays["affiliation_offsets"]
+        self.affiliation_code = arrays["affiliation_code"]
+        self.year = arrays["year"]
+        self.publication_count = arrays["publication_count"]
+        self.distinct_authors = arrays["distinct_authors"]
+        self.model_metadata = manifest["model"]
+
+    def tree_arrays(self) -> Optional[Dict[str, np.ndarray]]:
+        """Arreglos del ensamble compilado, o None si el snapshot no lo incluye."""
+        if self.manifest["model"].get("tree_engine") is None:
+            return None
+        return {field[len("tree_"):]: array for field, array in self.arrays.items() if field.startswith("tree_")}
+
+
+def load_snapshot(snapshot_dir: Path, source_hashes: Dict[str, str]) -> Optional[HistoricalSnapshot]:
+    """
+    Abre el snapshot si existe, es del formato actual y fue compilado a partir
+    de exactamente los mismos archivos fuente. En otro caso devuelve None.
+    """
+    manifest_path = Path(snapshot_dir) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            print("Snapshot de datos con formato distinto, se usará el CSV.")
+            return None
+        sources = {role: info["sha256"] for role, info in manifest["sources"].items()}
+        if sources != source_hashes:
+            print("Snapshot de datos obsoleto (los archivos fuente cambiaron), se usará el CSV.")
+            return None
+        return HistoricalSnapshot(Path(snapshot_dir), manifest)
+    except Exception as e:
+        print(f"WARNING: No se pudo abrir el snapshot de datos, se usará el CSV: {e}")
+        return None
+
+
+def build_snapshot_once(snapshot_dir: Path, model_path: Path, encoder_path: Path, historical_data_path: Path,
+                        source_hashes: Dict[str, str]) -> Optional[HistoricalSnapshot]:
+    """
+    Compila el snapshot si no existe o está obsoleto y lo abre. Varios
+    procesos (los workers de uvicorn de un mismo host) pueden llamarla a la
+    vez: un lock de archivo hace que solo uno compile y que los demás abran
+    el resultado. Devuelve None si no se pudo compilar (p. ej. disco de solo lectura).
+    """
+    snapshot_dir = Path(snapshot_dir)
+    try:
+        import fcntl
+    except ImportError:  # Sin fcntl (Windows) no se compila en caliente
+        return None
+    lock_path = snapshot_dir.with_name(f".{snapshot_dir.name}.lock")
+    try:
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Otro proceso pudo haberlo compilado mientras se esperaba el lock
+                snapshot = load_snapshot(snapshot_dir, source_hashes)
+                if snapshot is not None:
+                    return snapshot
+                started = time.perf_counter()
+                write_snapshot(snapshot_dir, model_path, encoder_path, historical_data_path)
+                print(f"Snapshot de datos compilado en '{snapshot_dir}' en {time.perf_counter() - started:.2f} s.")
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    except Exception as e:
+        print(f"WARNING: No se pudo compilar el snapshot de datos, se usará el CSV: {e}")
+        return None
+    return load_snapshot(snapshot_dir, source_hashes)
+
+
+def write_snapshot(snapshot_dir: Path, model_path: Path, encoder_path: Path, historical_data_path: Path) -> Dict:
+    """
+    Compila los activos en `snapshot_dir`. El directorio se escribe aparte y se
+    reemplaza al final, de modo que nunca queda un snapshot a medio escribir.
+    Devuelve el manifiesto.
+    """
+    # Importaciones locales: solo el paso de compilación necesita pandas/LightGBM.
+    import joblib
+    import pandas as pd
+    from app.services.affiliation_index import AffiliationIndex
+    from app.services.asset_bundle import compile_tree_engine
+
+    snapshot_dir = Path(snapshot_dir)
+    source_paths = {"model": model_path, "encoder": encoder_path, "historical_data": historical_data_path}
+    sources = {role: {"path": Path(path).name, "sha256": file_sha256(path)} for role, path in source_paths.items()}
+
+    model = joblib.load(model_path)
+    encoder = joblib.load(encoder_path)
+    historical_df = pd.read_csv(historical_data_path)
+    index = AffiliationIndex.from_dataframe(historical_df, encoder.classes_)
+
+    counts = np.diff(index.offsets)
+    n_affiliations = len(index.affiliation_names)
+    arrays: Dict[str, np.ndarray] = {}
+    arrays["affiliation_names_blob"], arrays["affiliation_names_offsets"] = encode_strings(index.affiliation_names)
+    arrays["encoder_classes_blob"], arrays["encoder_classes_offsets"] = encode_strings(
+        [str(name) for name in encoder.classes_]
+    )
+    arrays["affiliation_offsets"] = index.offsets.astype(narrowest_int_dtype(index.offsets))
+    arrays["affiliation_code"] = np.repeat(np.arange(n_affiliations), counts).astype(
+        narrowest_int_dtype(np.array([n_affiliations]))
+    )
+    for column, values in (("year", index.years), ("publication_count", index.publications),
+                           ("distinct_authors", index.authors)):
+        arrays[column] = values.astype(narrowest_int_dtype(values))
+
+    tree_metadata = None
+    engine = compile_tree_engine(model, index)
+    if engine is not None:
+        tree_metadata = engine.metadata()
+        for field, array in engine.to_arrays().items():
+            arrays[f"tree_{field}"] = array
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": time.time(),
+        "sources": sources,
+        "rows": int(len(index.years)),
+        "affiliations": n_affiliations,
+        "arrays": sorted(arrays),
+        "model": {
+            "feature_names": list(model.feature_name_),
+            "feature_importances": [int(v) for v in model.feature_importances_],
+            "tree_engine": tree_metadata,
+        },
+    }
+
+    snapshot_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{snapshot_dir.name}.", dir=snapshot_dir.parent))
+    try:
+        os.chmod(staging, 0o755)
+        for name, array in arrays.items():
+            np.save(staging / f"{name}.npy", np.ascontiguousarray(array))
+        with open(staging / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        previous = None
+        if snapshot_dir.exists():
+            previous = snapshot_dir.with_name(f".{snapshot_dir.name}.old-{os.getpid()}")
+            os.replace(snapshot_dir, previous)
+        os.replace(staging, snapshot_dir)
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    base_dir = Path(__file__).resolve().parent.parent.parent
+    parser = argparse.ArgumentParser(description="Compila el snapshot binario de los activos de predicción.")
+    parser.add_argument("--model", type=Path, default=base_dir / "publication_model.pkl")
+    parser.add_argument("--encoder", type=Path, default=base_dir / "affiliation_encoder.pkl")
+    parser.add_argument("--data", type=Path, default=base_dir / "publication_data.csv")
+    parser.add_argument("--output", type=Path, default=base_dir / "publication_data.snapshot")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    manifest = write_snapshot(args.output, args.model, args.encoder, args.data)
+    size = sum(p.stat().st_size for p in args.output.iterdir())
+    print(f"Snapshot guardado en '{args.output}' ({manifest['rows']} filas, "
+          f"{manifest['affiliations']} afiliaciones, {size / 1024:.0f} KiB) "
+          f"en {time.perf_counter() - started:.2f} s.")
+    if manifest["model"]["tree_engine"] is None:
+        print("El snapshot no incluye el motor NumPy; el modelo se cargará con joblib.")
+
+
+if __name__ == "__main__":
+    main()
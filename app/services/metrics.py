@@ -0,0 +1,272 @@
+# backend/app/services/metrics.py
+
+"""
+Métricas del servicio en el formato de texto de Prometheus (versión 0.0.4).
+
+Contadores e histogramas mínimos, sin dependencias: registrar una
+observación es una búsqueda en un diccionario y un bisect bajo un lock, de
+modo que las métricas pueden quedar activas de forma permanente. Los valores
+que ya existen en otros componentes (cachés, micro-lotes, activos) se leen
+al momento de exponerlas mediante funciones colectoras.
+"""
+
+import bisect
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Buckets de latencia en segundos (de 0.5 ms a 10 s)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Buckets de filas por llamada al modelo
+ROWS_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+Labels = Tuple[str, ...]
+# Una muestra exportada por un colector: (nombre, etiquetas, valor)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Por combinación de etiquetas: conteo por bucket (no acumulado, +Inf al final), suma y total
+        self._series: Dict[Labels, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas del proceso y colectores de valores calculados al exponer."""
+    def __init__(self):
+        self._metrics: List = []
+        # Cada colector devuelve (tipo, documentación, muestras)
+        self._collectors: List[Callable[[], List[Tuple[str, str, List[Sample]]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, str, List[Sample]]]]) -> None:
+        self._collectors.append(collector)
+
+    def expose(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"WARNING: Falló un colector de métricas: {e}")
+                continue
+            seen = set()
+            for metric_type, documentation, samples in families:
+                for name, labels, value in samples:
+                    if name not in seen:
+                        seen.add(name)
+                        lines.append(f"# HELP {name} {documentation}")
+                        lines.append(f"# TYPE {name} {metric_type}")
+                    label_names = sorted(labels)
+                    label_text = _format_labels(label_names, [labels[k] for k in label_names])
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "Solicitudes HTTP atendidas, por ruta, método y código de estado.",
+    ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "Latencia de las solicitudes HTTP, por ruta y método.",
+    ("method", "route")
+)
+prediction_stage_duration_seconds = registry.histogram(
+    "prediction_stage_duration_seconds",
+    "Duración de cada etapa del cálculo (lookup, history, features, serialize), por operación.",
+    ("operation", "stage")
+)
+model_predict_duration_seconds = registry.histogram(
+    "model_predict_duration_seconds", "Duración de cada llamada al modelo (LightGBM o motor NumPy).",
+    ("backend",)
+)
+model_predict_batch_rows = registry.histogram(
+    "model_predict_batch_rows", "Filas evaluadas por llamada al modelo.", ("backend",), buckets=ROWS_BUCKETS
+)
+
+
+@contextmanager
+def stage_timer(operation: str, stage: str) -> Iterator[None]:
+    """Mide una etapa del cálculo de `operation` (projection, ranking...)."""
+    with prediction_stage_duration_seconds.time(operation, stage):
+        yield
+
+
+def gauges(documentation: str, name: str, values: Dict[str, Optional[float]],
+           label: str = "", labels: Optional[Dict[str, str]] = None) -> Tuple[str, str, List[Sample]]:
+    """
+    Familia de gauges a partir de un diccionario de contadores: con `label`,
+    una muestra `name{label="clave"}` por entrada; sin él, solo `name`.
+    """
+    samples = []
+    for key, value in values.items():
+        if value is None:
+            continue
+        sample_labels = dict(labels or {})
+        if label:
+            sample_labels[label] = key
+        samples.append((name, sample_labels, float(value)))
+    return "gauge", documentation, samples
+
+
+# Campos de /proc/self/smaps_rollup que se exportan (en kB en el archivo)
+_SMAPS_FIELDS = {
+    "Rss": "rss", "Pss": "pss", "Pss_Anon": "pss_anon", "Pss_File": "pss_file",
+    "Shared_Clean": "shared_clean", "Private_Clean": "private_clean", "Private_Dirty": "private_dirty",
+}
+
+
+def process_memory() -> Dict[str, int]:
+    """
+    Memoria del proceso (worker) actual, en bytes. En Linux incluye, además
+    del RSS, el PSS (RSS con las páginas compartidas divididas entre los
+    procesos que las usan), que es lo que suma cada worker adicional; las
+    páginas del snapshot en memory-map aparecen como `shared_clean`.
+    Fuera de Linux solo se informa el pico de RSS.
+    """
+    memory: Dict[str, int] = {}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in _SMAPS_FIELDS:
+                    memory[_SMAPS_FIELDS[key]] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    if "rss" not in memory:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss viene en kB en Linux y en bytes en macOS
+            memory["peak_rss"] = peak if sys.platform == "darwin" else peak * 1024
+        except ImportError:
+            pass
+    return memory
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que cuenta las solicitudes y mide su latencia por ruta.
+    La ruta es la plantilla del endpoint (p. ej. /api/v1/projection/{affiliation_name}),
+    no la URL, para que el número de series quede acotado.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Las versiones recientes de FastAPI dejan en scope["route"] la ruta sin el
+            # prefijo del router incluido; la ruta efectiva va en scope["fastapi"].
+            context = (scope.get("fastapi") or {}).get("effective_route_context")
+            route_path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope.get("method", "")
+            http_request_duration_seconds.observe(time.perf_counter() - started, method, route_path)
+            http_requests_total.inc(method, route_path, str(status["code"]))
@@ -0,0 +1,197 @@
+# backend/app/services/prediction_batcher.py
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Generator, List, Optional, Tuple
+
+import numpy as np
+
+PredictFn = Callable[[np.ndarray], np.ndarray]
+_QueueItem = Tuple[PredictFn, np.ndarray, asyncio.Future]
+
+# Límites superiores de los buckets del histograma de tamaño de lote (en filas).
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def _advance(plan: Generator, predictions: Optional[np.ndarray], first: bool = False) -> Tuple[bool, Any]:
+    """
+    Avanza el plan un paso. Devuelve (terminado, siguiente paso o resultado):
+    StopIteration no puede atravesar un future de asyncio.
+    """
+    try:
+        return False, next(plan) if first else plan.send(predictions)
+    except StopIteration as stop:
+        return True, stop.value
+
+
+class PredictionBatcher:
+    """
+    Agrupa en micro-lotes las filas de predicción de solicitudes concurrentes.
+
+    Cada solicitud entrega su matriz de características, junto con la función
+    de predicción del bundle de activos que la originó, y espera un future. Un
+    único worker asíncrono toma la primera matriz pendiente, reúne las que
+    lleguen durante la ventana configurada (o hasta `max_rows` filas) con la
+    misma función de predicción, ejecuta una sola predicción en un hilo
+    dedicado y reparte los resultados. Las filas de otro bundle (durante una
+    recarga) quedan para el lote siguiente.
+    """
+    def __init__(self, window_ms: float = 2.0, max_rows: int = 4096):
+        self.window_seconds = window_ms / 1000.0
+        self.max_rows = max_rows
+        # Un solo hilo: los lotes se ejecutan de a uno y no compiten por el GIL
+        # ni por los hilos de OpenMP de LightGBM.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prediction-batcher")
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._deferred: Deque[_QueueItem] = deque()
+
+        self._stats_lock = threading.Lock()
+        self._pending_rows = 0
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_rows = 0
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        """Crea la cola y el worker en el event loop actual la primera vez que se usa."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._deferred.clear()
+            self._worker = loop.create_task(self._run_worker())
+        return self._queue
+
+    async def predict(self, predict_fn: PredictFn, features: np.ndarray) -> np.ndarray:
+        """Encola una matriz de características y espera sus predicciones."""
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        with self._stats_lock:
+            self._pending_rows += len(features)
+            self.requests += 1
+        queue.put_nowait((predict_fn, features, future))
+        return await future
+
+    async def run(self, plan: Generator[Tuple[PredictFn, np.ndarray], np.ndarray, Any]) -> Any:
+        """
+        Ejecuta un plan de cálculo de PredictionService (plan_projections,
+        plan_ranking) resolviendo cada paso a través del micro-lote.
+
+        Los pasos del plan (armar las matrices de características, las
+        historias, las filas del ranking) corren en el threadpool por defecto,
+        no en el event loop; solo la predicción pasa por el micro-lote.
+        """
+        done, step = await asyncio.to_thread(_advance, plan, None, True)
+        while not done:
+            predict_fn, features = step
+            predictions = await self.predict(predict_fn, features)
+            done, step = await asyncio.to_thread(_advance, plan, predictions)
+        return step
+
+    async def _collect(self, queue: asyncio.Queue) -> List[_QueueItem]:
+        """
+        Reúne solicitudes con la misma función de predicción hasta agotar la
+        ventana de tiempo o el máximo de filas. Una solicitud que no entra en
+        el lote queda para el siguiente; solo la primera del lote puede superar
+        `max_rows` por sí sola.
+        """
+        loop = asyncio.get_running_loop()
+        first = self._deferred.popleft() if self._deferred else await queue.get()
+        batch = [first]
+        predict_fn = first[0]
+        rows = len(first[1])
+
+        # Primero las solicitudes que quedaron pendientes de lotes anteriores.
+        # Al primer elemento que no entra el lote queda lleno, para no
+        # adelantar solicitudes posteriores a las que esperan.
+        full = False
+        for _ in range(len(self._deferred)):
+            item = self._deferred.popleft()
+            if not full and item[0] == predict_fn:
+                if rows + len(item[1]) <= self.max_rows:
+                    batch.append(item)
+                    rows += len(item[1])
+                    continue
+                full = True
+            self._deferred.append(item)
+
+        deadline = loop.time() + self.window_seconds
+        while not full and rows < self.max_rows:
+            if queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = queue.get_nowait()
+            if item[0] == predict_fn and rows + len(item[1]) > self.max_rows:
+                self._deferred.append(item)
+                break
+            if item[0] == predict_fn:
+                batch.append(item)
+                rows += len(item[1])
+            else:
+                self._deferred.append(item)
+        return batch
+
+    async def _run_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = await self._collect(queue)
+            predict_fn = batch[0][0]
+            sizes = [len(features) for _, features, _ in batch]
+            total = sum(sizes)
+            self._record_batch(total)
+
+            try:
+                features = np.concatenate([features for _, features, _ in batch])
+                predictions = await loop.run_in_executor(self._executor, predict_fn, features)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for size, (_, _, future) in zip(sizes, batch):
+                if not future.done():
+                    future.set_result(predictions[offset:offset + size])
+                offset += size
+
+    def _record_batch(self, rows: int) -> None:
+        with self._stats_lock:
+            self._pending_rows -= rows
+            self.batches += 1
+            self.rows += rows
+            self.max_batch_rows = max(self.max_batch_rows, rows)
+            for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+                if rows <= bound:
+                    self._histogram[i] += 1
+                    break
+            else:
+                self._histogram[-1] += 1
+
+    def stats(self) -> Dict:
+        """Profundidad de la cola y distribución del tamaño de los lotes."""
+        with self._stats_lock:
+            histogram = {str(bound): count for bound, count in zip(BATCH_SIZE_BUCKETS, self._histogram)}
+            histogram["+Inf"] = self._histogram[-1]
+            return {
+                "queue_depth": (self._queue.qsize() if self._queue is not None else 0) + len(self._deferred),
+                "pending_rows": self._pending_rows,
+                "requests": self.requests,
+                "batches": self.batches,
+                "rows": self.rows,
+                "max_batch_rows": self.max_batch_rows,
+                "mean_batch_rows": round(self.rows / self.batches, 2) if self.batches else 0.0,
+                "batch_size_histogram": histogram,
+            }
@@ -1,146 +1,732 @@
 # backend/app/services/prediction_service.py
 
-import joblib
-import pandas as pd
+import threading
+import time
+import numpy as np
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, Callable, Generator, List, Dict, NamedTuple, Optional, Tuple
+from app.core.config import settings
+from app.services.asset_bundle import AssetBundle
+from app.services.data_snapshot import file_sha256
+from app.services.metrics import prediction_stage_duration_seconds, stage_timer
+from app.services.projection_cache import ProjectionCache
+
+# Cada paso de un plan de cálculo es la función de predicción del bundle que lo
+# originó y la matriz de características a evaluar con ella.
+PredictionStep = Tuple[Callable[[np.ndarray], np.ndarray], np.ndarray]
+
+class RankingTable(NamedTuple):
+    """Predicción del próximo año de todas las afiliaciones, en el orden del encoder."""
+    version: str
+    names: List[str]
+    current: np.ndarray
+    predicted: np.ndarray
+    growth: np.ndarray
+    growth_percentage: np.ndarray
+
+
+def select_ranking(table: RankingTable, sort_by: str, descending: bool,
+                   min_current_publications: Optional[int], min_predicted_publications: Optional[int],
+                   offset: int, limit: Optional[int]) -> Tuple[np.ndarray, int]:
+    """
+    Índices de la página [offset, offset + limit) del ranking filtrado y el
+    total de filas que cumplen los filtros. Con selección parcial
+    (np.partition) solo se ordenan las filas que pueden quedar en la página,
+    más los empates en el límite, de modo que el costo crece con la página y
+    no con el número de afiliaciones.
+    """
+    mask = None
+    if min_current_publications is not None:
+        mask = table.current >= min_current_publications
+    if min_predicted_publications is not None:
+        predicted_mask = table.predicted >= min_predicted_publications
+        mask = predicted_mask if mask is None else mask & predicted_mask
+    candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(table.names))
+
+    key = table.growth if sort_by == "growth" else table.growth_percentage
+    values = -key[candidates] if descending else key[candidates]
+    total = len(candidates)
+    stop = total if limit is None else min(total, offset + limit)
+    if stop <= offset:
+        return np.empty(0, dtype=np.int64), total
+    if stop < total:
+        # Todo lo que no supera al k-ésimo valor, incluidos sus empates
+        kth = np.partition(values, stop - 1)[stop - 1]
+        chosen = np.flatnonzero(values <= kth)
+    else:
+        chosen = np.arange(total)
+    # Orden por valor y, a igualdad, por posición en el encoder (orden estable)
+    order = chosen[np.lexsort((candidates[chosen], values[chosen]))]
+    return candidates[order[offset:stop]], total
+
 
 class PredictionService:
     """
     Contiene toda la lógica de negocio para cargar modelos, datos
     y realizar las predicciones y análisis.
     """
-    def __init__(self):
-        # Cargar todos los activos una sola vez al instanciar el servicio.
+    def __init__(self, load_assets: bool = True):
+        # Con load_assets=False los activos se cargan después, con start_loading().
         BASE_DIR = Path(__file__).resolve().parent.parent.parent
         self.MODEL_PATH = BASE_DIR / "publication_model.pkl"
         self.ENCODER_PATH = BASE_DIR / "affiliation_encoder.pkl"
         self.HISTORICAL_DATA_PATH = BASE_DIR / "publication_data.csv"
+        # Generado con `python -m app.services.data_snapshot`; si falta o está obsoleto se usa el CSV.
+        self.SNAPSHOT_PATH = BASE_DIR / "publication_data.snapshot"
         
-        self.model = None
-        self.encoder = None
-        self.historical_df = None
-        self._load_assets()
+        # Activos vigentes. Se reemplazan completos con una sola asignación.
+        self._bundle: Optional[AssetBundle] = None
+        self.projection_cache = ProjectionCache(
+            maxsize=settings.PROJECTION_CACHE_MAXSIZE,
+            ttl_seconds=settings.PROJECTION_CACHE_TTL_SECONDS
+        )
+        self._reload_lock = threading.Lock()
+        self._watcher_stop: Optional[threading.Event] = None
+        self._loader_stop = threading.Event()
+        # Tabla de crecimiento de la versión vigente (ver plan_ranking_table)
+        self._ranking_table: Optional[RankingTable] = None
+        # Backtest por versión de activos (solo se conserva el de la vigente)
+        self._backtests: Dict[str, Dict[str, Any]] = {}
+        self._backtest_running: Optional[str] = None
+        self._backtest_lock = threading.Lock()
+        self.reload_status: Dict[str, Any] = {
+            "state": "idle", "last_error": None, "last_reload_at": None, "reloads": 0, "attempts": 0
+        }
+        if load_assets:
+            self._load_assets()
 
-    def _load_assets(self):
+    def _load_assets(self) -> bool:
         """Método privado para cargar los archivos .pkl y .csv."""
         try:
-            self.model = joblib.load(self.MODEL_PATH)
-            self.encoder = joblib.load(self.ENCODER_PATH)
-            self.historical_df = pd.read_csv(self.HISTORICAL_DATA_PATH)
-            print("Servicio de predicción inicializado y activos cargados.")
+            bundle = AssetBundle.load(
+                self.MODEL_PATH, self.ENCODER_PATH, self.HISTORICAL_DATA_PATH,
+                backend=settings.PREDICTION_BACKEND,
+                snapshot_path=self.SNAPSHOT_PATH if settings.USE_DATA_SNAPSHOT else None,
+                build_snapshot=settings.BUILD_DATA_SNAPSHOT
+            )
         except FileNotFoundError as e:
             print(f"CRITICAL ERROR: No se pudo inicializar PredictionService. Archivo no encontrado: {e.filename}")
+            self.reload_status["last_error"] = f"Archivo no encontrado: {e.filename}"
+            return False
         except Exception as e:
             print(f"CRITICAL ERROR: Ocurrió un error al cargar activos en PredictionService: {e}")
+            self.reload_status["last_error"] = str(e)
+            return False
+        self._swap_bundle(bundle)
+        print("Servicio de predicción inicializado y activos cargados.")
+        return True
+
+    def _swap_bundle(self, bundle: AssetBundle) -> None:
+        """Publica un bundle ya construido y descarta los resultados de los activos anteriores."""
+        self._bundle = bundle
+        self.projection_cache.clear()
+        self.reload_status["last_error"] = None
+        self.reload_status["last_reload_at"] = bundle.loaded_at
+
+    # --- Carga inicial en segundo plano ---
+
+    def start_loading(self, max_attempts: int = 0, retry_base_seconds: float = 1.0,
+                      retry_max_seconds: float = 60.0) -> bool:
+        """
+        Lanza la carga inicial de los activos en un hilo en segundo plano, para
+        que la aplicación pueda arrancar y responder /healthz mientras tanto.
+        Si la carga falla se reintenta con backoff exponencial (max_attempts=0:
+        sin límite de intentos). Devuelve False si ya hay una carga en curso.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        self.reload_status["state"] = "loading"
+        threading.Thread(
+            target=self._initial_load_worker, args=(max_attempts, retry_base_seconds, retry_max_seconds),
+            name="asset-loader", daemon=True
+        ).start()
+        return True
+
+    def _initial_load_worker(self, max_attempts: int, retry_base_seconds: float, retry_max_seconds: float) -> None:
+        try:
+            attempt = 0
+            while not self._loader_stop.is_set():
+                attempt += 1
+                self.reload_status["attempts"] = attempt
+                if self._load_assets():
+                    self.reload_status["state"] = "idle"
+                    return
+                if max_attempts and attempt >= max_attempts:
+                    self.reload_status["state"] = "failed"
+                    return
+                delay = min(retry_max_seconds, retry_base_seconds * 2 ** (attempt - 1))
+                print(f"Reintentando la carga de activos en {delay:.1f} s (intento {attempt})...")
+                if self._loader_stop.wait(delay):
+                    return
+        finally:
+            self._reload_lock.release()
+
+    def stop_background_tasks(self) -> None:
+        """Detiene los reintentos de carga y la vigilancia de los artefactos."""
+        self._loader_stop.set()
+        self.stop_asset_watcher()
+
+    # --- Recarga en caliente ---
+
+    def reload_assets(self) -> bool:
+        """
+        Lanza la recarga de activos en un hilo en segundo plano. El nuevo
+        bundle se construye fuera del camino de las solicitudes y se publica
+        de forma atómica al terminar. Devuelve False si ya hay una recarga en curso.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        self.reload_status["state"] = "loading"
+        threading.Thread(target=self._reload_worker, name="asset-reload", daemon=True).start()
+        return True
+
+    def _reload_worker(self) -> None:
+        try:
+            loaded = self._load_assets()
+            self.reload_status["state"] = "idle" if loaded else "failed"
+            if loaded:
+                self.reload_status["reloads"] += 1
+        finally:
+            self._reload_lock.release()
+
+    # --- Ingesta incremental ---
+
+    def apply_historical_updates(self, rows: List[Tuple[str, int, int, int]],
+                                 historical_data_sha256: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Aplica en memoria las filas (afiliación, año, publicaciones, autores)
+        recalculadas por la ingesta incremental, sin recargar los activos. Solo
+        se reconstruyen las afiliaciones afectadas y solo sus proyecciones se
+        descartan de la caché; las demás pasan a la nueva versión.
+        Devuelve None si hay una carga o recarga en curso.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return None
+        try:
+            bundle = self._bundle
+            patched = bundle.with_historical_updates(rows, historical_data_sha256)
+            affected = {name for name, _, _, _ in rows}
+            self._bundle = patched
+            invalidated = self.projection_cache.migrate(bundle.version, patched.version, affected)
+            self.reload_status["last_reload_at"] = patched.loaded_at
+            print(f"Datos históricos actualizados: {len(rows)} filas de {len(affected)} afiliaciones "
+                  f"(versión {patched.version}).")
+            return {
+                "version": patched.version,
+                "rows": len(rows),
+                "affected_affiliations": len(affected),
+                "invalidated_cache_entries": invalidated,
+            }
+        finally:
+            self._reload_lock.release()
+
+    def _artifact_mtimes(self) -> Tuple[Optional[float], ...]:
+        mtimes = []
+        for path in (self.MODEL_PATH, self.ENCODER_PATH, self.HISTORICAL_DATA_PATH):
+            try:
+                mtimes.append(path.stat().st_mtime)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def start_asset_watcher(self, interval_seconds: float) -> None:
+        """
+        Inicia un hilo que revisa la fecha de modificación de los artefactos cada
+        `interval_seconds` y lanza una recarga cuando alguno cambia.
+        """
+        if self._watcher_stop is not None:
+            return
+        stop = threading.Event()
+        self._watcher_stop = stop
+
+        def watch():
+            last_seen = self._artifact_mtimes()
+            while not stop.wait(interval_seconds):
+                current = self._artifact_mtimes()
+                if current != last_seen and None not in current:
+                    if self._artifacts_match_bundle():
+                        # Mismo contenido (p. ej. un CSV ya aplicado por la ingesta incremental)
+                        last_seen = current
+                        continue
+                    print("Cambio detectado en los activos, recargando...")
+                    if self.reload_assets():
+                        last_seen = current
+
+        threading.Thread(target=watch, name="asset-watcher", daemon=True).start()
+
+    def _artifacts_match_bundle(self) -> bool:
+        """Indica si los archivos en disco son exactamente los del bundle vigente."""
+        bundle = self._bundle
+        if bundle is None:
+            return False
+        paths = {"model": self.MODEL_PATH, "encoder": self.ENCODER_PATH, "historical_data": self.HISTORICAL_DATA_PATH}
+        try:
+            return all(file_sha256(path) == bundle.source_hashes.get(role) for role, path in paths.items())
+        except OSError:
+            return False
+
+    def stop_asset_watcher(self) -> None:
+        if self._watcher_stop is not None:
+            self._watcher_stop.set()
+            self._watcher_stop = None
+
+    def get_assets_status(self) -> Dict[str, Any]:
+        """Versión de los activos vigentes y estado de la última recarga."""
+        bundle = self._bundle
+        return {
+            "version": bundle.version if bundle is not None else None,
+            "loaded_at": bundle.loaded_at if bundle is not None else None,
+            "load_duration_seconds": round(bundle.load_duration_seconds, 4) if bundle is not None else None,
+            "source": bundle.source if bundle is not None else None,
+            "artifacts": dict(bundle.source_hashes) if bundle is not None else None,
+            **self.reload_status
+        }
+
+    # --- Acceso a los activos vigentes ---
+
+    @property
+    def bundle(self) -> Optional[AssetBundle]:
+        return self._bundle
+
+    @property
+    def model(self):
+        return self._bundle.model if self._bundle is not None else None
+
+    @property
+    def encoder(self):
+        return self._bundle.encoder if self._bundle is not None else None
+
+    @property
+    def historical_df(self):
+        return self._bundle.historical_df if self._bundle is not None else None
+
+    @property
+    def affiliation_index(self):
+        return self._bundle.affiliation_index if self._bundle is not None else None
+
+    @property
+    def tree_engine(self):
+        return self._bundle.tree_engine if self._bundle is not None else None
+
+    @property
+    def assets_version(self) -> Optional[str]:
+        return self._bundle.version if self._bundle is not None else None
 
     def check_assets_loaded(self):
         """Verifica si todos los activos necesarios están cargados."""
-        return not (self.model is None or self.encoder is None or self.historical_df is None)
+        return self._bundle is not None
 
     def get_all_affiliations(self) -> List[str]:
         """Devuelve la lista completa de nombres de afiliaciones."""
-        return self.encoder.classes_.tolist()
+        return self._bundle.encoder_classes.tolist()
 
-    def _run_prediction(self, year: int, affiliation_encoded: int, last_pubs: int, last_authors: int) -> int:
-        """Función interna para ejecutar el modelo."""
-        input_data = pd.DataFrame([[
-            year, affiliation_encoded, last_pubs, last_authors
-        ]], columns=['year', 'affiliation_encoded', 'publication_count', 'distinct_authors'])
-        
-        prediction = self.model.predict(input_data)
-        return round(prediction[0])
+    def search_affiliations(self, query: Optional[str], limit: Optional[int] = None,
+                            offset: int = 0) -> Tuple[List[str], int]:
+        """
+        Busca afiliaciones por nombre (sin distinguir mayúsculas ni tildes) y
+        devuelve una página de resultados, ordenados por relevancia, junto con
+        el total de coincidencias. Sin consulta se pagina la lista completa.
+        """
+        search_index = self._bundle.search_index
+        matches = search_index.search(query) if query else search_index.names
+        stop = offset + limit if limit is not None else None
+        return matches[offset:stop], len(matches)
+
+    def _drive(self, plan: Generator[PredictionStep, np.ndarray, Any]) -> Any:
+        """
+        Ejecuta un plan de cálculo de forma síncrona: cada matriz de
+        características que el plan entrega se evalúa con la función de
+        predicción de su bundle y las predicciones se le devuelven hasta que
+        el plan termina.
+        """
+        try:
+            predict, features = next(plan)
+            while True:
+                predict, features = plan.send(predict(features))
+        except StopIteration as stop:
+            return stop.value
+
+    def _plan_cohort(self, bundle: AssetBundle, encoded: np.ndarray, years: np.ndarray, publications: np.ndarray,
+                     authors: np.ndarray, projection_years: int) -> Generator[PredictionStep, np.ndarray, np.ndarray]:
+        """
+        Proyecta un grupo de afiliaciones en paralelo, un año a la vez, con una
+        sola llamada al modelo por año. Cada fila mantiene su propio estado
+        (publicaciones, autores y relación publicaciones/autor), replicando la
+        lógica recursiva de la proyección individual.
+        Devuelve una matriz (afiliaciones x años) con las publicaciones predichas.
+        """
+        n = len(encoded)
+        current_years = years.astype(np.int64)
+        current_publications = publications.astype(np.int64)
+        current_authors = authors.astype(np.float64)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pubs_per_author_ratio = np.where(current_authors > 0, current_publications / current_authors, 1.0)
+        updates_authors = pubs_per_author_ratio > 0.001
+
+        projected = np.empty((n, projection_years), dtype=np.int64)
+        for step in range(projection_years):
+            current_years = current_years + 1
+            with stage_timer("projection", "features"):
+                authors_for_prediction = np.maximum(1, np.rint(current_authors)).astype(np.int64)
+                features = np.column_stack((current_years, encoded, current_publications, authors_for_prediction))
+            predicted_pubs = yield bundle.predict, features
+            projected[:, step] = predicted_pubs
+
+            current_publications = predicted_pubs
+            with np.errstate(divide='ignore', invalid='ignore'):
+                current_authors = np.where(updates_authors, predicted_pubs / pubs_per_author_ratio, current_authors)
+        return projected
+
+    def plan_projections(self, affiliation_names: List[str], projection_years: int,
+                         hypothetical_authors: Optional[int] = None) -> Generator[PredictionStep, np.ndarray, List[Dict]]:
+        """
+        Plan de cálculo de get_projections: entrega una matriz de características
+        por año proyectado y recibe sus predicciones. Permite que un
+        PredictionBatcher agrupe las filas de varias solicitudes concurrentes.
+        Todo el plan usa el bundle vigente al comenzar, aunque se recargue a mitad.
+        """
+        bundle = self._bundle
+        index = bundle.affiliation_index
+        lookup_started = time.perf_counter()
+        results: List[Dict] = []
+        entries = []
+        for affiliation_name in affiliation_names:
+            if not index.is_known(affiliation_name):
+                results.append({"error": f"La afiliación '{affiliation_name}' no fue encontrada."})
+                continue
+            entry = index.get(affiliation_name)
+            if entry is None:
+                results.append({"error": f"No hay datos históricos para la afiliación '{affiliation_name}'."})
+                continue
+            results.append({"affiliation_name": affiliation_name})
+            entries.append((len(results) - 1, entry))
+
+        # Las series ya calculadas (con un horizonte igual o mayor) salen de la caché;
+        # el resto se proyecta junto en un solo grupo.
+        projections: Dict[str, Optional[tuple]] = {}
+        pending = []
+        for position, entry in entries:
+            name = results[position]["affiliation_name"]
+            if name in projections:
+                continue
+            cached = self.projection_cache.get(self._cache_key(bundle, name, hypothetical_authors), projection_years)
+            if cached is not None:
+                projections[name] = cached
+            else:
+                projections[name] = None
+                pending.append((name, entry))
+
+        prediction_stage_duration_seconds.observe(time.perf_counter() - lookup_started, "projection", "lookup")
+
+        if pending:
+            encoded = np.array([entry.encoded for _, entry in pending], dtype=np.int64)
+            years = np.array([entry.last_year for _, entry in pending], dtype=np.int64)
+            publications = np.array([entry.last_publications for _, entry in pending], dtype=np.int64)
+            if hypothetical_authors is not None:
+                authors = np.full(len(pending), hypothetical_authors, dtype=np.int64)
+            else:
+                authors = np.array([entry.last_authors for _, entry in pending], dtype=np.int64)
+
+            projected = yield from self._plan_cohort(bundle, encoded, years, publications, authors, projection_years)
+            for row, (name, _) in enumerate(pending):
+                values = tuple(projected[row].tolist())
+                projections[name] = values
+                self.projection_cache.put(self._cache_key(bundle, name, hypothetical_authors), values)
+
+        with stage_timer("projection", "history"):
+            for position, entry in entries:
+                name = results[position]["affiliation_name"]
+                projection_data = [
+                    {"year": entry.last_year + step + 1, "publications": publications, "type": 'predicted'}
+                    for step, publications in enumerate(projections[name])
+                ]
+                results[position]["data"] = index.history(entry) + projection_data
+        return results
+
+    def get_projections(self, affiliation_names: List[str], projection_years: int,
+                        hypothetical_authors: Optional[int] = None) -> List[Dict]:
+        """
+        Calcula la proyección histórica y futura para varias afiliaciones a la vez.
+        Devuelve un resultado por nombre, en el mismo orden; las afiliaciones
+        inválidas producen un diccionario con la clave "error".
+        """
+        return self._drive(self.plan_projections(affiliation_names, projection_years, hypothetical_authors))
+
+    def plan_scenarios(self, affiliation_names: List[str], author_counts: List[int],
+                       projection_years: int) -> Generator[PredictionStep, np.ndarray, Dict[str, Any]]:
+        """
+        Plan de cálculo de get_scenarios: todas las combinaciones (afiliación,
+        número hipotético de autores) se proyectan juntas como un solo grupo,
+        con una única llamada al modelo por año proyectado.
+        """
+        bundle = self._bundle
+        index = bundle.affiliation_index
+        lookup_started = time.perf_counter()
+        errors: List[str] = []
+        entries = []
+        for affiliation_name in affiliation_names:
+            if not index.is_known(affiliation_name):
+                errors.append(f"La afiliación '{affiliation_name}' no fue encontrada.")
+                continue
+            entry = index.get(affiliation_name)
+            if entry is None:
+                errors.append(f"No hay datos históricos para la afiliación '{affiliation_name}'.")
+                continue
+            entries.append((affiliation_name, entry))
+        prediction_stage_duration_seconds.observe(time.perf_counter() - lookup_started, "scenarios", "lookup")
+
+        results: List[Dict] = []
+        if entries and author_counts:
+            # Fila (afiliación i, escenario j) -> i * len(author_counts) + j
+            scenarios = len(author_counts)
+            encoded = np.repeat(np.array([entry.encoded for _, entry in entries], dtype=np.int64), scenarios)
+            years = np.repeat(np.array([entry.last_year for _, entry in entries], dtype=np.int64), scenarios)
+            publications = np.repeat(
+                np.array([entry.last_publications for _, entry in entries], dtype=np.int64), scenarios
+            )
+            authors = np.tile(np.array(author_counts, dtype=np.int64), len(entries))
+
+            projected = yield from self._plan_cohort(bundle, encoded, years, publications, authors, projection_years)
+            projected = projected.reshape(len(entries), scenarios, projection_years)
+            for (name, entry), matrix in zip(entries, projected):
+                results.append({
+                    "affiliation_name": name,
+                    "last_actual_year": entry.last_year,
+                    "last_actual_publications": entry.last_publications,
+                    "last_actual_authors": entry.last_authors,
+                    "years": list(range(entry.last_year + 1, entry.last_year + projection_years + 1)),
+                    "publications": matrix.tolist(),
+                })
+        return {"author_counts": list(author_counts), "results": results, "errors": errors}
+
+    def get_scenarios(self, affiliation_names: List[str], author_counts: List[int],
+                      projection_years: int) -> Dict[str, Any]:
+        """
+        Análisis de sensibilidad "What If": proyecta cada afiliación con cada
+        número hipotético de autores. Para cada afiliación devuelve una matriz
+        (escenarios x años) con las publicaciones predichas; cada fila coincide
+        con get_projection(afiliación, projection_years, autores).
+        """
+        return self._drive(self.plan_scenarios(affiliation_names, author_counts, projection_years))
+
+    def _cache_key(self, bundle: AssetBundle, affiliation_name: str, hypothetical_authors: Optional[int]) -> tuple:
+        """Clave de caché: la huella de los activos forma parte de la clave."""
+        return (bundle.version, affiliation_name, hypothetical_authors)
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Devuelve los contadores de la caché de proyecciones."""
+        return self.projection_cache.stats()
 
     def get_projection(self, affiliation_name: str, projection_years: int, hypothetical_authors: Optional[int] = None) -> Dict:
         """
         Calcula la proyección histórica y futura para una afiliación.
         Incluye la lógica para el análisis "What If".
         """
-        if affiliation_name not in self.encoder.classes_:
-            return {"error": f"La afiliación '{affiliation_name}' no fue encontrada."}
+        return self.get_projections([affiliation_name], projection_years, hypothetical_authors)[0]
 
-        affiliation_df = self.historical_df[self.historical_df['affiliation_name'] == affiliation_name].sort_values('year')
-        if affiliation_df.empty:
-            return {"error": f"No hay datos históricos para la afiliación '{affiliation_name}'."}
-
-        historical_data = [
-            {"year": row['year'], "publications": row['publication_count'], "type": 'actual'}
-            for _, row in affiliation_df.iterrows()
-        ]
+    def plan_ranking_table(self) -> Generator[PredictionStep, np.ndarray, "RankingTable"]:
+        """
+        Plan de cálculo de la tabla de crecimiento: una única matriz con el
+        último año real de todas las afiliaciones. La tabla se guarda por
+        versión de activos, así que solo la primera llamada predice.
+        """
+        bundle = self._bundle
+        table = self._ranking_table
+        if table is not None and table.version == bundle.version:
+            return table
 
-        projection_data = []
-        last_real_year_data = affiliation_df.iloc[-1]
-        current_year = int(last_real_year_data['year'])
-        current_publications = int(last_real_year_data['publication_count'])
-        
-        current_authors = hypothetical_authors if hypothetical_authors is not None else int(last_real_year_data['distinct_authors'])
-        
-        if current_authors > 0:
-            pubs_per_author_ratio = current_publications / current_authors
+        index = bundle.affiliation_index
+        current_pubs = index.latest_publications
+        if not index.latest_names:
+            predicted_pubs = np.empty(0, dtype=np.int64)
         else:
-            pubs_per_author_ratio = 1.0
+            with stage_timer("ranking", "features"):
+                features = np.column_stack((
+                    index.latest_years + 1, index.latest_encoded, current_pubs, index.latest_authors
+                ))
+            predicted_pubs = yield bundle.predict, features
 
-        affiliation_encoded = self.encoder.transform([affiliation_name])[0]
+        growth = predicted_pubs - current_pubs
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth_percentage = np.where(current_pubs > 0, growth / current_pubs * 100, 0.0)
+        table = RankingTable(bundle.version, index.latest_names, current_pubs, predicted_pubs,
+                             growth, growth_percentage)
+        self._ranking_table = table
+        return table
 
-        for _ in range(projection_years):
-            predict_year = current_year + 1
-            
-            authors_for_prediction = max(1, round(current_authors))
+    @staticmethod
+    def _ranking_rows(table: "RankingTable", indices: np.ndarray, first_rank: int = 1) -> List[Dict]:
+        names = table.names
+        ranking = []
+        for rank, i in enumerate(indices.tolist(), start=first_rank):
+            ranking.append({
+                "affiliation_name": names[i],
+                "current_year_publications": int(table.current[i]),
+                "predicted_next_year_publications": int(table.predicted[i]),
+                "growth": int(table.growth[i]),
+                "growth_percentage": round(float(table.growth_percentage[i]), 2),
+                "rank": rank
+            })
+        return ranking
 
-            predicted_pubs = self._run_prediction(predict_year, affiliation_encoded, current_publications, authors_for_prediction)
-            
-            projection_data.append({"year": predict_year, "publications": predicted_pubs, "type": 'predicted'})
-            
-            current_year = predict_year
-            current_publications = predicted_pubs
-            
-            if pubs_per_author_ratio > 0.001:
-                current_authors = predicted_pubs / pubs_per_author_ratio
-        
-        return {"affiliation_name": affiliation_name, "data": historical_data + projection_data}
+    def plan_ranking(self) -> Generator[PredictionStep, np.ndarray, List[Dict]]:
+        """Plan de cálculo de get_ranking: todas las afiliaciones, por crecimiento descendente."""
+        table = yield from self.plan_ranking_table()
+        with stage_timer("ranking", "rank"):
+            # Orden estable por crecimiento descendente, igual que sorted(..., reverse=True).
+            order = np.argsort(-table.growth, kind='stable')
+            return self._ranking_rows(table, order)
 
     def get_ranking(self) -> List[Dict]:
-        """Calcula el ranking de crecimiento para todas las afiliaciones."""
-        ranking_data = []
-        all_affiliations = self.get_all_affiliations()
-
-        for affiliation_name in all_affiliations:
-            affiliation_df = self.historical_df[self.historical_df['affiliation_name'] == affiliation_name].sort_values('year')
-            if not affiliation_df.empty:
-                last_real_year_data = affiliation_df.iloc[-1]
-                current_year = int(last_real_year_data['year'])
-                current_pubs = int(last_real_year_data['publication_count'])
-                current_authors = int(last_real_year_data['distinct_authors'])
-                
-                affiliation_encoded = self.encoder.transform([affiliation_name])[0]
-                
-                predicted_pubs = self._run_prediction(current_year + 1, affiliation_encoded, current_pubs, current_authors)
-                
-                growth = predicted_pubs - current_pubs
-                growth_percentage = (growth / current_pubs * 100) if current_pubs > 0 else 0
-                
-                ranking_data.append({
-                    "affiliation_name": affiliation_name,
-                    "current_year_publications": current_pubs,
-                    "predicted_next_year_publications": predicted_pubs,
-                    "growth": growth,
-                    "growth_percentage": round(growth_percentage, 2)
-                })
+        """
+        Calcula el ranking de crecimiento para todas las afiliaciones.
+        Todas se evalúan en un único lote sobre su último año real.
+        """
+        return self._drive(self.plan_ranking())
 
-        sorted_ranking = sorted(ranking_data, key=lambda x: x['growth'], reverse=True)
-        
-        for i, item in enumerate(sorted_ranking):
-            item['rank'] = i + 1
-            
-        return sorted_ranking
+    def plan_ranking_page(self, sort_by: str = "growth", descending: bool = True,
+                          min_current_publications: Optional[int] = None,
+                          min_predicted_publications: Optional[int] = None,
+                          offset: int = 0, limit: Optional[int] = None) -> Generator[PredictionStep, np.ndarray, Dict]:
+        """Plan de cálculo de get_ranking_page."""
+        table = yield from self.plan_ranking_table()
+        with stage_timer("ranking", "rank"):
+            indices, total = select_ranking(
+                table, sort_by, descending, min_current_publications, min_predicted_publications, offset, limit
+            )
+            return {"ranking": self._ranking_rows(table, indices, first_rank=offset + 1), "total": total}
+
+    def get_ranking_page(self, sort_by: str = "growth", descending: bool = True,
+                         min_current_publications: Optional[int] = None,
+                         min_predicted_publications: Optional[int] = None,
+                         offset: int = 0, limit: Optional[int] = None) -> Dict:
+        """
+        Una página del ranking: las afiliaciones que cumplen los filtros de
+        tamaño, ordenadas por `sort_by` ('growth' o 'growth_percentage'), con
+        empates en el orden del encoder. `rank` es la posición dentro de ese
+        orden. Devuelve la página y el total de afiliaciones que cumplen los filtros.
+        """
+        return self._drive(self.plan_ranking_page(
+            sort_by, descending, min_current_publications, min_predicted_publications, offset, limit
+        ))
+
+    # --- Backtest walk-forward ---
+
+    def plan_backtest(self, bundle: AssetBundle, cutoffs: List[int],
+                      horizon: int) -> Generator[PredictionStep, np.ndarray, Dict[str, Any]]:
+        """
+        Plan de cálculo del backtest: para cada año de corte C, cada afiliación
+        con datos reales en C se proyecta `horizon` años con la misma lógica
+        recursiva que get_projection, como si C fuera su último año conocido.
+        Todas las (afiliación, corte) avanzan juntas en un solo grupo, con una
+        llamada al modelo por año de horizonte, y las predicciones para C + h se
+        comparan con las filas reales de ese año cuando existen.
+        """
+        index = bundle.affiliation_index
+        counts = np.diff(np.asarray(index.offsets, dtype=np.int64))
+        years = np.asarray(index.years, dtype=np.int64)
+        publications = np.asarray(index.publications, dtype=np.int64)
+        authors = np.asarray(index.authors, dtype=np.int64)
+        row_affiliation = np.repeat(np.arange(len(counts)), counts)
+        encoded = np.array([index.encoded_by_name.get(name, -1) for name in index.affiliation_names], dtype=np.int64)
+
+        starts = np.concatenate([
+            np.flatnonzero((years == cutoff) & (encoded[row_affiliation] >= 0)) for cutoff in cutoffs
+        ]) if cutoffs else np.empty(0, dtype=np.int64)
+        scored = {"count": [0] * horizon, "abs": [0.0] * horizon, "sq": [0.0] * horizon}
+        if len(starts):
+            start_affiliation = row_affiliation[starts]
+            start_years = years[starts]
+            projected = yield from self._plan_cohort(
+                bundle, encoded[start_affiliation], start_years, publications[starts], authors[starts], horizon
+            )
+            # Clave (afiliación, año) de cada fila real; las filas ya están ordenadas por ambas.
+            first_year = int(years.min())
+            span = int(years.max()) - first_year + 1 + horizon
+            keys = row_affiliation * span + (years - first_year)
+            for step in range(horizon):
+                targets = start_affiliation * span + (start_years + step + 1 - first_year)
+                positions = np.minimum(np.searchsorted(keys, targets), len(keys) - 1)
+                found = keys[positions] == targets
+                errors = (projected[found, step] - publications[positions[found]]).astype(np.float64)
+                scored["count"][step] = int(found.sum())
+                scored["abs"][step] = float(np.abs(errors).sum())
+                scored["sq"][step] = float((errors ** 2).sum())
+
+        horizons = []
+        for step in range(horizon):
+            n = scored["count"][step]
+            horizons.append({
+                "horizon": step + 1,
+                "samples": n,
+                "mae": round(scored["abs"][step] / n, 4) if n else None,
+                "rmse": round(float(np.sqrt(scored["sq"][step] / n)), 4) if n else None,
+            })
+        return {"cutoffs": list(cutoffs), "projections": int(len(starts)), "horizons": horizons}
+
+    def backtest_cutoffs(self, bundle: AssetBundle, cutoffs: int, horizon: int) -> List[int]:
+        """Los `cutoffs` años más recientes que dejan al menos un año real para comparar."""
+        years = bundle.affiliation_index.years
+        if len(years) == 0 or cutoffs <= 0 or horizon <= 0:
+            return []
+        last_year = int(np.max(years))
+        first_year = int(np.min(years))
+        return [year for year in range(last_year - 1, last_year - 1 - cutoffs, -1) if year >= first_year]
+
+    def run_backtest(self, bundle: Optional[AssetBundle] = None) -> Dict[str, Any]:
+        """Ejecuta el backtest de un bundle (por defecto el vigente) de forma síncrona."""
+        bundle = bundle or self._bundle
+        started = time.perf_counter()
+        cutoffs = self.backtest_cutoffs(bundle, settings.BACKTEST_CUTOFFS, settings.BACKTEST_HORIZON)
+        result = self._drive(self.plan_backtest(bundle, cutoffs, settings.BACKTEST_HORIZON))
+        result["computed_at"] = time.time()
+        result["duration_seconds"] = round(time.perf_counter() - started, 4)
+        return result
+
+    def get_backtest(self) -> Optional[Dict[str, Any]]:
+        """
+        Resultado del backtest de la versión vigente, o None si todavía no está.
+        Nunca bloquea: si falta, lo lanza en un hilo en segundo plano y la
+        siguiente llamada lo encontrará listo.
+        """
+        bundle = self._bundle
+        if bundle is None or not settings.BACKTEST_ENABLED:
+            return None
+        with self._backtest_lock:
+            result = self._backtests.get(bundle.version)
+            if result is not None or self._backtest_running == bundle.version:
+                return result
+            self._backtest_running = bundle.version
+
+        def worker():
+            try:
+                result = self.run_backtest(bundle)
+            except Exception as e:
+                print(f"WARNING: Falló el backtest de la versión {bundle.version}: {e}")
+                result = None
+            with self._backtest_lock:
+                # Solo se conserva el resultado de la versión vigente
+                if result is not None and bundle is self._bundle:
+                    self._backtests = {bundle.version: result}
+                self._backtest_running = None
+            if result is not None:
+                print(f"Backtest de la versión {bundle.version}: {result['projections']} proyecciones "
+                      f"en {result['duration_seconds']:.2f} s.")
+
+        threading.Thread(target=worker, name="backtest", daemon=True).start()
+        return None
 
     def get_model_details(self) -> Dict:
         """
-        Devuelve metadatos sobre el modelo y los datos, 
-        basado en los resultados del notebook de entrenamiento.
+        Devuelve metadatos sobre el modelo y los datos. Las métricas de
+        rendimiento salen del backtest walk-forward de los activos vigentes
+        (error a un año); mientras se calcula se informan las del notebook de
+        entrenamiento.
         """
-        importances = self.model.feature_importances_
-        features = self.model.feature_name_
+        bundle = self._bundle
+        importances = bundle.feature_importances
+        features = bundle.feature_names
         feature_importance_dict = dict(zip(features, importances))
 
         # Datos extraídos del notebook 'models_split_top_10.ipynb'
@@ -148,12 +734,24 @@ class PredictionService:
             "mae": 2.20,  # Mean Absolute Error (MAE): 2.20
             "rmse": 4.67  # Root Mean Squared Error (RMSE): 4.67
         }
+        backtest = self.get_backtest()
+        # Solo se informan las del backtest si hay muestras a un año
+        from_backtest = bool(backtest is not None and backtest["horizons"] and backtest["horizons"][0]["samples"])
+        if from_backtest:
+            performance = {"mae": backtest["horizons"][0]["mae"], "rmse": backtest["horizons"][0]["rmse"]}
+
+        years = bundle.affiliation_index.years
+        historical_range = (f"Datos históricos de {int(np.min(years))} a {int(np.max(years))}"
+                            if len(years) else "Sin datos históricos")
 
         return {
             "model_type": "LightGBM Regressor",
             "training_data_range": "Datos históricos hasta el año 2021",
+            "historical_data_range": historical_range,
             "target_variable": "Número de publicaciones del año siguiente",
-            "total_affiliations": len(self.encoder.classes_),
+            "total_affiliations": len(bundle.encoder_classes),
             "performance_metrics": performance,
+            "performance_source": "backtest" if from_backtest else "notebook",
+            "backtest": backtest,
             "feature_importances": feature_importance_dict
         }
@@ -0,0 +1,294 @@
+# backend/app/services/profiler.py
+
+"""
+Perfilado por solicitud con un muestreador de pilas de baja sobrecarga.
+
+Un hilo toma cada `interval` segundos la pila de todos los hilos del proceso
+(`sys._current_frames()`) y guarda solo las que pasan por el código de la
+aplicación (app/), con su marca de tiempo. El perfil de una solicitud son las
+muestras tomadas entre su inicio y su fin, agregadas en formato de pilas
+colapsadas ("folded", una línea `raíz;...;hoja conteo` por pila), que abren
+directamente speedscope o flamegraph.pl.
+
+Como el event loop, el threadpool y el hilo del agrupador de micro-lotes se
+comparten, el perfil de una solicitud también incluye lo que otras solicitudes
+concurrentes ejecutaban en la misma ventana.
+"""
+
+import itertools
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+APP_DIR = str(Path(__file__).resolve().parent.parent)
+# Profundidad máxima de pila que se guarda (se conservan los marcos más cercanos a la hoja)
+MAX_STACK_DEPTH = 96
+
+Stack = Tuple[str, ...]
+
+
+class StackSampler:
+    """
+    Hilo muestreador. Puede quedar activo de forma permanente (para capturar
+    las solicitudes lentas a posteriori) o activarse solo mientras haya
+    solicitudes perfiladas en curso (acquire/release).
+    """
+    def __init__(self, interval_seconds: float = 0.005, retention_seconds: float = 120.0):
+        self.interval_seconds = interval_seconds
+        self.retention_seconds = retention_seconds
+        self._samples: Deque[Tuple[float, Stack]] = deque()
+        self._labels: Dict[object, str] = {}
+        self._lock = threading.Lock()
+        self._users = 0
+        self._always_on = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _label(self, code) -> str:
+        """Nombre del marco: 'función (archivo:línea)', con la ruta relativa al paquete."""
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            short = filename
+            if "site-packages/" in filename:
+                short = filename.split("site-packages/", 1)[1]
+            elif "/lib/python" in filename:
+                # Biblioteca estándar: lib/python3.X/threading.py -> threading.py
+                short = filename.split("/lib/python", 1)[1].partition("/")[2]
+            if filename.startswith(APP_DIR):
+                short = "app" + filename[len(APP_DIR):]
+            label = f"{code.co_name} ({short}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _capture(self, frame) -> Optional[Stack]:
+        labels = []
+        in_app = False
+        depth = 0
+        while frame is not None and depth < MAX_STACK_DEPTH:
+            code = frame.f_code
+            if not in_app and code.co_filename.startswith(APP_DIR):
+                in_app = True
+            labels.append(self._label(code))
+            frame = frame.f_back
+            depth += 1
+        if not in_app:
+            return None
+        labels.reverse()
+        return tuple(labels)
+
+    def _run(self, stop: threading.Event) -> None:
+        # `stop` es el evento de este hilo: _start crea uno nuevo para el siguiente.
+        own = threading.get_ident()
+        while not stop.wait(self.interval_seconds):
+            now = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = self._capture(frame)
+                if stack is not None:
+                    self._samples.append((now, stack))
+            horizon = now - self.retention_seconds
+            while self._samples and self._samples[0][0] < horizon:
+                self._samples.popleft()
+
+    def _start(self) -> None:
+        if self._thread is not None and self._thread.is_alive() and not self._stop.is_set():
+            return
+        if self._thread is not None:
+            # El hilo anterior ya recibió la señal: termina en a lo sumo un intervalo
+            self._thread.join()
+            self._samples.clear()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def _stop_if_idle(self) -> None:
+        if not self._always_on and self._users == 0 and self._thread is not None and not self._stop.is_set():
+            self._stop.set()
+            self._samples.clear()
+
+    def keep_running(self) -> None:
+        """Deja el muestreador activo de forma permanente."""
+        with self._lock:
+            self._always_on = True
+            self._start()
+
+    def acquire(self) -> None:
+        with self._lock:
+            self._users += 1
+            self._start()
+
+    def release(self) -> None:
+        with self._lock:
+            self._users -= 1
+            self._stop_if_idle()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._always_on = False
+            self._users = 0
+            self._stop_if_idle()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def collect(self, started: float, finished: float) -> Counter:
+        """Pilas muestreadas entre `started` y `finished` (perf_counter), con su conteo."""
+        # list() de un deque se hace sin soltar el GIL, así que no compite con el hilo muestreador.
+        return Counter(stack for at, stack in list(self._samples) if started <= at <= finished)
+
+
+class RequestProfile:
+    """Perfil de una solicitud: metadatos y pilas colapsadas."""
+    def __init__(self, profile_id: int, method: str, path: str, status: int, duration_seconds: float,
+                 reason: str, stacks: Counter, interval_seconds: float):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.status = status
+        self.duration_seconds = duration_seconds
+        self.reason = reason
+        self.stacks = stacks
+        self.interval_seconds = interval_seconds
+        self.captured_at = time.time()
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def hot_spots(self, limit: int = 5) -> List[Tuple[str, int]]:
+        """Funciones de la aplicación con más muestras propias (el marco de app/ más cercano a la hoja)."""
+        counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            for label in reversed(stack):
+                if "(app/" in label:
+                    counts[label] += count
+                    break
+        return counts.most_common(limit)
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_seconds": round(self.duration_seconds, 4),
+            "reason": self.reason,
+            "samples": self.samples,
+            "interval_ms": self.interval_seconds * 1000,
+            "captured_at": self.captured_at,
+            "hot_spots": [{"frame": frame, "samples": count} for frame, count in self.hot_spots()],
+        }
+
+    def folded(self) -> str:
+        """Pilas colapsadas: `raíz;...;hoja conteo`, una por línea."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Últimos N perfiles, en un buffer circular."""
+    def __init__(self, max_profiles: int = 50):
+        self._profiles: Deque[RequestProfile] = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        with self._lock:
+            return next((p for p in self._profiles if p.id == profile_id), None)
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._profiles)]
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila una fracción `sample_rate` de las solicitudes,
+    las que traen la cabecera de depuración con el token de administración y,
+    si `slow_request_seconds > 0`, cualquier solicitud que supere ese umbral
+    (para esto el muestreador queda activo de forma permanente). Los perfiles
+    quedan en `store` y la respuesta perfilada incluye la cabecera X-Profile-Id.
+    """
+    def __init__(self, app, sampler: StackSampler, store: ProfileStore, sample_rate: float = 0.0,
+                 slow_request_seconds: float = 0.0, debug_header: str = "x-debug-profile",
+                 debug_token: Optional[str] = None):
+        self.app = app
+        self.sampler = sampler
+        self.store = store
+        self.sample_rate = sample_rate
+        self.slow_request_seconds = slow_request_seconds
+        self.debug_header = debug_header.lower().encode("latin-1")
+        self.debug_token = debug_token
+        if slow_request_seconds > 0:
+            sampler.keep_running()
+
+    def _requested(self, scope) -> Optional[str]:
+        if self.debug_token:
+            for name, value in scope.get("headers", []):
+                if name == self.debug_header:
+                    if secrets.compare_digest(value.decode("latin-1"), self.debug_token):
+                        return "header"
+                    break
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        reason = self._requested(scope)
+        if reason is None and self.slow_request_seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = self.store.next_id() if reason is not None else None
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if profile_id is not None:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-profile-id", str(profile_id).encode("latin-1"))
+                    ]
+            await send(message)
+
+        if reason is not None:
+            self.sampler.acquire()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finished = time.perf_counter()
+            duration = finished - started
+            slow = self.slow_request_seconds > 0 and duration >= self.slow_request_seconds
+            if reason is not None or slow:
+                if profile_id is None:
+                    profile_id = self.store.next_id()
+                profile = RequestProfile(
+                    profile_id, scope.get("method", ""), scope.get("path", ""), status["code"], duration,
+                    reason or "slow", self.sampler.collect(started, finished), self.sampler.interval_seconds
+                )
+                self.store.add(profile)
+                if slow:
+                    hot = ", ".join(f"{frame} x{count}" for frame, count in profile.hot_spots(3)) or "sin muestras"
+                    print(f"WARNING: Solicitud lenta: {profile.method} {profile.path} {duration:.3f} s "
+                          f"(status {profile.status}, perfil {profile_id}): {hot}")
+            if reason is not None:
+                self.sampler.release()
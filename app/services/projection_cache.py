@@ -0,0 +1,100 @@
+# backend/app/services/projection_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+
+class ProjectionCache:
+    """
+    Caché en memoria, acotada, para las series proyectadas por PredictionService.
+
+    Cada entrada guarda la serie de publicaciones predichas más larga calculada
+    para una clave (versión de activos, afiliación, autores hipotéticos). Como la
+    proyección es recursiva, los primeros N años de una serie más larga son
+    exactamente la proyección a N años, de modo que una proyección a 20 años
+    responde cualquier consulta posterior de menor horizonte.
+
+    La expulsión es LRU (por número de entradas) y por antigüedad (TTL).
+    """
+    def __init__(self, maxsize: int = 4096, ttl_seconds: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Tuple[int, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, projection_years: int) -> Optional[Tuple[int, ...]]:
+        """
+        Devuelve los primeros `projection_years` valores cacheados para la clave,
+        o None si no existe una serie suficientemente larga y vigente.
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                stored_at, values = item
+                if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                    del self._entries[key]
+                    self.expirations += 1
+                elif len(values) >= projection_years:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return values[:projection_years]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, values: Tuple[int, ...]) -> None:
+        """Guarda una serie, salvo que ya exista una más larga para la misma clave."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and len(item[1]) > len(values):
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = (time.monotonic(), tuple(values))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def migrate(self, old_version: str, new_version: str, stale_names: Set[str]) -> int:
+        """
+        Pasa las entradas de `old_version` a `new_version` salvo las de las
+        afiliaciones en `stale_names`, que se descartan (actualización parcial
+        de los datos históricos). Devuelve cuántas entradas se descartaron.
+        Las entradas conservan su posición en el orden LRU.
+        """
+        with self._lock:
+            invalidated = 0
+            entries: "OrderedDict[Hashable, Tuple[float, Tuple[int, ...]]]" = OrderedDict()
+            for key, item in self._entries.items():
+                if key[0] == old_version:
+                    if key[1] in stale_names:
+                        invalidated += 1
+                        continue
+                    key = (new_version,) + tuple(key[1:])
+                entries[key] = item
+            self._entries = entries
+            return invalidated
+
+    def clear(self) -> None:
+        """Vacía la caché (por ejemplo, al recargar los activos)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de uso de la caché."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,108 @@
+# backend/app/services/response_cache.py
+
+import gzip
+import hashlib
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el paquete brotli solo se ofrece gzip
+    brotli = None
+
+
+class RenderedResponse:
+    """
+    Cuerpo JSON ya serializado de una respuesta, con sus variantes comprimidas
+    y un ETag fuerte por variante derivado del contenido (las variantes tienen
+    bytes distintos, así que no pueden compartir un ETag fuerte).
+    """
+    def __init__(self, version: str, body: bytes, media_type: str = "application/json"):
+        self.version = version
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants: Dict[str, bytes] = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            # La calidad 11 comprime ~15 % más pero tarda ~30 veces más (1 s para el ranking)
+            self.variants["br"] = brotli.compress(body, quality=9)
+        self.etags: Dict[str, str] = {
+            coding: f'"{digest}"' if coding == "identity" else f'"{digest}-{coding}"'
+            for coding in self.variants
+        }
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+        """Elige la variante según Accept-Encoding (br > gzip > sin comprimir)."""
+        accepted, refused = set(), set()
+        for item in (accept_encoding or "").split(","):
+            coding, _, params = item.strip().partition(";")
+            coding = coding.strip().lower()
+            q = params.strip()
+            if q.startswith("q="):
+                try:
+                    if float(q[2:]) <= 0:
+                        refused.add(coding)
+                        continue
+                except ValueError:
+                    continue
+            accepted.add(coding)
+        for coding in ("br", "gzip"):
+            # "*" no habilita una codificación rechazada explícitamente con q=0
+            if coding in self.variants and (coding in accepted or ("*" in accepted and coding not in refused)):
+                return coding, self.variants[coding]
+        return "identity", self.variants["identity"]
+
+
+class ResponseCache:
+    """
+    Respuestas pre-serializadas de los endpoints cuyo contenido solo depende
+    de la versión de los activos (/ranking, /affiliations, /model-details).
+    Cada respuesta se renderiza una vez por versión; al cambiar la versión las
+    anteriores se descartan.
+    """
+    def __init__(self):
+        self._entries: Dict[str, RenderedResponse] = {}
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.hits = 0
+        self.not_modified = 0
+
+    def get(self, name: str, version: str) -> Optional[RenderedResponse]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry.version == version:
+                self.hits += 1
+                return entry
+            return None
+
+    def put(self, name: str, version: str, body: bytes) -> RenderedResponse:
+        entry = RenderedResponse(version, body)
+        with self._lock:
+            self.renders += 1
+            for key in [key for key, other in self._entries.items() if other.version != version]:
+                del self._entries[key]
+            self._entries[name] = entry
+        return entry
+
+    def get_or_render(self, name: str, version: str, render: Callable[[], bytes]) -> RenderedResponse:
+        entry = self.get(name, version)
+        if entry is None:
+            entry = self.put(name, version, render())
+        return entry
+
+    def clear(self) -> None:
+        """Descarta todas las respuestas (la próxima solicitud las vuelve a renderizar)."""
+        with self._lock:
+            self._entries.clear()
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "renders": self.renders,
+                "hits": self.hits,
+                "not_modified": self.not_modified,
+            }
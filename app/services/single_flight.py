@@ -0,0 +1,78 @@
+# backend/app/services/single_flight.py
+
+"""
+Agrupación de cálculos idénticos en curso ("single-flight").
+
+Cuando llegan a la vez muchas solicitudes con el mismo cálculo (la misma
+operación, los mismos argumentos y la misma versión de activos), solo la
+primera lo ejecuta; las demás esperan su resultado sin ocupar un lugar en el
+control de admisión. El cálculo corre en una tarea propia, así que si el
+cliente que lo inició se desconecta el resto igual recibe la respuesta.
+
+Los resultados se comparten entre las solicitudes agrupadas y deben tratarse
+como de solo lectura.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+def freeze(value: Any) -> Hashable:
+    """Convierte listas y tuplas (anidadas) en una clave hasheable."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class SingleFlight:
+    """
+    Cálculos en curso por (ruta, clave), con contadores por ruta.
+    Pensado para usarse desde el event loop (no es seguro entre hilos).
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._in_flight: Dict[Tuple[str, Hashable], asyncio.Task] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    async def run(self, route: str, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Devuelve el resultado de `compute()`; si ya hay un cálculo de `route`
+        con la misma clave en curso, espera ese en lugar de iniciar otro. Las
+        excepciones del cálculo se propagan a todas las solicitudes agrupadas.
+        """
+        if not self.enabled:
+            return await compute()
+        counters = self._route_counters(route)
+        flight_key = (route, key)
+        task = self._in_flight.get(flight_key)
+        if task is not None:
+            counters["coalesced"] += 1
+        else:
+            counters["executions"] += 1
+            task = asyncio.ensure_future(compute())
+            self._in_flight[flight_key] = task
+            task.add_done_callback(lambda done: self._finished(flight_key, done))
+        # shield: cancelar una solicitud no cancela el cálculo compartido
+        return await asyncio.shield(task)
+
+    def _route_counters(self, route: str) -> Dict[str, int]:
+        counters = self._counters.get(route)
+        if counters is None:
+            counters = self._counters[route] = {"executions": 0, "coalesced": 0, "errors": 0}
+        return counters
+
+    def _finished(self, flight_key: Tuple[str, Hashable], task: asyncio.Task) -> None:
+        if self._in_flight.get(flight_key) is task:
+            del self._in_flight[flight_key]
+        # Consultar la excepción también evita el aviso de "never retrieved"
+        if not task.cancelled() and task.exception() is not None:
+            self._counters[flight_key[0]]["errors"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        in_flight: Dict[str, int] = {}
+        for route, _ in self._in_flight:
+            in_flight[route] = in_flight.get(route, 0) + 1
+        return {
+            route: dict(counters, in_flight=in_flight.get(route, 0))
+            for route, counters in self._counters.items()
+        }
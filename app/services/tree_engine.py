@@ -0,0 +1,170 @@
+# backend/app/services/tree_engine.py
+
+import numpy as np
+from typing import Dict, List
+
+# Constantes equivalentes a las de LightGBM (include/LightGBM/tree.h).
+MISSING_NONE = 0
+MISSING_ZERO = 1
+MISSING_NAN = 2
+_MISSING_TYPES = {"None": MISSING_NONE, "Zero": MISSING_ZERO, "NaN": MISSING_NAN}
+ZERO_THRESHOLD = 1e-35
+
+_IDENTITY_OBJECTIVES = {"regression", "regression_l1", "huber", "fair", "quantile", "mape"}
+_EXP_OBJECTIVES = {"poisson", "gamma", "tweedie"}
+
+
+class TreeEnsemble:
+    """
+    Motor de inferencia en NumPy para un booster de LightGBM.
+
+    Compila el modelo volcado (`booster.dump_model()`) en arreglos planos con
+    la característica, el umbral y los hijos de cada nodo interno y el valor de
+    cada hoja. Los hijos se codifican como en LightGBM: un índice >= 0 apunta a
+    otro nodo interno y un valor negativo `~i` apunta a la hoja `i`.
+    La evaluación recorre todos los árboles para todas las filas a la vez,
+    sin construir DataFrames.
+
+    Solo admite divisiones numéricas y objetivos de regresión.
+    """
+    # Arreglos que definen el ensamble compilado (ver to_arrays / from_arrays).
+    ARRAY_FIELDS = (
+        "split_feature", "threshold", "missing_type", "default_left",
+        "left_child", "right_child", "leaf_value", "roots",
+    )
+
+    def __init__(self, model_dump: Dict, num_iteration: int = 0):
+        objective = model_dump.get("objective", "regression").split(" ")[0]
+        if objective in _IDENTITY_OBJECTIVES:
+            self._exp_output = False
+        elif objective in _EXP_OBJECTIVES:
+            self._exp_output = True
+        else:
+            raise ValueError(f"Objetivo no soportado por el motor NumPy: '{objective}'")
+        if model_dump.get("num_tree_per_iteration", 1) != 1:
+            raise ValueError("El motor NumPy solo admite modelos con un árbol por iteración.")
+
+        trees = model_dump["tree_info"]
+        if num_iteration > 0:
+            trees = trees[:num_iteration]
+        self.num_features = model_dump["max_feature_idx"] + 1
+        self.average_output = bool(model_dump.get("average_output", False))
+
+        split_feature: List[int] = []
+        threshold: List[float] = []
+        missing_type: List[int] = []
+        default_left: List[bool] = []
+        left_child: List[int] = []
+        right_child: List[int] = []
+        leaf_value: List[float] = []
+        roots: List[int] = []
+
+        for tree in trees:
+            # Recorrido iterativo: cada nodo recibe su índice global antes que sus hijos.
+            root = tree["tree_structure"]
+            stack = [(root, None, None)]
+            while stack:
+                node, parent, is_left = stack.pop()
+                if "leaf_value" in node:
+                    code = ~len(leaf_value)
+                    leaf_value.append(float(node["leaf_value"]))
+                else:
+                    if node["decision_type"] != "<=":
+                        raise ValueError("El motor NumPy no admite divisiones categóricas.")
+                    code = len(split_feature)
+                    split_feature.append(int(node["split_feature"]))
+                    threshold.append(float(node["threshold"]))
+                    missing_type.append(_MISSING_TYPES[node["missing_type"]])
+                    default_left.append(bool(node["default_left"]))
+                    left_child.append(0)
+                    right_child.append(0)
+                    stack.append((node["right_child"], code, False))
+                    stack.append((node["left_child"], code, True))
+
+                if parent is None:
+                    roots.append(code)
+                elif is_left:
+                    left_child[parent] = code
+                else:
+                    right_child[parent] = code
+
+        self.split_feature = np.array(split_feature, dtype=np.int32)
+        self.threshold = np.array(threshold, dtype=np.float64)
+        self.missing_type = np.array(missing_type, dtype=np.int8)
+        self.default_left = np.array(default_left, dtype=bool)
+        self.left_child = np.array(left_child, dtype=np.int32)
+        self.right_child = np.array(right_child, dtype=np.int32)
+        self.leaf_value = np.array(leaf_value, dtype=np.float64)
+        self.roots = np.array(roots, dtype=np.int32)
+
+    @classmethod
+    def from_model(cls, model) -> "TreeEnsemble":
+        """Compila un LGBMRegressor respetando su best_iteration_, como hace predict()."""
+        num_iteration = getattr(model, "best_iteration_", 0) or 0
+        return cls(model.booster_.dump_model(), num_iteration=num_iteration)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], metadata: Dict) -> "TreeEnsemble":
+        """Reconstruye un ensamble compilado a partir de to_arrays() y metadata()."""
+        engine = cls.__new__(cls)
+        for field in cls.ARRAY_FIELDS:
+            setattr(engine, field, arrays[field])
+        engine.num_features = int(metadata["num_features"])
+        engine.average_output = bool(metadata["average_output"])
+        engine._exp_output = bool(metadata["exp_output"])
+        return engine
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {field: getattr(self, field) for field in self.ARRAY_FIELDS}
+
+    def metadata(self) -> Dict:
+        return {
+            "num_features": self.num_features,
+            "average_output": self.average_output,
+            "exp_output": self._exp_output,
+        }
+
+    @property
+    def num_trees(self) -> int:
+        return len(self.roots)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Evalúa una fila (1D) o una matriz de filas (2D) y devuelve las predicciones."""
+        X = np.asarray(features, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.num_features:
+            raise ValueError(f"Se esperaban {self.num_features} características, se recibieron {X.shape[1]}.")
+
+        n_rows = X.shape[0]
+        if n_rows == 0 or self.num_trees == 0:
+            return np.zeros(n_rows, dtype=np.float64)
+
+        nodes = np.broadcast_to(self.roots, (n_rows, self.num_trees)).copy()
+        rows = np.broadcast_to(np.arange(n_rows)[:, None], nodes.shape)
+
+        active = nodes >= 0
+        while active.any():
+            node = nodes[active]
+            value = X[rows[active], self.split_feature[node]]
+            node_missing = self.missing_type[node]
+
+            is_nan = np.isnan(value)
+            value = np.where(is_nan & (node_missing != MISSING_NAN), 0.0, value)
+            is_missing = (
+                ((node_missing == MISSING_ZERO) & (np.abs(value) <= ZERO_THRESHOLD))
+                | ((node_missing == MISSING_NAN) & is_nan)
+            )
+            go_left = np.where(is_missing, self.default_left[node], value <= self.threshold[node])
+
+            nodes[active] = np.where(go_left, self.left_child[node], self.right_child[node])
+            active = nodes >= 0
+
+        # Suma secuencial en el orden de los árboles, como LightGBM.
+        leaf_outputs = self.leaf_value[~nodes]
+        output = np.cumsum(leaf_outputs, axis=1)[:, -1]
+        if self.average_output:
+            output = output / self.num_trees
+        if self._exp_output:
+            output = np.exp(output)
+        return output
@@ -0,0 +1,395 @@
+# benchmarks/run_benchmarks.py
+
+"""
+Benchmarks reproducibles de PredictionService y de los endpoints HTTP.
+
+Para cada escala (afiliaciones x años) se generan artefactos sintéticos (ver
+synthetic_assets), se cargan en un PredictionService y se mide:
+
+- la carga de los activos,
+- los métodos del servicio (ranking y proyección, con y sin caché,
+  comparación, búsqueda de afiliaciones),
+- los endpoints a través de la app ASGI en el mismo proceso (sin red), tanto
+  en secuencia (latencia) como con solicitudes concurrentes (throughput).
+
+Cada medición reporta percentiles de latencia (p50/p90/p99), operaciones por
+segundo y el pico de memoria asignada (tracemalloc, en una corrida aparte para
+no distorsionar los tiempos). Cada benchmark se repite en varias rondas: se
+reporta la mediana de cada métrica entre rondas y su dispersión relativa. Los
+resultados se guardan en JSON y se pueden comparar contra un baseline guardado
+para detectar regresiones; un cambio solo cuenta como regresión si supera
+tanto el umbral como el ruido medido en ambas corridas.
+
+Uso:
+    python -m benchmarks.run_benchmarks --scales 1000x10,10000x30 --output bench.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json --fail-on-regression
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic_assets import generate_assets
+
+DEFAULT_SCALES = "1000x10,10000x30,100000x50"
+# Métricas comparadas contra el baseline y si un valor mayor es peor
+COMPARED_METRICS = {"p50_ms": True, "p90_ms": True, "ops_per_second": False, "peak_memory_mb": True}
+# Valores que no varían entre rondas y se copian tal cual
+_CONSTANT_FIELDS = ("iterations", "concurrency")
+# Múltiplo de la dispersión (suma de ambas corridas) por debajo del cual un cambio se considera ruido
+NOISE_MULTIPLIER = 2.0
+
+
+def parse_scales(text: str) -> List[Tuple[int, int]]:
+    scales = []
+    for item in text.split(","):
+        affiliations, _, years = item.strip().lower().partition("x")
+        scales.append((int(affiliations), int(years)))
+    return scales
+
+
+def summarize(latencies: List[float], wall_seconds: float, operations: int) -> Dict[str, float]:
+    ms = np.array(latencies) * 1000
+    return {
+        "iterations": operations,
+        "mean_ms": round(float(ms.mean()), 4),
+        "min_ms": round(float(ms.min()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p90_ms": round(float(np.percentile(ms, 90)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+        "ops_per_second": round(operations / wall_seconds, 2) if wall_seconds > 0 else None,
+    }
+
+
+def combine_rounds(rounds: List[Dict[str, float]]) -> Dict[str, object]:
+    """
+    Combina las rondas de un benchmark: la mediana de cada métrica y, en
+    `spread`, su dispersión relativa (rango intercuartil / mediana), que
+    compare() usa como medida del ruido. El rango intercuartil no se deja
+    arrastrar por una sola ronda atípica.
+    """
+    result: Dict[str, object] = {"repeats": len(rounds)}
+    spread: Dict[str, float] = {}
+    for key, first in rounds[0].items():
+        values = [r[key] for r in rounds if r.get(key) is not None]
+        if key in _CONSTANT_FIELDS or not values:
+            result[key] = first
+            continue
+        median = float(np.median(values))
+        result[key] = round(median, 4)
+        if median:
+            q1, q3 = np.percentile(values, [25, 75])
+            spread[key] = round(float(q3 - q1) / abs(median), 4)
+    result["spread"] = spread
+    return result
+
+
+def peak_memory_mb(fn: Callable[[], object]) -> float:
+    """Pico de memoria asignada (MiB) durante una llamada, medido con tracemalloc."""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 2 ** 20, 3)
+
+
+def measure(fn: Callable[[], object], iterations: int, warmup: int,
+            setup: Optional[Callable[[], None]] = None, repeats: int = 1) -> Dict[str, object]:
+    """
+    Mide una función síncrona en `repeats` rondas de `iterations` llamadas;
+    `setup` se ejecuta antes de cada llamada, fuera del tiempo medido.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    rounds = []
+    for _ in range(max(1, repeats)):
+        latencies = []
+        for _ in range(iterations):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - started)
+        rounds.append(summarize(latencies, sum(latencies), iterations))
+    result = combine_rounds(rounds)
+    if setup:
+        setup()
+    result["peak_memory_mb"] = peak_memory_mb(fn)
+    return result
+
+
+async def measure_http(client, path_fn: Callable[[int], str], iterations: int, warmup: int,
+                       concurrency: int, headers: Optional[Dict[str, str]] = None,
+                       expected_status: int = 200, repeats: int = 1,
+                       setup: Optional[Callable[[], None]] = None) -> Dict[str, object]:
+    """
+    Latencia en secuencia y throughput con `concurrency` solicitudes
+    simultáneas, en `repeats` rondas. `setup` se ejecuta antes de cada
+    solicitud en secuencia y de cada grupo concurrente, fuera del tiempo medido.
+    """
+    async def request(i: int) -> float:
+        started = time.perf_counter()
+        response = await client.get(path_fn(i), headers=headers)
+        elapsed = time.perf_counter() - started
+        if response.status_code != expected_status:
+            raise RuntimeError(f"{path_fn(i)} respondió {response.status_code}")
+        return elapsed
+
+    for i in range(warmup):
+        if setup:
+            setup()
+        await request(i)
+    rounds = []
+    for _ in range(max(1, repeats)):
+        latencies = []
+        for i in range(iterations):
+            if setup:
+                setup()
+            latencies.append(await request(i))
+        result = summarize(latencies, sum(latencies), iterations)
+
+        wall = 0.0
+        for offset in range(0, iterations, concurrency):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            await asyncio.gather(*(request(i) for i in range(offset, min(offset + concurrency, iterations))))
+            wall += time.perf_counter() - started
+        result["concurrency"] = concurrency
+        result["concurrent_ops_per_second"] = round(iterations / wall, 2)
+        rounds.append(result)
+    return combine_rounds(rounds)
+
+
+def service_benchmarks(service, names: List[str], iterations: int, warmup: int, seed: int,
+                       repeats: int = 1) -> Dict[str, Dict]:
+    rng = random.Random(seed)
+    cache = service.projection_cache
+    results = {}
+
+    def reset_ranking():
+        # La tabla del ranking se guarda por versión: sin esto solo se mediría el acierto
+        service._ranking_table = None
+
+    results["service.ranking"] = measure(
+        service.get_ranking, max(3, iterations // 10), 1, setup=reset_ranking, repeats=repeats
+    )
+    service.get_ranking()
+    results["service.ranking_cached"] = measure(service.get_ranking, iterations, warmup, repeats=repeats)
+    results["service.projection_cold"] = measure(
+        lambda: service.get_projection(rng.choice(names), 5), iterations, warmup, setup=cache.clear,
+        repeats=repeats
+    )
+    cached_name = names[0]
+    service.get_projection(cached_name, 20)
+    results["service.projection_cached"] = measure(
+        lambda: service.get_projection(cached_name, 5), iterations, warmup, repeats=repeats
+    )
+    results["service.compare_10"] = measure(
+        lambda: service.get_projections(rng.sample(names, min(10, len(names))), 5), iterations, warmup,
+        setup=cache.clear, repeats=repeats
+    )
+    results["service.what_if"] = measure(
+        lambda: service.get_projection(rng.choice(names), 10, hypothetical_authors=rng.randint(1, 500)),
+        iterations, warmup, setup=cache.clear, repeats=repeats
+    )
+    results["service.search"] = measure(
+        lambda: service.search_affiliations("universidad quito", 20, 0), iterations, warmup, repeats=repeats
+    )
+    return results
+
+
+async def http_benchmarks(bundle, names: List[str], iterations: int, warmup: int,
+                          concurrency: int, repeats: int = 1) -> Dict[str, Dict]:
+    import httpx
+    from urllib.parse import quote
+    from app.api.v1.endpoints import analytics
+    from app.core.config import settings
+    from app.main import app
+
+    # El servicio de la app usa el bundle sintético; la app no se inicia con
+    # lifespan, así que no carga los activos reales.
+    analytics.prediction_service._swap_bundle(bundle)
+    prefix = settings.API_V1_STR
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    def reset_ranking():
+        # Sin la tabla ni la respuesta pre-serializada, cada solicitud (o cada
+        # grupo concurrente, que se agrupa en un solo cálculo) recalcula el ranking
+        analytics.prediction_service._ranking_table = None
+        analytics.response_cache.clear()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results["http.ranking"] = await measure_http(
+            client, lambda i: f"{prefix}/ranking", max(3, iterations // 10), 1, concurrency, repeats=repeats,
+            setup=reset_ranking
+        )
+        ranking = await client.get(f"{prefix}/ranking")
+        results["http.ranking_cached"] = await measure_http(
+            client, lambda i: f"{prefix}/ranking", iterations, warmup, concurrency, repeats=repeats
+        )
+        results["http.ranking_not_modified"] = await measure_http(
+            client, lambda i: f"{prefix}/ranking", iterations, warmup, concurrency,
+            headers={"If-None-Match": ranking.headers.get("etag", "")}, expected_status=304, repeats=repeats
+        )
+        # Sin caché de proyecciones, para que todas las rondas midan el cálculo
+        results["http.projection"] = await measure_http(
+            client, lambda i: f"{prefix}/projection/{quote(names[i % len(names)])}?projection_years=5",
+            iterations, warmup, concurrency, repeats=repeats, setup=analytics.prediction_service.projection_cache.clear
+        )
+        results["http.affiliations_search"] = await measure_http(
+            client, lambda i: f"{prefix}/affiliations?q=universidad%20quito&limit=20", iterations, warmup,
+            concurrency, repeats=repeats
+        )
+    return results
+
+
+def run_scale(work_dir: Path, affiliations: int, years: int, seed: int, iterations: int, warmup: int,
+              concurrency: int, http: bool, repeats: int = 1) -> Dict[str, Dict]:
+    from app.services.prediction_service import PredictionService
+
+    paths = generate_assets(work_dir, affiliations, years, seed)
+    service = PredictionService(load_assets=False)
+    service.MODEL_PATH = paths["model"]
+    service.ENCODER_PATH = paths["encoder"]
+    service.HISTORICAL_DATA_PATH = paths["historical_data"]
+    service.SNAPSHOT_PATH = work_dir / "sin-snapshot"
+
+    results = {"service.load_assets": measure(service._load_assets, 1, 0)}
+    if not service.check_assets_loaded():
+        raise RuntimeError("No se pudieron cargar los artefactos sintéticos.")
+    names = list(service.bundle.affiliation_index.latest_names)
+    results.update(service_benchmarks(service, names, iterations, warmup, seed, repeats))
+    if http:
+        results.update(asyncio.run(http_benchmarks(service.bundle, names, iterations, warmup, concurrency, repeats)))
+    return results
+
+
+def environment() -> Dict[str, object]:
+    import lightgbm
+    import pandas
+    from app.core.config import settings
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "created_at": time.time(),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "lightgbm": lightgbm.__version__,
+        "prediction_backend": settings.PREDICTION_BACKEND,
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """
+    Imprime la comparación con el baseline y devuelve las regresiones. Un
+    cambio cuenta como regresión si supera el umbral y, además, NOISE_MULTIPLIER
+    veces la suma de la dispersión entre rondas de ambas corridas: dentro de
+    ese margen no se distingue del ruido. Los baselines sin dispersión solo
+    usan el umbral.
+    """
+    regressions = []
+    print(f"\n{'benchmark':55} {'métrica':16} {'baseline':>12} {'actual':>12} {'cambio':>9} {'margen':>8}")
+    for key in sorted(set(results) & set(baseline)):
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            old, new = baseline[key].get(metric), results[key].get(metric)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            noise = baseline[key].get("spread", {}).get(metric, 0.0) + results[key].get("spread", {}).get(metric, 0.0)
+            allowed = max(threshold, NOISE_MULTIPLIER * noise)
+            worse = change > allowed if higher_is_worse else change < -allowed
+            flag = "  REGRESIÓN" if worse else ""
+            print(f"{key:55} {metric:16} {old:12.4f} {new:12.4f} {change:+8.1%} {allowed:8.1%}{flag}")
+            if worse:
+                regressions.append(f"{key} {metric}: {old} -> {new} ({change:+.1%}, margen {allowed:.1%})")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de PredictionService y de los endpoints.")
+    parser.add_argument("--scales", default=DEFAULT_SCALES,
+                        help=f"Escalas afiliacionesxaños separadas por comas (por defecto {DEFAULT_SCALES}).")
+    parser.add_argument("--iterations", type=int, default=200, help="Repeticiones medidas por benchmark.")
+    parser.add_argument("--warmup", type=int, default=10, help="Repeticiones previas sin medir.")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Rondas por benchmark; se reporta la mediana y la dispersión entre rondas.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Solicitudes simultáneas para el throughput HTTP.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=["lightgbm", "numpy"], default=None,
+                        help="Motor de inferencia (por defecto, PREDICTION_BACKEND).")
+    parser.add_argument("--no-http", action="store_true", help="Omite los benchmarks de los endpoints.")
+    parser.add_argument("--work-dir", type=Path, default=Path(".bench_artifacts"),
+                        help="Directorio para los artefactos sintéticos (se reutilizan entre corridas).")
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+    parser.add_argument("--baseline", type=Path, default=None, help="Resultados previos con los que comparar.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Cambio relativo mínimo para marcar una regresión (0.2 = 20%%); se amplía "
+                             "con la dispersión medida entre rondas.")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Termina con código 1 si hay regresiones.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from app.core.config import settings
+    if args.backend is not None:
+        settings.PREDICTION_BACKEND = args.backend
+
+    report = {"environment": environment(), "results": {}, "peak_rss_mb": {}}
+    for affiliations, years in parse_scales(args.scales):
+        scale = f"{affiliations}x{years}"
+        print(f"Escala {scale}...")
+        results = run_scale(args.work_dir, affiliations, years, args.seed, args.iterations, args.warmup,
+                            args.concurrency, not args.no_http, args.repeats)
+        for name, result in results.items():
+            report["results"][f"{scale}/{name}"] = result
+            print(f"  {name:32} p50 {result['p50_ms']:10.3f} ms  p99 {result['p99_ms']:10.3f} ms  "
+                  f"{result['ops_per_second'] or 0:10.1f} ops/s")
+        # ru_maxrss está en KiB en Linux: es el máximo del proceso hasta esta escala
+        report["peak_rss_mb"][scale] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados guardados en '{args.output}'.")
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regresiones por encima del umbral ({args.threshold:.0%}) y del ruido:")
+            for regression in regressions:
+                print(f"  {regression}")
+            if args.fail_on_regression:
+                return 1
+        else:
+            print("\nSin regresiones respecto del baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
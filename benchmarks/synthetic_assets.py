@@ -0,0 +1,155 @@
+# benchmarks/synthetic_assets.py
+
+"""
+Genera artefactos sintéticos con el mismo formato que los reales
+(publication_data.csv, affiliation_encoder.pkl y publication_model.pkl) a la
+escala que se pida, para medir el servicio sin depender de los datos de
+producción.
+
+Los artefactos se guardan en `<work_dir>/<afiliaciones>x<años>-s<semilla>/` y
+se reutilizan si ya existen, de modo que dos corridas con los mismos
+parámetros miden exactamente los mismos datos.
+
+Uso:
+    python -m benchmarks.synthetic_assets --affiliations 10000 --years 20
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+MODEL_FILE = "publication_model.pkl"
+ENCODER_FILE = "affiliation_encoder.pkl"
+DATA_FILE = "publication_data.csv"
+INFO_FILE = "synthetic.json"
+
+LAST_YEAR = 2023
+# Filas (pares año -> año siguiente) usadas para entrenar el modelo sintético
+MAX_TRAINING_ROWS = 200_000
+
+_NAME_PREFIXES = [
+    "Universidad", "Escuela Politécnica", "Hospital", "Instituto de Investigación",
+    "Pontificia Universidad Católica", "Centro de Biotecnología", "Facultad de Ingeniería",
+]
+_NAME_PLACES = ["Quito", "Cuenca", "Guayaquil", "Loja", "Ambato", "Manabí", "Galápagos", "Ibarra"]
+
+
+def synthetic_dir(work_dir: Path, affiliations: int, years: int, seed: int) -> Path:
+    return Path(work_dir) / f"{affiliations}x{years}-s{seed}"
+
+
+def synthetic_names(affiliations: int, rng: np.random.Generator) -> list:
+    prefixes = rng.integers(0, len(_NAME_PREFIXES), affiliations)
+    places = rng.integers(0, len(_NAME_PLACES), affiliations)
+    return [
+        f"{_NAME_PREFIXES[p]} {_NAME_PLACES[c]} {i:06d}"
+        for i, (p, c) in enumerate(zip(prefixes.tolist(), places.tolist()))
+    ]
+
+
+def generate_historical_data(affiliations: int, years: int, seed: int) -> pd.DataFrame:
+    """
+    Tabla agregada por (afiliación, año). Cada afiliación tiene entre 1 y
+    `years` años consecutivos de historia; la mayoría termina en LAST_YEAR.
+    Las publicaciones siguen una tendencia con ruido y los autores son
+    proporcionales a las publicaciones.
+    """
+    rng = np.random.default_rng(seed)
+    names = synthetic_names(affiliations, rng)
+    lengths = rng.integers(1, years + 1, affiliations)
+    last_years = LAST_YEAR - rng.choice([0, 0, 0, 0, 1, 2, 5], affiliations)
+    base = rng.lognormal(mean=1.5, sigma=1.2, size=affiliations)
+    trend = rng.normal(0.05, 0.1, affiliations)
+    ratio = rng.uniform(0.3, 2.0, affiliations)
+
+    counts = lengths
+    owner = np.repeat(np.arange(affiliations), counts)
+    step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    year = np.repeat(last_years - lengths + 1, counts) + step
+    expected = base[owner] * np.exp(trend[owner] * step)
+    publications = np.maximum(1, rng.poisson(expected))
+    authors = np.maximum(1, rng.poisson(publications * ratio[owner]))
+
+    return pd.DataFrame({
+        "affiliation_name": np.array(names, dtype=object)[owner],
+        "year": year.astype(np.int64),
+        "publication_count": publications.astype(np.int64),
+        "distinct_authors": authors.astype(np.int64),
+    })
+
+
+def train_model(historical_df: pd.DataFrame, encoder, seed: int, n_estimators: int = 100):
+    """LGBMRegressor con las características del modelo real, entrenado para predecir el año siguiente."""
+    import lightgbm as lgb
+
+    df = historical_df.sort_values(["affiliation_name", "year"], kind="stable").reset_index(drop=True)
+    df["affiliation_encoded"] = encoder.transform(df["affiliation_name"])
+    next_df = df.shift(-1)
+    consecutive = (next_df["affiliation_name"] == df["affiliation_name"]) & (next_df["year"] == df["year"] + 1)
+    train = df[consecutive].assign(target=next_df.loc[consecutive, "publication_count"].astype(np.int64))
+    if len(train) > MAX_TRAINING_ROWS:
+        train = train.sample(MAX_TRAINING_ROWS, random_state=seed)
+
+    features = train[["year", "affiliation_encoded", "publication_count", "distinct_authors"]]
+    model = lgb.LGBMRegressor(n_estimators=n_estimators, random_state=seed, verbose=-1)
+    model.fit(features, train["target"])
+    return model
+
+
+def generate_assets(work_dir: Path, affiliations: int, years: int, seed: int = 0,
+                    force: bool = False) -> Dict[str, Path]:
+    """
+    Genera (o reutiliza) los tres artefactos sintéticos y devuelve sus rutas
+    con las claves 'model', 'encoder' y 'historical_data'.
+    """
+    import joblib
+    from sklearn.preprocessing import LabelEncoder
+
+    out_dir = synthetic_dir(work_dir, affiliations, years, seed)
+    paths = {
+        "model": out_dir / MODEL_FILE,
+        "encoder": out_dir / ENCODER_FILE,
+        "historical_data": out_dir / DATA_FILE,
+    }
+    if not force and (out_dir / INFO_FILE).exists() and all(path.exists() for path in paths.values()):
+        return paths
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    historical_df = generate_historical_data(affiliations, years, seed)
+    encoder = LabelEncoder().fit(historical_df["affiliation_name"])
+    model = train_model(historical_df, encoder, seed)
+
+    historical_df.to_csv(paths["historical_data"], index=False)
+    joblib.dump(encoder, paths["encoder"])
+    joblib.dump(model, paths["model"])
+    with open(out_dir / INFO_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "affiliations": affiliations, "years": years, "seed": seed, "rows": int(len(historical_df)),
+            "generated_in_seconds": round(time.perf_counter() - started, 2),
+        }, f, indent=2)
+    print(f"Artefactos sintéticos generados en '{out_dir}' ({len(historical_df):,} filas, "
+          f"{time.perf_counter() - started:.1f} s).")
+    return paths
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Genera artefactos sintéticos para los benchmarks.")
+    parser.add_argument("--affiliations", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, default=Path(".bench_artifacts"))
+    parser.add_argument("--force", action="store_true", help="Regenera aunque ya existan.")
+    args = parser.parse_args(argv)
+    paths = generate_assets(args.work_dir, args.affiliations, args.years, args.seed, force=args.force)
+    for role, path in paths.items():
+        print(f"  {role}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# backend/tests/conftest.py
+
+import warnings
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import analytics
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def service():
+    """El servicio de la app con los activos del repositorio ya cargados."""
+    prediction_service = analytics.prediction_service
+    if not prediction_service.check_assets_loaded():
+        with warnings.catch_warnings():
+            # El encoder se serializó con otra versión de scikit-learn
+            warnings.simplefilter("ignore")
+            prediction_service._load_assets()
+    return prediction_service
+
+
+@pytest.fixture
+def client(service):
+    """Cliente HTTP de la app (sin el lifespan: los activos ya están cargados)."""
+    return TestClient(app)
@@ -0,0 +1,236 @@
+# backend/tests/test_admission.py
+
+import asyncio
+import time
+
+import pytest
+
+from app.api.v1.endpoints import analytics
+from app.services.admission import (
+    AdmissionController, ConcurrencyLimiter, DeadlineExceeded, Overloaded, within_deadline
+)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+# --- ConcurrencyLimiter ---
+
+def test_queue_full_is_rejected():
+    async def scenario():
+        limiter = ConcurrencyLimiter("r", max_concurrent=1, max_queue=0, queue_timeout_seconds=1.0)
+        async with limiter.admit():
+            with pytest.raises(Overloaded) as error:
+                async with limiter.admit():
+                    pass
+        assert error.value.reason == "queue_full"
+        assert limiter.stats()["rejected"] == 1
+        assert limiter.active == 0
+    run(scenario())
+
+
+def test_queue_timeout():
+    async def scenario():
+        limiter = ConcurrencyLimiter("r", max_concurrent=1, max_queue=1, queue_timeout_seconds=0.05)
+        async with limiter.admit():
+            with pytest.raises(Overloaded) as error:
+                async with limiter.admit():
+                    pass
+        assert error.value.reason == "timeout"
+        assert limiter.stats()["timed_out"] == 1
+        assert limiter.stats()["waiting"] == 0
+        assert limiter.active == 0
+    run(scenario())
+
+
+def test_deadline_expires_while_queued():
+    async def scenario():
+        limiter = ConcurrencyLimiter("r", max_concurrent=1, max_queue=1, queue_timeout_seconds=10.0)
+        async with limiter.admit():
+            started = time.monotonic()
+            with pytest.raises(Overloaded) as error:
+                async with limiter.admit(deadline=started + 0.05):
+                    pass
+            # La espera la acota el plazo, no el tiempo de cola
+            assert time.monotonic() - started < 1.0
+        assert error.value.reason == "timeout"
+        assert limiter.active == 0
+    run(scenario())
+
+
+def test_fifo_hand_off():
+    async def scenario():
+        limiter = ConcurrencyLimiter("r", max_concurrent=1, max_queue=10, queue_timeout_seconds=5.0)
+        order = []
+
+        async def worker(i):
+            async with limiter.admit():
+                order.append(i)
+                await asyncio.sleep(0.001)
+
+        await asyncio.gather(*(worker(i) for i in range(5)))
+        assert order == list(range(5))
+        assert limiter.stats()["queued"] == 4
+        assert limiter.active == 0
+    run(scenario())
+
+
+def test_slot_released_on_exception():
+    async def scenario():
+        limiter = ConcurrencyLimiter("r", max_concurrent=1, max_queue=1, queue_timeout_seconds=1.0)
+
+        async def failing():
+            async with limiter.admit():
+                await asyncio.sleep(0.01)
+                raise RuntimeError("falla")
+
+        async def waiting():
+            await asyncio.sleep(0)
+            async with limiter.admit():
+                return "ok"
+
+        results = await asyncio.gather(failing(), waiting(), return_exceptions=True)
+        assert isinstance(results[0], RuntimeError)
+        assert results[1] == "ok"
+        assert limiter.active == 0
+    run(scenario())
+
+
+def test_slot_released_when_holder_is_cancelled():
+    async def scenario():
+        limiter = ConcurrencyLimiter("r", max_concurrent=1, max_queue=1, queue_timeout_seconds=1.0)
+        entered = asyncio.Event()
+
+        async def holder():
+            async with limiter.admit():
+                entered.set()
+                await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(holder())
+        await entered.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.active == 0
+        async with limiter.admit():
+            assert limiter.active == 1
+    run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter("r", max_concurrent=1, max_queue=1, queue_timeout_seconds=5.0)
+        async with limiter.admit():
+            waiter = asyncio.ensure_future(limiter.admit().__aenter__())
+            await asyncio.sleep(0.01)
+            assert limiter.stats()["waiting"] == 1
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            assert limiter.stats()["waiting"] == 0
+        assert limiter.active == 0
+        # La cola quedó libre: se puede volver a esperar
+        async with limiter.admit():
+            pass
+    run(scenario())
+
+
+def test_disabled_controller_admits_everything():
+    async def scenario():
+        controller = AdmissionController({"r": (1, 0)}, enabled=False)
+        async with controller.admit("r"):
+            async with controller.admit("r"):
+                pass
+    run(scenario())
+
+
+# --- within_deadline ---
+
+def plan(steps, step_seconds=0.0):
+    total = 0
+    for _ in range(steps):
+        time.sleep(step_seconds)
+        total += yield (None, None)
+    return total
+
+
+def drive(generator):
+    try:
+        next(generator)
+        while True:
+            generator.send(1)
+    except StopIteration as stop:
+        return stop.value
+
+
+def test_within_deadline_passes_through():
+    assert drive(within_deadline(plan(3), time.monotonic() + 10)) == 3
+    assert drive(within_deadline(plan(3), None)) == 3
+
+
+def test_within_deadline_interrupts_between_steps():
+    with pytest.raises(DeadlineExceeded):
+        drive(within_deadline(plan(100, step_seconds=0.01), time.monotonic() + 0.03))
+
+
+# --- Endpoints: 429 / 503 con Retry-After ---
+
+@pytest.fixture
+def saturated(monkeypatch):
+    """Reemplaza el control de admisión de la app por uno cuyo único lugar está ocupado."""
+    def install(max_queue=0, queue_timeout_seconds=1.0, deadline_seconds=0.0):
+        controller = AdmissionController(
+            {"projection": (1, max_queue)}, queue_timeout_seconds=queue_timeout_seconds,
+            deadline_seconds=deadline_seconds
+        )
+        controller.limiters["projection"].active = 1
+        monkeypatch.setattr(analytics, "admission", controller)
+        return controller
+    return install
+
+
+def projection_path(service):
+    return f"/api/v1/projection/{service.bundle.affiliation_index.latest_names[0]}"
+
+
+def test_endpoint_queue_full_returns_429(client, service, saturated):
+    controller = saturated(max_queue=0)
+    response = client.get(projection_path(service))
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == str(analytics.settings.ADMISSION_RETRY_AFTER_SECONDS)
+    assert controller.stats()["projection"]["rejected"] == 1
+
+
+def test_endpoint_queue_timeout_returns_503(client, service, saturated):
+    controller = saturated(max_queue=1, queue_timeout_seconds=0.05)
+    response = client.get(projection_path(service))
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+    assert controller.stats()["projection"]["timed_out"] == 1
+
+
+def test_endpoint_deadline_while_queued_returns_503(client, service, saturated):
+    controller = saturated(max_queue=1, queue_timeout_seconds=10.0, deadline_seconds=0.05)
+    started = time.monotonic()
+    response = client.get(projection_path(service))
+    assert response.status_code == 503
+    assert time.monotonic() - started < 5.0
+    assert controller.stats()["projection"]["timed_out"] == 1
+
+
+def test_endpoint_deadline_during_computation_returns_503(client, service, monkeypatch):
+    controller = AdmissionController({"projection": (1, 1)}, deadline_seconds=0.05)
+    monkeypatch.setattr(analytics, "admission", controller)
+    original = service.plan_projections
+
+    def slow_plan(*args):
+        time.sleep(0.1)
+        return (yield from original(*args))
+
+    monkeypatch.setattr(service, "plan_projections", slow_plan)
+    response = client.get(projection_path(service) + "?projection_years=3")
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+    assert controller.stats()["projection"]["deadline_exceeded"] == 1
+    assert controller.stats()["projection"]["active"] == 0
@@ -0,0 +1,81 @@
+# backend/tests/test_affiliation_index.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.affiliation_index import AffiliationIndex
+
+ENCODER_CLASSES = ["Alfa", "Beta", "Gamma", "Delta", "Epsilon", "Zeta", "Eta"]
+
+
+def history(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["affiliation_name", "year", "publication_count", "distinct_authors"])
+
+
+def apply_rows(df: pd.DataFrame, rows) -> pd.DataFrame:
+    """Referencia: las filas nuevas reemplazan a las del mismo (afiliación, año)."""
+    merged = pd.concat([df, history(rows)], ignore_index=True)
+    return merged.drop_duplicates(["affiliation_name", "year"], keep="last")
+
+
+def assert_same_index(actual: AffiliationIndex, expected: AffiliationIndex) -> None:
+    assert actual.affiliation_names == expected.affiliation_names
+    for attribute in ("offsets", "years", "publications", "authors",
+                      "latest_encoded", "latest_years", "latest_publications", "latest_authors"):
+        np.testing.assert_array_equal(getattr(actual, attribute), getattr(expected, attribute), err_msg=attribute)
+    assert actual.years.dtype == expected.years.dtype
+    assert actual.latest_names == expected.latest_names
+    for name in expected.affiliation_names:
+        assert actual.get(name) == expected.get(name)
+
+
+@pytest.fixture
+def base_df():
+    return history([
+        ("Beta", 2018, 10, 4), ("Beta", 2019, 12, 5),
+        ("Delta", 2017, 3, 1), ("Delta", 2019, 5, 2), ("Delta", 2020, 7, 3),
+        ("Zeta", 2020, 40, 20),
+        ("Sin encoder", 2019, 1, 1),
+    ])
+
+
+@pytest.mark.parametrize("rows", [
+    # Reemplazo de un año existente
+    [("Beta", 2019, 15, 6)],
+    # Años nuevos antes, entre y después de los existentes
+    [("Delta", 2015, 1, 1), ("Delta", 2018, 4, 2), ("Delta", 2021, 9, 4)],
+    # Afiliaciones nuevas al principio, en medio y al final del orden
+    [("Alfa", 2020, 2, 1), ("Gamma", 2021, 6, 3), ("Zzz", 2019, 1, 1), ("Eta", 2018, 8, 8)],
+    # Todo a la vez, con filas repetidas para el mismo año (gana la última)
+    [("Zeta", 2021, 41, 21), ("Alfa", 2020, 2, 1), ("Beta", 2018, 11, 4), ("Epsilon", 2016, 1, 1),
+     ("Zeta", 2021, 45, 22), ("Sin encoder", 2020, 2, 2)],
+])
+def test_with_updates_matches_full_rebuild(base_df, rows):
+    index = AffiliationIndex.from_dataframe(base_df, ENCODER_CLASSES)
+    expected = AffiliationIndex.from_dataframe(apply_rows(base_df, rows), ENCODER_CLASSES)
+    assert_same_index(index.with_updates(rows, ENCODER_CLASSES), expected)
+
+
+def test_with_updates_keeps_the_original_index(base_df):
+    index = AffiliationIndex.from_dataframe(base_df, ENCODER_CLASSES)
+    before = index.to_dataframe()
+    index.with_updates([("Beta", 2019, 99, 9), ("Alfa", 2020, 1, 1)], ENCODER_CLASSES)
+    pd.testing.assert_frame_equal(index.to_dataframe(), before)
+
+
+def test_with_updates_on_repository_data(service):
+    index = service.bundle.affiliation_index
+    encoder_classes = service.bundle.encoder_classes
+    names = index.latest_names
+    rows = []
+    for name in (names[0], names[len(names) // 2], names[-1]):
+        entry = index.get(name)
+        rows.append((name, entry.last_year, entry.last_publications + 1, entry.last_authors))
+        rows.append((name, entry.last_year + 1, entry.last_publications * 2, entry.last_authors + 1))
+    unseen = [name for name in encoder_classes if name not in index]
+    if unseen:
+        rows.append((unseen[0], 2020, 3, 2))
+
+    expected = AffiliationIndex.from_dataframe(apply_rows(index.to_dataframe(), rows), encoder_classes)
+    assert_same_index(index.with_updates(rows, encoder_classes), expected)
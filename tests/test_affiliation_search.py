@@ -0,0 +1,99 @@
+# backend/tests/test_affiliation_search.py
+
+import pytest
+
+from app.services.affiliation_search import AffiliationSearchIndex, normalize
+
+NAMES = [
+    "Universidad de Cuenca",
+    "Universidad Técnica de Ambato",
+    "Escuela Politécnica Nacional",
+    "ÉCOLE Normale Supérieure",
+    "Pontificia Universidad Católica del Ecuador",
+    "Universidad Central del Ecuador",
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return AffiliationSearchIndex(NAMES)
+
+
+def test_normalize_strips_accents_case_and_spaces():
+    assert normalize("  Escuela   POLITÉCNICA ") == "escuela politecnica"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("politecnica", "Escuela Politécnica Nacional"),
+    ("POLITÉCNICA", "Escuela Politécnica Nacional"),
+    ("ecole", "ÉCOLE Normale Supérieure"),
+    ("superieure", "ÉCOLE Normale Supérieure"),
+    ("catolica", "Pontificia Universidad Católica del Ecuador"),
+])
+def test_accent_and_case_insensitive(index, query, expected):
+    assert index.search(query)[0] == expected
+
+
+def test_relevance_order(index):
+    # Exacta, luego prefijo del nombre, luego prefijo de una palabra
+    results = index.search("universidad de cuenca")
+    assert results[0] == "Universidad de Cuenca"
+    results = index.search("universidad")
+    # Dentro de un mismo nivel se conserva el orden del encoder
+    assert results[:3] == ["Universidad de Cuenca", "Universidad Técnica de Ambato", "Universidad Central del Ecuador"]
+    assert results[3] == "Pontificia Universidad Católica del Ecuador"
+
+
+def test_substring_and_typo(index):
+    assert index.search("cnica de amb") == ["Universidad Técnica de Ambato"]
+    assert "Universidad de Cuenca" in index.search("Univresidad de Cuenca")
+
+
+@pytest.mark.parametrize("query", ["u", "Ú", "es"])
+def test_short_queries_only_match_prefixes(index, query):
+    q = normalize(query)
+    results = index.search(query)
+    assert results
+    for name in results:
+        norm = normalize(name)
+        assert norm.startswith(q) or any(word.startswith(q) for word in norm.split())
+    # "Escuela" contiene "u" pero ninguna de sus palabras empieza con ella
+    if q == "u":
+        assert "Escuela Politécnica Nacional" not in results
+
+
+def test_empty_query_returns_everything(index):
+    assert index.search("   ") == NAMES
+
+
+def test_no_match(index):
+    assert index.search("zzzzzz") == []
+
+
+def test_service_pagination(service):
+    matches, total = service.search_affiliations("universidad")
+    assert total == len(matches) > 10
+    pages = []
+    for offset in range(0, total, 7):
+        page, page_total = service.search_affiliations("universidad", limit=7, offset=offset)
+        assert page_total == total
+        assert len(page) <= 7
+        pages.extend(page)
+    assert pages == matches
+    assert service.search_affiliations("universidad", limit=5, offset=total) == ([], total)
+
+
+def test_endpoint_whitespace_query_serves_full_list(client, service):
+    full = client.get("/api/v1/affiliations")
+    blank = client.get("/api/v1/affiliations", params={"q": "   "})
+    assert blank.status_code == 200
+    assert blank.headers.get("etag") == full.headers["etag"]
+    assert blank.json()["total"] == len(service.bundle.search_index)
+
+
+def test_endpoint_search_paginates(client):
+    first = client.get("/api/v1/affiliations", params={"q": "universidad", "limit": 3}).json()
+    second = client.get("/api/v1/affiliations", params={"q": "universidad", "limit": 3, "offset": 3}).json()
+    assert len(first["affiliations"]) == len(second["affiliations"]) == 3
+    assert first["total"] == second["total"]
+    assert not set(first["affiliations"]) & set(second["affiliations"])
@@ -0,0 +1,80 @@
+# backend/tests/test_asset_reload.py
+
+import time
+
+import pytest
+
+from app.api.v1.endpoints import analytics
+
+
+@pytest.fixture
+def restore_bundle(service):
+    """Devuelve al servicio el bundle original al terminar la prueba."""
+    original = service.bundle
+    yield original
+    service._swap_bundle(original)
+    analytics.response_cache.clear()
+
+
+def patched_bundle(bundle, name):
+    entry = bundle.affiliation_index.get(name)
+    row = (name, entry.last_year + 1, entry.last_publications * 3 + 50, entry.last_authors + 5)
+    return bundle.with_historical_updates([row])
+
+
+def test_plan_in_flight_keeps_the_bundle_it_started_with(service, restore_bundle):
+    name = service.bundle.affiliation_index.latest_names[0]
+    service.projection_cache.clear()
+    before = service.get_projections([name], 6)
+
+    service.projection_cache.clear()
+    plan = service.plan_projections([name], 6)
+    predict_fn, features = next(plan)
+    service._swap_bundle(patched_bundle(restore_bundle, name))
+    try:
+        while True:
+            predict_fn, features = plan.send(predict_fn(features))
+    except StopIteration as stop:
+        during = stop.value
+
+    # El plan termina con los activos con los que empezó; las solicitudes
+    # nuevas ya ven el bundle publicado.
+    assert during == before
+    assert service.get_projections([name], 6) != before
+
+
+def test_swap_clears_projection_and_response_caches(service, client, restore_bundle):
+    name = service.bundle.affiliation_index.latest_names[0]
+    service.get_projection(name, 5)
+    assert service.projection_cache.stats()["size"] > 0
+    first = client.get("/api/v1/ranking")
+    old_version = service.assets_version
+    assert analytics.response_cache.get("ranking", old_version) is not None
+
+    service._swap_bundle(patched_bundle(restore_bundle, name))
+
+    assert service.assets_version != old_version
+    assert service.projection_cache.stats()["size"] == 0
+    # Las respuestas pre-serializadas son de la versión anterior: no se sirven
+    assert analytics.response_cache.get("ranking", service.assets_version) is None
+    second = client.get("/api/v1/ranking", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert analytics.response_cache.get("ranking", old_version) is None
+
+
+def test_reload_assets_publishes_a_new_bundle(service, restore_bundle):
+    name = service.bundle.affiliation_index.latest_names[0]
+    service.get_projection(name, 5)
+    reloads = service.reload_status["reloads"]
+
+    assert service.reload_assets()
+    deadline = time.monotonic() + 60
+    while service.reload_status["state"] == "loading" and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert service.reload_status["state"] == "idle"
+    assert service.reload_status["reloads"] == reloads + 1
+    assert service.bundle is not restore_bundle
+    assert service.assets_version == restore_bundle.version
+    assert service.projection_cache.stats()["size"] == 0
@@ -0,0 +1,126 @@
+# backend/tests/test_backtest.py
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.affiliation_index import AffiliationIndex
+
+ENCODER_CLASSES = ["A", "B", "C"]
+
+
+def synthetic_bundle(predict):
+    """Historia mínima: A sin huecos, B con un año faltante y C con un solo año."""
+    rows = [("A", year, year - 2000, 10) for year in range(2010, 2021)]
+    rows += [("B", year, 3 * (year - 2000), 4) for year in (2014, 2015, 2017, 2018, 2019, 2020)]
+    rows += [("C", 2019, 7, 0)]
+    df = pd.DataFrame(rows, columns=["affiliation_name", "year", "publication_count", "distinct_authors"])
+    return SimpleNamespace(affiliation_index=AffiliationIndex.from_dataframe(df, ENCODER_CLASSES), predict=predict)
+
+
+def predict_year(features):
+    """Predice para el año Y el valor Y - 2000: exacto para A solo si el año está alineado."""
+    return features[:, 0].astype(np.int64) - 2000
+
+
+def reference_backtest(bundle, cutoffs, horizon):
+    """Proyección recursiva de a una fila por (afiliación, corte) y errores contra el año real."""
+    index = bundle.affiliation_index
+    errors = [[] for _ in range(horizon)]
+    for name in index.affiliation_names:
+        entry = index.get(name)
+        actual = dict(zip(index.years[entry.start:entry.stop].tolist(),
+                          index.publications[entry.start:entry.stop].tolist()))
+        authors_by_year = dict(zip(index.years[entry.start:entry.stop].tolist(),
+                                   index.authors[entry.start:entry.stop].tolist()))
+        for cutoff in cutoffs:
+            if cutoff not in actual:
+                continue
+            year, publications, authors = cutoff, actual[cutoff], authors_by_year[cutoff]
+            ratio = publications / authors if authors > 0 else 1.0
+            for step in range(horizon):
+                year += 1
+                features = np.array([[year, entry.encoded, publications, max(1, round(authors))]])
+                predicted = int(bundle.predict(features)[0])
+                if year in actual:
+                    errors[step].append(predicted - actual[year])
+                publications = predicted
+                if ratio > 0.001:
+                    authors = predicted / ratio
+    return [np.array(step_errors, dtype=np.float64) for step_errors in errors]
+
+
+def test_predictions_are_compared_with_the_year_they_target(service):
+    bundle = synthetic_bundle(predict_year)
+    result = service._drive(service.plan_backtest(bundle, [2017, 2018], 2))
+
+    # A: la predicción para corte + h es exactamente el valor real de corte + h.
+    # B: su valor real es el triple, así que el error es -2 * (año - 2000).
+    # Corte 2017: A y B; corte 2018: A y B. C no tiene año de corte.
+    assert result["cutoffs"] == [2017, 2018]
+    assert result["projections"] == 4
+    h1, h2 = result["horizons"]
+    assert (h1["horizon"], h1["samples"]) == (1, 4)
+    b_errors_h1 = np.array([-36.0, -38.0])  # 2018 y 2019
+    assert h1["mae"] == pytest.approx(np.abs(b_errors_h1).sum() / 4)
+    assert h1["rmse"] == pytest.approx(np.sqrt((b_errors_h1 ** 2).sum() / 4), abs=1e-4)
+    # h=2: A llega a 2019 y 2020; B a 2019 y 2020
+    b_errors_h2 = np.array([-38.0, -40.0])
+    assert (h2["horizon"], h2["samples"]) == (2, 4)
+    assert h2["mae"] == pytest.approx(np.abs(b_errors_h2).sum() / 4)
+    assert h2["rmse"] == pytest.approx(np.sqrt((b_errors_h2 ** 2).sum() / 4), abs=1e-4)
+
+
+def test_years_without_actual_data_are_skipped(service):
+    bundle = synthetic_bundle(predict_year)
+    # Corte 2015: B no tiene 2016, así que a un año solo cuenta A
+    result = service._drive(service.plan_backtest(bundle, [2015], 3))
+    assert [h["samples"] for h in result["horizons"]] == [1, 2, 2]
+    assert result["horizons"][0]["mae"] == 0.0
+    assert result["horizons"][0]["rmse"] == 0.0
+
+
+def test_no_actual_data_reports_none(service):
+    bundle = synthetic_bundle(predict_year)
+    result = service._drive(service.plan_backtest(bundle, [2020], 2))
+    assert result["projections"] == 2
+    assert all(h["samples"] == 0 and h["mae"] is None and h["rmse"] is None for h in result["horizons"])
+
+
+def test_metrics_match_row_by_row_reference(service):
+    def predict(features):
+        return (features[:, 2] * 3 + features[:, 3] * 2 + features[:, 0] % 7) // 4
+
+    bundle = synthetic_bundle(predict)
+    cutoffs = service.backtest_cutoffs(bundle, 5, 4)
+    assert cutoffs == [2019, 2018, 2017, 2016, 2015]
+    result = service._drive(service.plan_backtest(bundle, cutoffs, 4))
+    for horizon, errors in zip(result["horizons"], reference_backtest(bundle, cutoffs, 4)):
+        assert horizon["samples"] == len(errors)
+        assert horizon["mae"] == round(float(np.abs(errors).mean()), 4)
+        assert horizon["rmse"] == round(float(np.sqrt((errors ** 2).mean())), 4)
+
+
+def test_model_details_use_notebook_metrics_until_backtest_is_ready(service, client, monkeypatch):
+    version = service.assets_version
+    # Backtest "en curso": get_backtest devuelve None sin lanzar otro hilo
+    monkeypatch.setattr(service, "_backtests", {})
+    monkeypatch.setattr(service, "_backtest_running", version)
+
+    pending = client.get("/api/v1/model-details")
+    assert pending.status_code == 200
+    assert pending.json()["performance_source"] == "notebook"
+    assert pending.json()["backtest"] is None
+    # Sin backtest la respuesta no se guarda en caché
+    assert "ETag" not in pending.headers
+
+    backtest = service.run_backtest()
+    monkeypatch.setattr(service, "_backtests", {version: backtest})
+    monkeypatch.setattr(service, "_backtest_running", None)
+
+    ready = client.get("/api/v1/model-details").json()
+    assert ready["performance_source"] == "backtest"
+    assert ready["performance_metrics"] == {"mae": backtest["horizons"][0]["mae"],
+                                            "rmse": backtest["horizons"][0]["rmse"]}
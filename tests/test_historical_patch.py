@@ -0,0 +1,59 @@
+# backend/tests/test_historical_patch.py
+
+import pytest
+
+from app.api.v1.endpoints import analytics
+from app.core.config import settings
+
+PATCH_URL = "/api/v1/admin/historical-data/patch"
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secreto")
+    return "secreto"
+
+
+@pytest.fixture
+def restore_bundle(service):
+    original = service.bundle
+    yield original
+    service._swap_bundle(original)
+    analytics.response_cache.clear()
+
+
+def test_patch_requires_admin_token(client, admin_token):
+    response = client.post(PATCH_URL, json={"rows": []}, headers={"X-Admin-Token": "otro"})
+    assert response.status_code == 401
+
+
+def test_patch_updates_history_and_invalidates_only_affected_projections(service, client, admin_token,
+                                                                        restore_bundle):
+    names = service.bundle.affiliation_index.latest_names
+    patched, untouched = names[0], names[1]
+    service.projection_cache.clear()
+    service.get_projection(patched, 5)
+    kept = service.get_projection(untouched, 5)
+    entry = service.bundle.affiliation_index.get(patched)
+    new_year = entry.last_year + 1
+
+    response = client.post(PATCH_URL, headers={"X-Admin-Token": admin_token}, json={
+        "rows": [{"affiliation_name": patched, "year": new_year,
+                  "publication_count": entry.last_publications + 100, "distinct_authors": entry.last_authors + 3}],
+        "historical_data_sha256": "f" * 64,
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["rows"] == 1
+    assert body["affected_affiliations"] == 1
+    assert body["invalidated_cache_entries"] == 1
+    assert body["version"] == service.assets_version != restore_bundle.version
+
+    updated = service.bundle.affiliation_index.get(patched)
+    assert (updated.last_year, updated.last_publications) == (new_year, entry.last_publications + 100)
+    # La proyección de la otra afiliación pasó a la versión nueva sin recalcularse
+    hits = service.projection_cache.stats()["hits"]
+    assert service.get_projection(untouched, 5) == kept
+    assert service.projection_cache.stats()["hits"] == hits + 1
+    assert service.get_projection(patched, 5)["data"][-6]["year"] == new_year
@@ -0,0 +1,132 @@
+# backend/tests/test_http_cache.py
+
+import gzip
+import json
+
+import pytest
+
+from app.api.v1.endpoints import analytics
+from app.services import response_cache as response_cache_module
+from app.services.response_cache import RenderedResponse
+
+ROUTES = ["/api/v1/ranking", "/api/v1/affiliations", "/api/v1/model-details"]
+
+
+@pytest.fixture
+def restore_bundle(service):
+    original = service.bundle
+    yield original
+    service._swap_bundle(original)
+    analytics.response_cache.clear()
+
+
+def ensure_backtest(service):
+    """Calcula el backtest de la versión vigente: sin él /model-details no se guarda en caché."""
+    with service._backtest_lock:
+        if service.assets_version not in service._backtests:
+            service._backtests = {service.assets_version: service.run_backtest()}
+
+
+def get(client, route, accept_encoding="identity", if_none_match=None):
+    headers = {"Accept-Encoding": accept_encoding}
+    if if_none_match is not None:
+        headers["If-None-Match"] = if_none_match
+    return client.get(route, headers=headers)
+
+
+@pytest.mark.parametrize("route", ROUTES)
+def test_matching_if_none_match_returns_304(service, client, route):
+    ensure_backtest(service)
+    first = get(client, route)
+    assert first.status_code == 200
+    assert "Accept-Encoding" in first.headers["Vary"]
+    assert "must-revalidate" in first.headers["Cache-Control"]
+
+    again = get(client, route, if_none_match=first.headers["ETag"])
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+    # Comparación débil y listas de ETags
+    assert get(client, route, if_none_match=f'"otro", W/{first.headers["ETag"]}').status_code == 304
+    assert get(client, route, if_none_match='"otro"').status_code == 200
+
+
+@pytest.mark.parametrize("route", ROUTES)
+def test_each_encoding_has_its_own_etag(service, client, route):
+    ensure_backtest(service)
+    identity = get(client, route, "identity")
+    gzipped = get(client, route, "gzip")
+    assert "Content-Encoding" not in identity.headers
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.json() == identity.json()
+    etags = {identity.headers["ETag"], gzipped.headers["ETag"]}
+    if response_cache_module.brotli is not None:
+        brotlied = get(client, route, "gzip, br")
+        assert brotlied.headers["Content-Encoding"] == "br"
+        assert brotlied.json() == identity.json()
+        etags.add(brotlied.headers["ETag"])
+    assert len(etags) == (3 if response_cache_module.brotli is not None else 2)
+
+    # El ETag de cualquier variante vigente revalida; el 304 devuelve ese mismo ETag
+    revalidated = get(client, route, "identity", if_none_match=gzipped.headers["ETag"])
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == gzipped.headers["ETag"]
+
+
+@pytest.mark.parametrize("accept_encoding,expected", [
+    ("br;q=1.0, gzip;q=0.5", "br"),
+    ("gzip", "gzip"),
+    ("gzip;q=0, *", "br"),
+    ("br;q=0, gzip;q=0, *", "identity"),
+    ("br;q=0, *", "gzip"),
+    ("*;q=0", "identity"),
+    ("identity", "identity"),
+    (None, "identity"),
+])
+def test_select_respects_explicit_refusals(accept_encoding, expected):
+    if response_cache_module.brotli is None:
+        pytest.skip("brotli no está instalado")
+    rendered = RenderedResponse("v", b'{"a": 1}')
+    coding, body = rendered.select(accept_encoding)
+    assert coding == expected
+    assert body == rendered.variants[expected]
+
+
+def test_q0_refusal_without_brotli(monkeypatch):
+    monkeypatch.setattr(response_cache_module, "brotli", None)
+    rendered = RenderedResponse("v", b'{"a": 1}')
+    assert rendered.select("gzip;q=0, *")[0] == "identity"
+    assert rendered.select("br, *")[0] == "gzip"
+    assert json.loads(gzip.decompress(rendered.variants["gzip"])) == {"a": 1}
+
+
+def swap_to_patched_bundle(service, bundle):
+    name = bundle.affiliation_index.latest_names[0]
+    entry = bundle.affiliation_index.get(name)
+    service._swap_bundle(bundle.with_historical_updates(
+        [(name, entry.last_year + 1, entry.last_publications + 100, entry.last_authors)]
+    ))
+    ensure_backtest(service)
+
+
+@pytest.mark.parametrize("route", ["/api/v1/ranking", "/api/v1/model-details"])
+def test_version_change_invalidates_etag(service, client, restore_bundle, route):
+    ensure_backtest(service)
+    first = get(client, route, "gzip")
+    swap_to_patched_bundle(service, restore_bundle)
+
+    second = get(client, route, "gzip", if_none_match=first.headers["ETag"])
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert second.headers["Content-Encoding"] == "gzip"
+
+
+def test_unchanged_content_keeps_its_etag_across_versions(service, client, restore_bundle):
+    # Los datos históricos no cambian la lista de afiliaciones: el ETag sale del contenido
+    first = get(client, "/api/v1/affiliations", "gzip")
+    swap_to_patched_bundle(service, restore_bundle)
+    renders = analytics.response_cache.stats()["renders"]
+
+    second = get(client, "/api/v1/affiliations", "gzip", if_none_match=first.headers["ETag"])
+    assert second.status_code == 304
+    assert analytics.response_cache.stats()["renders"] == renders + 1
@@ -0,0 +1,101 @@
+# backend/tests/test_prediction_batcher.py
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.prediction_batcher import PredictionBatcher
+
+
+class Recorder:
+    """Función de predicción que registra el tamaño de cada lote."""
+    def __init__(self, offset: float = 0.0, fail: bool = False):
+        self.offset = offset
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, features: np.ndarray) -> np.ndarray:
+        self.calls.append(len(features))
+        if self.fail:
+            raise ValueError("modelo roto")
+        return features[:, 0] + self.offset
+
+
+def rows(start: int, count: int) -> np.ndarray:
+    return np.arange(start, start + count, dtype=float).reshape(-1, 1)
+
+
+async def gather_predictions(batcher, requests):
+    return await asyncio.gather(
+        *(batcher.predict(fn, features) for fn, features in requests),
+        return_exceptions=True,
+    )
+
+
+def test_batches_never_exceed_max_rows():
+    batcher = PredictionBatcher(window_ms=50, max_rows=100)
+    predict = Recorder()
+    requests = [(predict, rows(i * 1000, size)) for i, size in enumerate([60, 30, 30, 90, 10, 5, 40])]
+    results = asyncio.run(gather_predictions(batcher, requests))
+
+    assert all(size <= 100 for size in predict.calls)
+    assert sum(predict.calls) == 265
+    for (_, features), result in zip(requests, results):
+        np.testing.assert_array_equal(result, features[:, 0])
+    assert batcher.stats()["max_batch_rows"] <= 100
+    assert batcher.stats()["pending_rows"] == 0
+
+
+def test_oversized_request_runs_alone():
+    batcher = PredictionBatcher(window_ms=50, max_rows=100)
+    predict = Recorder()
+    requests = [(predict, rows(0, 250)), (predict, rows(1000, 10))]
+    results = asyncio.run(gather_predictions(batcher, requests))
+
+    assert predict.calls == [250, 10]
+    np.testing.assert_array_equal(results[0], requests[0][1][:, 0])
+    np.testing.assert_array_equal(results[1], requests[1][1][:, 0])
+
+
+def test_other_predict_fn_is_deferred_to_its_own_batch():
+    batcher = PredictionBatcher(window_ms=50, max_rows=1000)
+    old, new = Recorder(offset=0.0), Recorder(offset=0.5)
+    requests = [(old, rows(0, 3)), (new, rows(10, 4)), (old, rows(20, 5)), (new, rows(30, 6))]
+    results = asyncio.run(gather_predictions(batcher, requests))
+
+    # Cada función recibe un solo lote con todas sus filas
+    assert old.calls == [8]
+    assert new.calls == [10]
+    for (fn, features), result in zip(requests, results):
+        np.testing.assert_array_equal(result, features[:, 0] + fn.offset)
+
+
+def test_prediction_errors_reach_every_request_in_the_batch():
+    batcher = PredictionBatcher(window_ms=50, max_rows=1000)
+    broken, healthy = Recorder(fail=True), Recorder()
+    requests = [(broken, rows(0, 2)), (broken, rows(10, 3)), (healthy, rows(20, 4))]
+    results = asyncio.run(gather_predictions(batcher, requests))
+
+    assert isinstance(results[0], ValueError)
+    assert isinstance(results[1], ValueError)
+    # El worker sigue vivo para el lote siguiente
+    np.testing.assert_array_equal(results[2], requests[2][1][:, 0])
+
+
+@pytest.mark.parametrize("max_rows", [1, 64, 4096])
+def test_batched_plans_match_direct_execution(service, max_rows):
+    names = service.bundle.affiliation_index.latest_names[:30]
+    expected = service._drive(service.plan_ranking())
+    service.projection_cache.clear()
+    direct = service._drive(service.plan_projections(names, 8))
+
+    async def batched():
+        batcher = PredictionBatcher(window_ms=5, max_rows=max_rows)
+        plans = [service.plan_projections([name], 8) for name in names]
+        return await asyncio.gather(batcher.run(service.plan_ranking()), *(batcher.run(plan) for plan in plans))
+
+    service.projection_cache.clear()
+    ranking, *projections = asyncio.run(batched())
+    assert ranking == expected
+    assert [projection[0] for projection in projections] == direct
@@ -0,0 +1,137 @@
+# backend/tests/test_preprocess.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import preprocess_data
+
+AFFILIATIONS = [
+    "Universidad de Chile", "Universidad de Santiago", 'Instituto "Milenio", Sede Sur',
+    "Pontificia Universidad Católica", "Centro de Modelamiento Matemático", "Universidad de Talca",
+]
+
+
+def raw_rows(seed: int, n_rows: int) -> pd.DataFrame:
+    """Export crudo sintético: filas repetidas, fechas inválidas y afiliaciones faltantes."""
+    rng = np.random.default_rng(seed)
+    years = rng.integers(2015, 2022, n_rows)
+    df = pd.DataFrame({
+        "affiliation_name": rng.choice(AFFILIATIONS, n_rows),
+        "publication_date": [f"{year}-{month:02d}-15" for year, month in zip(years, rng.integers(1, 13, n_rows))],
+        "article_id": [f"art-{i}" for i in rng.integers(0, n_rows // 3, n_rows)],
+        "author_id": [f"aut-{i}" for i in rng.integers(0, 40, n_rows)],
+    })
+    df.loc[rng.choice(n_rows, 5, replace=False), "publication_date"] = "sin fecha"
+    df.loc[rng.choice(n_rows, 5, replace=False), "affiliation_name"] = None
+    return pd.concat([df, df.sample(n=n_rows // 10, random_state=seed)], ignore_index=True)
+
+
+def direct_groupby(raw: pd.DataFrame) -> pd.DataFrame:
+    """El preprocesamiento original: todo el archivo en memoria y un solo groupby."""
+    df = raw.copy()
+    df["publication_date"] = pd.to_datetime(df["publication_date"], errors="coerce")
+    df = df.dropna(subset=["publication_date"])
+    df["year"] = df["publication_date"].dt.year.astype(int)
+    return df.groupby(["affiliation_name", "year"]).agg(
+        publication_count=("article_id", "nunique"),
+        distinct_authors=("author_id", "nunique"),
+    ).reset_index()
+
+
+def read_output(path) -> pd.DataFrame:
+    return pd.read_csv(path, dtype={"affiliation_name": str}, keep_default_na=False)
+
+
+def assert_same_table(actual: pd.DataFrame, expected: pd.DataFrame) -> None:
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False
+    )
+
+
+@pytest.fixture
+def raw_file(tmp_path):
+    raw = raw_rows(seed=1, n_rows=600)
+    path = tmp_path / "raw.csv"
+    raw.to_csv(path, index=False)
+    return path, raw
+
+
+@pytest.mark.parametrize("chunksize,partitions,workers", [
+    (7, 1, 1),
+    (50, 3, 1),
+    (10_000, 8, 1),
+    (64, 5, 2),
+])
+def test_pipeline_matches_direct_groupby(tmp_path, raw_file, chunksize, partitions, workers):
+    path, raw = raw_file
+    output = tmp_path / "out.csv"
+    result = preprocess_data.run_pipeline(str(path), str(output), workers, partitions, chunksize,
+                                          tmp_dir=str(tmp_path))
+    expected = direct_groupby(raw)
+    assert_same_table(result, expected)
+    assert_same_table(read_output(output), expected)
+
+
+def test_delta_matches_full_rebuild_and_is_idempotent(tmp_path):
+    base, delta = raw_rows(seed=2, n_rows=500), raw_rows(seed=3, n_rows=120)
+    # El delta trae una afiliación nueva y años nuevos
+    delta.loc[:9, "affiliation_name"] = "Laboratorio Nuevo"
+    delta.loc[10:19, "publication_date"] = "2023-06-01"
+    base_path, delta_path = tmp_path / "base.csv", tmp_path / "delta.csv"
+    base.to_csv(base_path, index=False)
+    delta.to_csv(delta_path, index=False)
+    output, state_dir = tmp_path / "out.csv", tmp_path / "state"
+
+    preprocess_data.run_pipeline(str(base_path), str(output), 1, 4, 64, state_dir=str(state_dir))
+    updates = preprocess_data.run_incremental(str(delta_path), str(output), str(state_dir), 1, 64)
+
+    expected = direct_groupby(pd.concat([base, delta], ignore_index=True))
+    assert_same_table(read_output(output), expected)
+    # Solo se recalculan los pares (afiliación, año) que aparecen en el delta
+    touched = direct_groupby(delta)[["affiliation_name", "year"]]
+    assert_same_table(updates[["affiliation_name", "year"]], touched)
+    assert_same_table(updates, expected.merge(touched, on=["affiliation_name", "year"]))
+
+    # Aplicar el mismo delta otra vez no cambia los conteos
+    again = preprocess_data.run_incremental(str(delta_path), str(output), str(state_dir), 2, 7)
+    assert_same_table(again, updates)
+    assert_same_table(read_output(output), expected)
+
+
+def test_delta_requires_existing_state(tmp_path, raw_file):
+    path, _ = raw_file
+    with pytest.raises(ValueError):
+        preprocess_data.run_incremental(str(path), str(tmp_path / "out.csv"), str(tmp_path / "state"), 1, 64)
+
+
+def test_state_dir_with_other_files_is_not_wiped(tmp_path, raw_file):
+    path, _ = raw_file
+    state_dir = tmp_path / "state"
+    state_dir.mkdir()
+    (state_dir / "notas.txt").write_text("no borrar")
+
+    with pytest.raises(ValueError):
+        preprocess_data.run_pipeline(str(path), str(tmp_path / "out.csv"), 1, 2, 64, state_dir=str(state_dir))
+    assert (state_dir / "notas.txt").read_text() == "no borrar"
+    assert preprocess_data.main(["--input", str(path), "--output", str(tmp_path / "out.csv"),
+                                 "--workers", "1", "--state-dir", str(state_dir)]) == 1
+
+
+def test_rerun_replaces_only_its_own_state(tmp_path, raw_file):
+    path, raw = raw_file
+    state_dir, output = tmp_path / "state", tmp_path / "out.csv"
+    preprocess_data.run_pipeline(str(path), str(output), 1, 6, 64, state_dir=str(state_dir))
+    (state_dir / "notas.txt").write_text("no borrar")
+
+    # Con menos particiones no deben quedar archivos de la corrida anterior
+    preprocess_data.run_pipeline(str(path), str(output), 1, 2, 64, state_dir=str(state_dir))
+    names = sorted(p.name for p in state_dir.iterdir())
+    assert names == ["articles-0000.csv", "articles-0001.csv", "authors-0000.csv", "authors-0001.csv",
+                     "manifest.json", "notas.txt"]
+    assert preprocess_data.read_state_manifest(str(state_dir))["partitions"] == 2
+
+    delta_path = tmp_path / "delta.csv"
+    raw.head(50).to_csv(delta_path, index=False)
+    preprocess_data.run_incremental(str(delta_path), str(output), str(state_dir), 1, 64)
+    assert_same_table(read_output(output), direct_groupby(raw))
@@ -0,0 +1,127 @@
+# backend/tests/test_projection_cache.py
+
+import pytest
+
+from app.services import projection_cache as projection_cache_module
+from app.services.projection_cache import ProjectionCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj controlable para time.monotonic() dentro de la caché."""
+    now = [1000.0]
+    monkeypatch.setattr(projection_cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_longer_series_answers_shorter_horizons():
+    cache = ProjectionCache(maxsize=10, ttl_seconds=0)
+    cache.put(("v", "a", None), (1, 2, 3, 4, 5))
+    assert cache.get(("v", "a", None), 3) == (1, 2, 3)
+    assert cache.get(("v", "a", None), 5) == (1, 2, 3, 4, 5)
+    # Un horizonte mayor que el guardado es un fallo
+    assert cache.get(("v", "a", None), 6) is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_shorter_series_does_not_replace_longer():
+    cache = ProjectionCache(maxsize=10, ttl_seconds=0)
+    cache.put(("v", "a", None), (1, 2, 3, 4))
+    cache.put(("v", "a", None), (1, 2))
+    assert cache.get(("v", "a", None), 4) == (1, 2, 3, 4)
+    cache.put(("v", "a", None), (1, 2, 3, 4, 5, 6))
+    assert cache.get(("v", "a", None), 6) == (1, 2, 3, 4, 5, 6)
+
+
+def test_ttl_expiry(clock):
+    cache = ProjectionCache(maxsize=10, ttl_seconds=60)
+    cache.put(("v", "a", None), (1, 2))
+    clock[0] += 59
+    assert cache.get(("v", "a", None), 2) == (1, 2)
+    clock[0] += 2
+    assert cache.get(("v", "a", None), 2) is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_zero_ttl_never_expires(clock):
+    cache = ProjectionCache(maxsize=10, ttl_seconds=0)
+    cache.put(("v", "a", None), (1,))
+    clock[0] += 10 ** 9
+    assert cache.get(("v", "a", None), 1) == (1,)
+
+
+def test_lru_eviction():
+    cache = ProjectionCache(maxsize=3, ttl_seconds=0)
+    for name in "abc":
+        cache.put(("v", name, None), (1,))
+    # "a" pasa a ser la más reciente; la menos usada es "b"
+    assert cache.get(("v", "a", None), 1) == (1,)
+    cache.put(("v", "d", None), (1,))
+    assert cache.get(("v", "b", None), 1) is None
+    for name in "acd":
+        assert cache.get(("v", name, None), 1) == (1,)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 3
+
+
+def test_zero_maxsize_disables_the_cache():
+    cache = ProjectionCache(maxsize=0)
+    cache.put(("v", "a", None), (1,))
+    assert cache.get(("v", "a", None), 1) is None
+
+
+def test_keys_include_version_and_hypothetical_authors():
+    cache = ProjectionCache(maxsize=10, ttl_seconds=0)
+    cache.put(("v1", "a", None), (1, 2))
+    assert cache.get(("v2", "a", None), 2) is None
+    assert cache.get(("v1", "a", 5), 2) is None
+    assert cache.get(("v1", "a", None), 2) == (1, 2)
+
+
+def test_service_shares_prefixes_and_keys_by_version(service):
+    name = service.bundle.affiliation_index.latest_names[0]
+    cache = service.projection_cache
+    cache.clear()
+    long = service.get_projection(name, 10)
+    hits = cache.stats()["hits"]
+    short = service.get_projection(name, 4)
+    assert cache.stats()["hits"] == hits + 1
+    assert short["data"] == long["data"][:len(long["data"]) - 6]
+    # Las entradas de otra versión de activos no se usan
+    key = service._cache_key(service.bundle, name, None)
+    assert key[0] == service.assets_version
+    assert cache.get(("otra-version",) + key[1:], 4) is None
+
+
+def test_migrate_evicts_only_affected_names_and_keeps_lru_order():
+    cache = ProjectionCache(maxsize=6, ttl_seconds=0)
+    for name in "abcd":
+        cache.put(("v1", name, None), (1, 2))
+    cache.put(("v1", "b", 3), (5,))
+    # Orden LRU: c, d, b/3, a, b
+    cache.get(("v1", "a", None), 1)
+    cache.get(("v1", "b", None), 1)
+
+    assert cache.migrate("v1", "v2", {"b"}) == 2
+    assert cache.stats()["size"] == 3
+    assert cache.get(("v2", "b", None), 1) is None
+    assert cache.get(("v2", "b", 3), 1) is None
+    assert cache.get(("v1", "c", None), 1) is None
+
+    # Las entradas migradas conservan su posición: la menos usada sigue siendo "c"
+    for name in "wxyz":
+        cache.put(("v2", name, None), (1,))
+    assert cache.get(("v2", "c", None), 2) is None
+    assert cache.get(("v2", "d", None), 2) == (1, 2)
+    assert cache.get(("v2", "a", None), 2) == (1, 2)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_migrate_leaves_other_versions_alone():
+    cache = ProjectionCache(maxsize=10, ttl_seconds=0)
+    cache.put(("v0", "a", None), (1,))
+    cache.put(("v1", "a", None), (2,))
+    assert cache.migrate("v1", "v2", {"a"}) == 1
+    assert cache.get(("v0", "a", None), 1) == (1,)
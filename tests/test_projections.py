@@ -0,0 +1,105 @@
+# backend/tests/test_projections.py
+
+"""Las proyecciones en grupo (compare, scenarios) coinciden con las individuales."""
+
+from types import SimpleNamespace
+from urllib.parse import quote
+
+import numpy as np
+import pytest
+
+AUTHOR_COUNTS = [-5, 0, 1, 7, 250]
+PROJECTION_YEARS = 6
+
+
+def reference_projection(service, name, projection_years, hypothetical_authors=None):
+    """Proyección recursiva de a un año y una fila, como la implementación original."""
+    bundle = service.bundle
+    entry = bundle.affiliation_index.get(name)
+    year, publications = entry.last_year, entry.last_publications
+    authors = hypothetical_authors if hypothetical_authors is not None else entry.last_authors
+    ratio = publications / authors if authors > 0 else 1.0
+    values = []
+    for _ in range(projection_years):
+        year += 1
+        features = np.array([[year, entry.encoded, publications, max(1, round(authors))]])
+        predicted = int(bundle.predict(features)[0])
+        values.append(predicted)
+        publications = predicted
+        if ratio > 0.001:
+            authors = predicted / ratio
+    return values
+
+
+def predicted_values(result):
+    return [point["publications"] for point in result["data"] if point["type"] == "predicted"]
+
+
+def single(client, service, name, hypothetical_authors=None):
+    # Sin caché: cada proyección individual se calcula sola
+    service.projection_cache.clear()
+    params = {"projection_years": PROJECTION_YEARS}
+    if hypothetical_authors is not None:
+        params["hypothetical_authors"] = hypothetical_authors
+    response = client.get(f"/api/v1/projection/{quote(name)}", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture(scope="module")
+def names(service):
+    latest = service.bundle.affiliation_index.latest_names
+    return [latest[i] for i in np.linspace(0, len(latest) - 1, 25).astype(int)]
+
+
+def test_compare_matches_single_projections(client, service, names):
+    service.projection_cache.clear()
+    response = client.post("/api/v1/projection/compare", params={"projection_years": PROJECTION_YEARS},
+                           json={"affiliation_names": names + ["No existe"]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["affiliation_name"] for result in results] == names
+    for result in results:
+        name = result["affiliation_name"]
+        assert result == single(client, service, name)
+        assert predicted_values(result) == reference_projection(service, name, PROJECTION_YEARS)
+
+
+def test_scenarios_match_single_what_if(client, service, names):
+    service.projection_cache.clear()
+    subset = names[:8]
+    author_counts = [count for count in AUTHOR_COUNTS if count >= 0]
+    response = client.post("/api/v1/projection/scenarios", params={"projection_years": PROJECTION_YEARS},
+                           json={"affiliation_names": subset, "author_counts": author_counts})
+    assert response.status_code == 200
+    grid = response.json()
+    assert grid["author_counts"] == author_counts
+    assert [result["affiliation_name"] for result in grid["results"]] == subset
+    for result in grid["results"]:
+        name = result["affiliation_name"]
+        for authors, row in zip(author_counts, result["publications"]):
+            assert row == predicted_values(single(client, service, name, authors)), (name, authors)
+            assert row == reference_projection(service, name, PROJECTION_YEARS, authors), (name, authors)
+
+
+def test_negative_authors_match_single_what_if(client, service, names):
+    # El endpoint de escenarios rechaza autores negativos; GET /projection los acepta
+    response = client.post("/api/v1/projection/scenarios",
+                           json={"affiliation_names": names[:1], "author_counts": [-5]})
+    assert response.status_code == 422
+    grid = service.get_scenarios(names[:8], AUTHOR_COUNTS, PROJECTION_YEARS)
+    for result in grid["results"]:
+        name = result["affiliation_name"]
+        for authors, row in zip(AUTHOR_COUNTS, result["publications"]):
+            assert row == predicted_values(single(client, service, name, authors)), (name, authors)
+            assert row == reference_projection(service, name, PROJECTION_YEARS, authors), (name, authors)
+
+
+@pytest.mark.filterwarnings("error::RuntimeWarning")
+def test_cohort_zero_ratio_does_not_warn(service):
+    # Publicaciones 0 con autores > 0: relación publicaciones/autor igual a 0
+    bundle = SimpleNamespace(predict=lambda features: np.zeros(len(features), dtype=np.int64))
+    plan = service._plan_cohort(bundle, np.array([0, 1]), np.array([2020, 2020]), np.array([0, 3]),
+                                np.array([5, 0]), 3)
+    projected = service._drive(plan)
+    assert projected.tolist() == [[0, 0, 0], [0, 0, 0]]
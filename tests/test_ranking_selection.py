@@ -0,0 +1,100 @@
+# backend/tests/test_ranking_selection.py
+
+"""select_ranking (selección parcial con np.partition) contra un orden completo."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from app.services.prediction_service import RankingTable, select_ranking
+
+
+def make_table(n_rows: int, seed: int = 0, value_range: int = 5) -> RankingTable:
+    """Tabla con valores en un rango chico para que haya muchos empates."""
+    rng = np.random.default_rng(seed)
+    current = rng.integers(0, value_range, n_rows)
+    predicted = rng.integers(0, value_range, n_rows)
+    growth = predicted - current
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth_percentage = np.where(current > 0, growth / current * 100, 0.0)
+    return RankingTable("v", [f"a{i}" for i in range(n_rows)], current, predicted, growth, growth_percentage)
+
+
+def reference(table: RankingTable, sort_by: str, descending: bool, min_current, min_predicted,
+              offset: int, limit):
+    """Orden completo: por valor y, a igualdad, por posición en el encoder."""
+    key = table.growth if sort_by == "growth" else table.growth_percentage
+    rows = [
+        i for i in range(len(table.names))
+        if (min_current is None or table.current[i] >= min_current)
+        and (min_predicted is None or table.predicted[i] >= min_predicted)
+    ]
+    rows.sort(key=lambda i: (-key[i] if descending else key[i], i))
+    stop = None if limit is None else offset + limit
+    return rows[offset:stop], len(rows)
+
+
+def check(table, *args):
+    indices, total = select_ranking(table, *args)
+    expected, expected_total = reference(table, *args)
+    assert total == expected_total
+    assert indices.tolist() == expected
+
+
+@pytest.mark.parametrize("sort_by, descending", list(itertools.product(["growth", "growth_percentage"], [True, False])))
+@pytest.mark.parametrize("offset, limit", [(0, 1), (0, 10), (7, 10), (0, 49), (0, 50), (0, 500), (45, 10),
+                                           (50, 10), (200, 5), (0, None), (13, None)])
+def test_matches_full_sort(sort_by, descending, offset, limit):
+    # k < n, k = n - 1, k >= n y offsets en el final de la tabla o más allá
+    check(make_table(50), sort_by, descending, None, None, offset, limit)
+
+
+def test_ties_at_page_boundary_keep_encoder_order():
+    # Todas las filas empatan: la página es el orden del encoder
+    table = make_table(30, value_range=1)
+    indices, total = select_ranking(table, "growth", True, None, None, 5, 10)
+    assert total == 30
+    assert indices.tolist() == list(range(5, 15))
+
+
+@pytest.mark.parametrize("min_current, min_predicted", [(None, 2), (3, None), (2, 2), (4, 4)])
+def test_filters(min_current, min_predicted):
+    table = make_table(200, seed=1)
+    for sort_by, descending in itertools.product(["growth", "growth_percentage"], [True, False]):
+        check(table, sort_by, descending, min_current, min_predicted, 0, 15)
+        check(table, sort_by, descending, min_current, min_predicted, 10, None)
+
+
+def test_filters_that_match_nothing():
+    table = make_table(100, seed=2)
+    indices, total = select_ranking(table, "growth", True, 10 ** 6, None, 0, 10)
+    assert total == 0
+    assert indices.tolist() == []
+
+
+def test_empty_table():
+    indices, total = select_ranking(make_table(0), "growth", True, None, None, 0, 10)
+    assert total == 0
+    assert indices.tolist() == []
+
+
+def test_random_queries():
+    rng = np.random.default_rng(3)
+    for seed in range(20):
+        table = make_table(int(rng.integers(1, 300)), seed=seed, value_range=int(rng.integers(1, 50)))
+        for _ in range(20):
+            limit = None if rng.random() < 0.2 else int(rng.integers(1, 400))
+            min_current = None if rng.random() < 0.5 else int(rng.integers(0, 10))
+            min_predicted = None if rng.random() < 0.5 else int(rng.integers(0, 10))
+            check(table, str(rng.choice(["growth", "growth_percentage"])), bool(rng.random() < 0.5),
+                  min_current, min_predicted, int(rng.integers(0, 300)), limit)
+
+
+def test_service_page_matches_full_ranking(service):
+    ranking = service.get_ranking()
+    page = service.get_ranking_page(offset=0, limit=None)
+    assert page["total"] == len(ranking)
+    assert page["ranking"] == ranking
+    top = service.get_ranking_page(offset=20, limit=10)
+    assert top["ranking"] == ranking[20:30]
@@ -0,0 +1,195 @@
+# backend/tests/test_single_flight.py
+
+import asyncio
+
+import pytest
+
+from app.api.v1.endpoints import analytics
+from app.services.single_flight import SingleFlight, freeze
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_freeze_makes_lists_hashable():
+    assert freeze(("a", ["b", ["c"]], 5)) == ("a", ("b", ("c",)), 5)
+    hash(freeze([["x"], 1, None]))
+
+
+def test_identical_keys_share_one_computation():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.02)
+            return {"value": 42}
+
+        results = await asyncio.gather(*(flight.run("r", ("k", 1), compute) for _ in range(10)))
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        assert flight.stats() == {"r": {"executions": 1, "coalesced": 9, "errors": 0, "in_flight": 0}}
+    run(scenario())
+
+
+def test_different_keys_and_routes_do_not_coalesce():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def compute(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(
+            flight.run("r", 1, lambda: compute(1)),
+            flight.run("r", 2, lambda: compute(2)),
+            flight.run("s", 1, lambda: compute(3)),
+        )
+        assert results == [1, 2, 3]
+        assert flight.stats()["r"]["executions"] == 2
+        assert flight.stats()["s"]["executions"] == 1
+    run(scenario())
+
+
+def test_sequential_calls_recompute():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await flight.run("r", 1, compute) == 1
+        assert await flight.run("r", 1, compute) == 2
+    run(scenario())
+
+
+def test_exception_propagates_to_every_waiter_and_clears_entry():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError("falla")
+
+        results = await asyncio.gather(*(flight.run("r", 1, compute) for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.stats()["r"] == {"executions": 1, "coalesced": 4, "errors": 1, "in_flight": 0}
+
+        async def recovered():
+            return "ok"
+
+        # La clave no quedó ocupada por el cálculo fallido
+        assert await flight.run("r", 1, recovered) == "ok"
+    run(scenario())
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return 7
+
+        leader = asyncio.ensure_future(flight.run("r", 1, compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.run("r", 1, compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == 7
+        assert leader.cancelled()
+        assert flight.stats()["r"]["in_flight"] == 0
+    run(scenario())
+
+
+def test_cancelling_every_waiter_leaves_no_stale_entry():
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def compute():
+            started.set()
+            await asyncio.sleep(0.05)
+            return 1
+
+        waiters = [asyncio.ensure_future(flight.run("r", 1, compute)) for _ in range(3)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        # El cálculo compartido termina igual y libera la clave
+        await asyncio.sleep(0.1)
+        assert flight.stats()["r"]["in_flight"] == 0
+        assert flight.stats()["r"]["executions"] == 1
+
+        async def again():
+            return 2
+
+        assert await flight.run("r", 1, again) == 2
+    run(scenario())
+
+
+def test_cancelled_computation_clears_entry():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def compute():
+            raise asyncio.CancelledError()
+
+        with pytest.raises(asyncio.CancelledError):
+            await flight.run("r", 1, compute)
+        assert flight.stats()["r"]["in_flight"] == 0
+        assert flight.stats()["r"]["errors"] == 0
+    run(scenario())
+
+
+def test_disabled_runs_every_call():
+    async def scenario():
+        flight = SingleFlight(enabled=False)
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(flight.run("r", 1, compute) for _ in range(4)))
+        assert calls == 4
+        assert flight.stats() == {}
+    run(scenario())
+
+
+def test_endpoint_coalesces_concurrent_projections(service, monkeypatch):
+    import httpx
+    from app.main import app
+
+    flight = SingleFlight()
+    monkeypatch.setattr(analytics, "single_flight", flight)
+    original = service.plan_projections
+    calls = 0
+
+    def plan_projections(*args):
+        nonlocal calls
+        calls += 1
+        return (yield from original(*args))
+
+    monkeypatch.setattr(service, "plan_projections", plan_projections)
+    name = service.bundle.affiliation_index.latest_names[0]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get(f"/api/v1/projection/{name}") for _ in range(8)))
+
+    responses = run(scenario())
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.content for response in responses}) == 1
+    stats = flight.stats()["projection"]
+    assert stats["executions"] + stats["coalesced"] == 8
+    assert calls == stats["executions"] < 8
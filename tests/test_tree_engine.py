@@ -0,0 +1,93 @@
+# backend/tests/test_tree_engine.py
+
+"""Paridad del motor NumPy (TreeEnsemble) con Booster.predict de LightGBM."""
+
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pytest
+from lightgbm import LGBMRegressor
+
+from app.services.asset_bundle import FEATURE_COLUMNS
+from app.services.tree_engine import TreeEnsemble
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def booster_predict(model, features: np.ndarray) -> np.ndarray:
+    num_iteration = getattr(model, "best_iteration_", 0) or None
+    return model.booster_.predict(features, num_iteration=num_iteration)
+
+
+@pytest.fixture(scope="module")
+def repo_model():
+    return joblib.load(ROOT / "publication_model.pkl")
+
+
+@pytest.fixture(scope="module")
+def nan_model():
+    """Modelo entrenado con valores faltantes, para que haya divisiones con missing_type NaN."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 4))
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=len(X))
+    X[rng.random(X.shape) < 0.2] = np.nan
+    return LGBMRegressor(n_estimators=50, num_leaves=15, verbose=-1).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def repo_rows(repo_model):
+    """Filas plausibles para el modelo del repositorio (año, afiliación, publicaciones, autores)."""
+    rng = np.random.default_rng(1)
+    n_rows = 5000
+    return np.column_stack((
+        rng.integers(1990, 2035, n_rows),
+        rng.integers(0, 3000, n_rows),
+        rng.integers(0, 5000, n_rows),
+        rng.integers(0, 20000, n_rows),
+    )).astype(np.float64)
+
+
+def test_repo_model_single_row(repo_model, repo_rows):
+    engine = TreeEnsemble.from_model(repo_model)
+    row = repo_rows[0]
+    np.testing.assert_array_equal(engine.predict(row), booster_predict(repo_model, row.reshape(1, -1)))
+
+
+def test_repo_model_batch(repo_model, repo_rows):
+    engine = TreeEnsemble.from_model(repo_model)
+    np.testing.assert_array_equal(engine.predict(repo_rows), booster_predict(repo_model, repo_rows))
+
+
+def test_repo_model_unseen_categories(repo_model, repo_rows):
+    # Códigos de afiliación que el encoder nunca produjo (negativos o fuera de rango)
+    rows = repo_rows[:500].copy()
+    rows[:250, FEATURE_COLUMNS.index('affiliation_encoded')] = -1
+    rows[250:, FEATURE_COLUMNS.index('affiliation_encoded')] = 10 ** 6
+    engine = TreeEnsemble.from_model(repo_model)
+    np.testing.assert_array_equal(engine.predict(rows), booster_predict(repo_model, rows))
+
+
+def test_repo_model_nan(repo_model, repo_rows):
+    rows = repo_rows[:400].copy()
+    for column in range(rows.shape[1]):
+        rows[column * 100:(column + 1) * 100, column] = np.nan
+    engine = TreeEnsemble.from_model(repo_model)
+    np.testing.assert_array_equal(engine.predict(rows), booster_predict(repo_model, rows))
+
+
+def test_nan_model(nan_model):
+    rng = np.random.default_rng(2)
+    rows = rng.normal(size=(3000, 4))
+    rows[rng.random(rows.shape) < 0.3] = np.nan
+    rows[:10] = np.nan
+    rows[10:20] = 0.0
+    engine = TreeEnsemble.from_model(nan_model)
+    np.testing.assert_array_equal(engine.predict(rows), booster_predict(nan_model, rows))
+    np.testing.assert_array_equal(engine.predict(rows[0]), booster_predict(nan_model, rows[:1]))
+
+
+def test_round_trip_through_arrays(repo_model, repo_rows):
+    engine = TreeEnsemble.from_model(repo_model)
+    restored = TreeEnsemble.from_arrays(engine.to_arrays(), engine.metadata())
+    np.testing.assert_array_equal(restored.predict(repo_rows), engine.predict(repo_rows))